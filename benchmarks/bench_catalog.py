@@ -0,0 +1,206 @@
+"""项目名索引基准测试：完整下载、增量更新(changelog serial / ETag 304)和补全查询延迟
+
+在本地模拟索引上提供N个合成项目名(/simple/ 带ETag和X-PyPI-Last-Serial，/pypi 提供
+XML-RPC changelog_since_serial)。测量：完整下载并建立索引、按serial增量更新(新增和
+删除若干项目)、不支持XML-RPC时的条件请求(304，包括对POST返回HTML页面的镜像)，以及
+前缀和模糊查询的延迟分布。
+--index-url 可改为真实索引(只测完整下载和查询)。
+
+用法: python benchmarks/bench_catalog.py [-n 500000] [--changes 500] [--index-url URL]
+"""
+import argparse
+import hashlib
+import http.server
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import xmlrpc.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_catalog import ProjectCatalog, write_catalog  # noqa: E402
+
+SYLLABLES = ['py', 'req', 'django', 'flask', 'data', 'net', 'http', 'json', 'yaml', 'test', 'api', 'lib',
+             'core', 'tools', 'utils', 'async', 'io', 'ml', 'torch', 'num', 'sci', 'plot', 'web', 'cli']
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        parts = [rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))]
+        names.add('-'.join(parts) + (str(rng.randint(0, 9999)) if rng.random() < 0.7 else ''))
+    return sorted(names)
+
+
+def make_handler(names, changelog, serial, post_mode):
+    """post_mode: 'xmlrpc' 提供changelog，'405' 不支持POST，'html' 对POST返回200和HTML页面"""
+    body = ('<!DOCTYPE html><html><body>\n' + ''.join(f'<a href="{n}/">{n}</a>\n' for n in names)
+            + '</body></html>').encode()
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('ETag', etag)
+            self.send_header('X-PyPI-Last-Serial', str(serial))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if post_mode == '405':
+                self.send_response(405)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if post_mode == 'html':
+                # 普通HTML(不是合法的XML，解析时抛出ExpatError)
+                page = b'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>Not Found<br></body></html>'
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+                return
+            (since,), _method = xmlrpc.client.loads(data)
+            entries = [entry for entry in changelog if entry[4] > since]
+            response = xmlrpc.client.dumps((entries,), methodresponse=True).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/xml')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+    return Handler
+
+
+def serve(port_queue, names, changelog, serial, post_mode):
+    """在独立进程中运行模拟索引"""
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), make_handler(names, changelog, serial, post_mode))
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_server(*args):
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(port_queue, *args), daemon=True)
+    process.start()
+    return process, f'http://127.0.0.1:{port_queue.get(timeout=30)}/simple/'
+
+
+def report(label, update):
+    print(f"{label:<22} {update.seconds * 1000:8.0f} ms  {update.mode:<12} "
+          f"+{update.added} -{update.removed}  共 {update.count:,} 个项目")
+
+
+def typo(rng, name):
+    i = rng.randrange(len(name))
+    kind = rng.randrange(3)
+    if kind == 0 and len(name) > 3:
+        return name[:i] + name[i + 1:]
+    if kind == 1 and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + name[i + 1:]
+
+
+def measure_queries(catalog, names, count=2000):
+    rng = random.Random(1)
+    timings = {'前缀(2~6个字符)': [], '完整名称': [], '输错一个字符': []}
+    for _ in range(count):
+        name = rng.choice(names)
+        queries = {'前缀(2~6个字符)': name[:rng.randint(2, 6)], '完整名称': name, '输错一个字符': typo(rng, name)}
+        for label, query in queries.items():
+            start = time.perf_counter()
+            catalog.search(query)
+            timings[label].append((time.perf_counter() - start) * 1000)
+    for label, values in timings.items():
+        values.sort()
+        print(f"{label:<16} 中位数 {statistics.median(values):6.3f} ms  "
+              f"p99 {values[int(len(values) * 0.99)]:6.3f} ms  最大 {values[-1]:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=500000, help='合成项目数')
+    parser.add_argument('--changes', type=int, default=500, help='增量更新中新增/删除的项目数')
+    parser.add_argument('--index-url', help='使用真实索引(只测完整下载和查询)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.index_url:
+            catalog = ProjectCatalog(args.index_url, directory=directory)
+            report('完整下载', catalog.update())
+            report('再次更新', catalog.update())
+            measure_queries(catalog, [name.decode() for name in catalog.names()])
+            catalog.close()
+            return
+
+        all_names = synthetic_names(args.count + args.changes)
+        rng = random.Random(2)
+        changed = rng.sample(all_names, args.changes)
+        added, removed = changed[args.changes // 5:], changed[:args.changes // 5]
+        old_names = sorted(set(all_names) - set(added))
+        new_names = sorted(set(all_names) - set(removed))
+        base_serial = 1000000
+        changelog = [(name, '1.0', 0, 'create', base_serial + i + 1) for i, name in enumerate(added)]
+        changelog += [(name, '', 0, 'remove project', base_serial + len(added) + i + 1)
+                      for i, name in enumerate(removed)]
+        serial = base_serial + len(changelog)
+
+        xmlrpc_server, url = start_server(new_names, changelog, serial, 'xmlrpc')
+        catalog = ProjectCatalog(url, directory=directory)
+        report('完整下载', catalog.update())
+        # 回到旧状态，模拟一段时间前下载的索引
+        catalog.close()
+        write_catalog(catalog.path, old_names)
+        catalog.open()
+        meta = catalog.load_meta()
+        meta['serial'] = base_serial
+        catalog.save_meta(meta)
+        report('按serial增量更新', catalog.update())
+        assert sorted(name.decode() for name in catalog.names()) == new_names
+        report('已是最新(serial)', catalog.update())
+        catalog.close()
+        xmlrpc_server.terminate()
+
+        plain_server, url = start_server(new_names, [], serial, '405')
+        catalog = ProjectCatalog(url, directory=directory)
+        report('完整下载(无XML-RPC)', catalog.update())
+        report('条件请求(ETag)', catalog.update())
+        print(f"索引文件 {os.path.getsize(catalog.path) / 1e6:.1f} MB")
+        measure_queries(catalog, new_names)
+        catalog.close()
+        plain_server.terminate()
+
+        html_server, url = start_server(new_names, [], serial, 'html')
+        catalog = ProjectCatalog(url, directory=directory)
+        catalog.update()
+        report('条件请求(POST返回HTML)', catalog.update())
+        assert not catalog.load_meta()['changelog']
+        catalog.close()
+        html_server.terminate()
+
+
+if __name__ == '__main__':
+    main()
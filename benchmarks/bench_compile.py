@@ -0,0 +1,122 @@
+"""并行编译基准测试：pip安装时逐个编译与 --no-compile 后按RECORD并行编译的比较
+
+生成一个包含N个模块的合成wheel(每个模块若干个函数和类)，新建虚拟环境后分别测量：
+pip默认安装(安装时编译)、--no-compile 安装(不编译，作为下限)、通过引擎的安装队列启用
+并行编译后安装(--workers个compileall进程)，并输出PhaseTracker的耗时摘要(含编译阶段的实际耗时)。
+每次安装前先卸载，最后检查并行编译生成的 .pyc 都已记入RECORD，卸载后没有残留。
+
+用法: python benchmarks/bench_compile.py [-n 400] [--workers 4] [--optimize 0]
+"""
+import argparse
+import base64
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_compile import OPTIMIZE_LEVELS, compile_option  # noqa: E402
+from pip_engine import PipEngine  # noqa: E402
+from pip_jobs import SUCCEEDED  # noqa: E402
+
+NAME = 'compile_bench'
+
+
+def module_source(index, functions=40):
+    parts = [f'"""合成模块 {index}"""\nimport os\n\n']
+    for i in range(functions):
+        parts.append(f'def function_{i}(value, scale={i}):\n'
+                     f'    """函数 {i}"""\n'
+                     f'    result = [value * scale + n for n in range({i + 10}) if n % 3]\n'
+                     f'    return sum(result) + len(os.sep)\n\n\n'
+                     f'class Class{i}:\n'
+                     f'    def method(self, x):\n'
+                     f'        return {{"index": {index}, "value": x * {i}}}\n\n\n')
+    return ''.join(parts).encode()
+
+
+def build_wheel(directory, modules):
+    dist_info = f"{NAME}-1.0.dist-info"
+    files = {f"{NAME}/__init__.py": b"", f"{NAME}/data.txt": b"not python\n"}
+    files.update((f"{NAME}/module_{i:04d}.py", module_source(i)) for i in range(modules))
+    files[f"{dist_info}/METADATA"] = f"Metadata-Version: 2.1\nName: {NAME}\nVersion: 1.0\n".encode()
+    files[f"{dist_info}/WHEEL"] = b"Wheel-Version: 1.0\nGenerator: bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+    record = []
+    for path, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+        record.append(f"{path},sha256={digest},{len(data)}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ('\n'.join(record) + '\n').encode()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    path = os.path.join(directory, f"{NAME}-1.0-py3-none-any.whl")
+    with open(path, 'wb') as f:
+        f.write(buffer.getvalue())
+    return path
+
+
+def pip(python, *args):
+    subprocess.run([python, '-m', 'pip', *args, '-q', '--disable-pip-version-check'],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def pyc_files(site):
+    return [os.path.join(directory, name) for directory, _dirs, names in os.walk(os.path.join(site, NAME))
+            for name in names if name.endswith('.pyc')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--modules', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行编译的进程数')
+    parser.add_argument('--optimize', type=int, default=0, choices=OPTIMIZE_LEVELS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wheel = build_wheel(tmp, args.modules)
+        venv = os.path.join(tmp, 'venv')
+        subprocess.run([sys.executable, '-m', 'venv', venv], check=True)
+        python = os.path.join(venv, 'Scripts' if os.name == 'nt' else 'bin', 'python')
+        site = subprocess.run([python, '-c', 'import sysconfig; print(sysconfig.get_paths()["purelib"])'],
+                              check=True, capture_output=True, text=True).stdout.strip()
+        print(f"{args.modules} 个模块，CPU {os.cpu_count()} 个，并行编译 {args.workers} 个进程")
+
+        timed('pip默认安装(逐个编译)', pip, python, 'install', wheel)
+        pip(python, 'uninstall', '-y', NAME)
+        timed('pip --no-compile(不编译)', pip, python, 'install', '--no-compile', wheel)
+        pip(python, 'uninstall', '-y', NAME)
+
+        traces = []
+        engine = PipEngine(listener=lambda job, event, data: traces.append(data) if event == 'trace' else None,
+                           use_worker=False)
+        engine.auto_snapshot = False
+        engine.compile_workers = args.workers
+        results = timed('引擎安装并并行编译',
+                        lambda: engine.install([wheel], [compile_option(args.optimize)], pythons=[python]).result())
+        assert all(result.status == SUCCEEDED for result in results), results
+        engine.close()
+        print(f"  {traces[-1].summary()}")
+        print(f"  生成 .pyc {len(pyc_files(site))} 个")
+
+        pip(python, 'uninstall', '-y', NAME)
+        leftover = pyc_files(site)
+        assert not leftover, leftover[:5]
+        print("  卸载后没有残留的 .pyc")
+
+
+if __name__ == '__main__':
+    main()
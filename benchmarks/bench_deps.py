@@ -0,0 +1,80 @@
+"""依赖索引基准测试：为合成site-packages建立反向依赖图
+
+生成N个带Requires-Dist(含环境标记和extra)的 .dist-info，测量首次建立索引、
+无变化时的增量更新、少量包变化时的增量更新，以及一次卸载影响分析的耗时。
+
+用法: python benchmarks/bench_deps.py [-n 5000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_deps import DependencyIndex  # noqa: E402
+from pip_inventory import InventoryEngine, MODE_METADATA  # noqa: E402
+
+MARKERS = [
+    '',
+    ' ; python_version >= "3.8"',
+    ' ; sys_platform == "win32"',
+    ' ; extra == "test"',
+    ' ; python_version < "3.11" and extra == "speed"',
+]
+
+
+def make_site_packages(root, count, seed=0):
+    """生成count个分发包，每个依赖编号更小的若干个包"""
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"dep-pkg-{i:05d}"
+        dist_info = os.path.join(root, f"{name.replace('-', '_')}-1.0.dist-info")
+        os.makedirs(dist_info)
+        lines = [f"Metadata-Version: 2.1", f"Name: {name}", "Version: 1.0"]
+        for target in rng.sample(range(i), min(i, rng.randint(0, 6))):
+            lines.append(f"Requires-Dist: dep-pkg-{target:05d}>=0.{target % 9}"
+                         f"{rng.choice(MARKERS)}")
+        lines.append("Provides-Extra: test")
+        with open(os.path.join(dist_info, 'METADATA'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n\nlong description\n')
+        if rng.random() < 0.2:
+            open(os.path.join(dist_info, 'REQUESTED'), 'w').close()
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<16} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=5000, help='合成分发包数量')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='pipmgr-deps-')
+    try:
+        make_site_packages(root, args.count)
+        engine = InventoryEngine(mode=MODE_METADATA, paths=[root])
+        records = engine.load()
+        index = DependencyIndex()
+
+        timed(f"首次建立({len(records)}个)", lambda: index.update(records))
+        timed("无变化更新", lambda: index.update(records))
+        changed = [r._replace(version='2.0') if i % 500 == 0 else r for i, r in enumerate(records)]
+        parsed = timed("少量变化更新", lambda: index.update(changed))
+        print(f"  重新解析 {parsed} 个包")
+        victims = [r.name for r in records[-20:]]
+        plan = timed("卸载分析(20个)", lambda: index.removal_plan(victims))
+        print(f"  依赖方 {sum(len(v) for v in plan.dependents.values())}，孤立依赖 {len(plan.orphans)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
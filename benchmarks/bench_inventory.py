@@ -0,0 +1,72 @@
+"""已安装包清单基准测试：元数据扫描 vs pip list
+
+在临时目录中生成包含大量 .dist-info 的合成 site-packages，
+分别用进程内元数据扫描和 `pip list --path` 读取，比较耗时。
+
+用法: python benchmarks/bench_inventory.py [-n 5000] [--repeat 3]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import InventoryEngine, MODE_METADATA, MODE_PIP  # noqa: E402
+
+
+def make_site_packages(root, count):
+    """生成count个合成分发包"""
+    for i in range(count):
+        name = f"synthetic-pkg-{i:05d}"
+        ver = f"1.{i % 50}.{i % 7}"
+        dist_info = os.path.join(root, f"{name.replace('-', '_')}-{ver}.dist-info")
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, 'METADATA'), 'w', encoding='utf-8') as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {ver}\n"
+                    f"Summary: synthetic package {i}\nRequires-Dist: six\n\nlong description\n")
+        with open(os.path.join(dist_info, 'INSTALLER'), 'w') as f:
+            f.write('pip\n')
+        with open(os.path.join(dist_info, 'RECORD'), 'w') as f:
+            f.write(f"{name}/__init__.py,,\n")
+
+
+def measure(engine, repeat):
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(engine.load())
+        timings.append(time.perf_counter() - start)
+    return count, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=5000, help='合成分发包数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每种模式重复次数')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='pipmgr-bench-')
+    try:
+        start = time.perf_counter()
+        make_site_packages(root, args.count)
+        print(f"生成 {args.count} 个分发包耗时 {time.perf_counter() - start:.2f}s ({root})")
+
+        results = {}
+        for mode in (MODE_METADATA, MODE_PIP):
+            engine = InventoryEngine(mode=mode, paths=[root])
+            count, timings = measure(engine, args.repeat)
+            results[mode] = statistics.median(timings)
+            print(f"{mode:>8}: {count} 个包, 中位数 {results[mode] * 1000:.1f} ms "
+                  f"(min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms)")
+        print(f"加速比: {results[MODE_PIP] / results[MODE_METADATA]:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""镜像测速基准测试：用本地模拟镜像检查probe_mirror测得的连接、首字节时间和下载速度及排名
+
+启动几个本地模拟镜像(各自独立进程)：项目页按设定延迟返回，样本文件按设定速度分块发送；
+另有一个项目页中没有文件链接的镜像和一个端口已关闭的镜像。检查每个镜像测得的首字节时间
+不小于设定延迟、下载速度接近设定速度、连接时间小于首字节时间，benchmark_mirrors的排名与
+按设定值估算的顺序一致，失败的镜像排在最后；并比较逐个探测与并发探测的总耗时。
+
+用法: python benchmarks/bench_mirrors.py [--timeout 5] [--concurrency 8]
+"""
+import argparse
+import http.server
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_mirrors import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, SAMPLE_BYTES, benchmark_mirrors, score  # noqa: E402
+
+CHUNK = 16 * 1024
+# 名称 -> (项目页延迟(毫秒), 样本文件下载速度(字节/秒))
+MIRRORS = {
+    'fast': (20, 4 * 1024 * 1024),
+    'slow-page': (200, 4 * 1024 * 1024),
+    'slow-download': (20, 800 * 1024),
+}
+
+
+def make_handler(page_delay, rate, links=True):
+    page = ('<!DOCTYPE html><html><body>\n'
+            + ('<a href="../../files/pip-0.9.tar.gz#sha256=00">pip-0.9.tar.gz</a>\n'
+               '<a href="../../files/pip-1.0.tar.gz#sha256=00">pip-1.0.tar.gz</a>\n' if links else '')
+            + '</body></html>').encode()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/files/'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(SAMPLE_BYTES))
+                self.end_headers()
+                chunk = b'\0' * CHUNK
+                for _ in range(SAMPLE_BYTES // CHUNK):
+                    time.sleep(CHUNK / rate)
+                    self.wfile.write(chunk)
+                return
+            time.sleep(page_delay / 1000)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+    return Handler
+
+
+def serve(port_queue, *args):
+    """在独立进程中运行模拟镜像"""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), make_handler(*args))
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_server(*args):
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(port_queue, *args), daemon=True)
+    process.start()
+    return process, f'http://127.0.0.1:{port_queue.get(timeout=30)}/simple'
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<24} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='每次请求的超时秒数')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='同时探测的镜像数')
+    args = parser.parse_args()
+
+    processes, mirrors = [], {}
+    for name, (page_delay, rate) in MIRRORS.items():
+        process, mirrors[name] = start_server(page_delay, rate)
+        processes.append(process)
+    process, mirrors['no-links'] = start_server(20, MIRRORS['fast'][1], False)
+    processes.append(process)
+    mirrors['dead'] = f'http://127.0.0.1:{closed_port()}/simple'
+
+    try:
+        timed('逐个探测', benchmark_mirrors, mirrors, timeout=args.timeout, concurrency=1)
+        probes = timed(f'并发探测({args.concurrency} 个)', benchmark_mirrors, mirrors,
+                       timeout=args.timeout, concurrency=args.concurrency)
+    finally:
+        for process in processes:
+            process.terminate()
+
+    for probe in probes:
+        print(f"  {probe.name:<14} " + (probe.error if probe.error else
+              f"连接 {probe.connect_ms:6.1f} ms  首字节 {probe.ttfb_ms:6.1f} ms  "
+              f"{probe.throughput / 1024:7.0f} KB/s  估算 {score(probe):6.0f} ms"))
+
+    by_name = {probe.name: probe for probe in probes}
+    for name, (page_delay, rate) in MIRRORS.items():
+        probe = by_name[name]
+        assert probe.error is None, probe
+        assert probe.connect_ms < probe.ttfb_ms, probe
+        assert page_delay <= probe.ttfb_ms < page_delay + 150, probe
+        assert 0.5 * rate < probe.throughput < 1.2 * rate, probe
+    assert by_name['no-links'].error and by_name['no-links'].ttfb_ms is not None, by_name['no-links']
+    assert by_name['dead'].error and by_name['dead'].connect_ms is None, by_name['dead']
+
+    expected = sorted(MIRRORS, key=lambda name: MIRRORS[name][0] + SAMPLE_BYTES / MIRRORS[name][1] * 1000)
+    assert [probe.name for probe in probes[:len(MIRRORS)]] == expected, [probe.name for probe in probes]
+    assert {probe.name for probe in probes[len(MIRRORS):]} == {'no-links', 'dead'}
+    print(f"排名与设定一致: {' > '.join(expected)}，失败的镜像排在最后")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""可更新检查基准测试：本地模拟索引服务器上的并发查询与条件请求缓存
+
+启动一个本地HTTP/1.1简单索引(PEP 691 JSON或HTML，支持ETag/Last-Modified)，
+为N个合成项目检查最新版本，分别测量无缓存(全部200)和有缓存(全部304，或在max-age内不发请求)的耗时。
+--latency 为每个请求人为增加的服务器延迟，用于模拟真实网络。
+
+用法: python benchmarks/bench_outdated.py [--packages 1000] [--latency 0.02] [--html]
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import PackageRecord  # noqa: E402
+from pip_outdated import OutdatedChecker  # noqa: E402
+
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+def make_handler(releases_per_project, latency, use_html, max_age=0):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # 响应头和响应体分两次写入，避免延迟确认造成40ms停顿
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            name = self.path.strip('/').split('/')[-1]
+            if not name.startswith('pkg-'):
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            filenames = [f"{name.replace('-', '_')}-1.{i}-py3-none-any.whl"
+                         for i in range(releases_per_project)]
+            if use_html:
+                content_type = 'text/html'
+                body = ''.join(f'<a href="../../files/{f}" data-requires-python="&gt;=3.7">{f}</a><br/>'
+                               for f in filenames).encode()
+            else:
+                content_type = 'application/vnd.pypi.simple.v1+json'
+                body = json.dumps({
+                    'meta': {'api-version': '1.0'},
+                    'name': name,
+                    'files': [{'filename': f, 'url': f'../../files/{f}', 'hashes': {},
+                               'requires-python': '>=3.7'} for f in filenames],
+                }).encode()
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            if max_age:
+                self.send_header('Cache-Control', f'max-age={max_age}, public')
+            self.send_header('Content-Type', content_type)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', LAST_MODIFIED)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(port_queue, releases_per_project, latency, use_html, max_age):
+    """在独立进程中运行模拟索引，避免与客户端争用GIL"""
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), make_handler(releases_per_project, latency, use_html, max_age))
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def run(checker, records):
+    start = time.perf_counter()
+    results = checker.check(records)
+    elapsed = time.perf_counter() - start
+    outdated = sum(1 for r in results.values() if r.outdated)
+    return elapsed, outdated, dict(checker.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=1000)
+    parser.add_argument('--releases', type=int, default=30, help='每个项目的发行文件数')
+    parser.add_argument('--latency', type=float, default=0.02, help='每个请求的服务器延迟(秒)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--html', action='store_true', help='返回HTML而不是PEP 691 JSON')
+    parser.add_argument('--max-age', type=int, default=0,
+                        help='响应的Cache-Control max-age，非0时第二次检查不发请求')
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(port_queue, args.releases, args.latency, args.html, args.max_age), daemon=True)
+    server.start()
+    index_url = f'http://127.0.0.1:{port_queue.get(timeout=10)}/simple/'
+
+    records = [PackageRecord(f'pkg-{i}', '1.0', '', '', None, None) for i in range(args.packages)]
+    records.append(PackageRecord('not-on-index', '1.0', '', '', None, None))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ('无缓存', '有缓存'):
+            checker = OutdatedChecker(index_url, cache_dir=cache_dir, concurrency=args.concurrency)
+            elapsed, outdated, stats = run(checker, records)
+            checker.close()
+            print(f"{label:<10} {elapsed * 1000:8.0f} ms  可更新 {outdated}  {stats}")
+
+    serial = args.packages * args.latency
+    print(f"串行请求至少需要 {serial * 1000:.0f} ms (仅服务器延迟)")
+    server.terminate()
+
+
+if __name__ == '__main__':
+    main()
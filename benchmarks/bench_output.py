@@ -0,0 +1,130 @@
+"""输出吞吐量基准测试：逐行append_output vs OutputPipeline
+
+模拟一次输出大量行的pip安装(编译C扩展、长时间依赖解析)，比较baseline的
+逐行"切换状态+插入+滚动"与批量管道的每秒行数。有显示器时使用真实的
+ScrolledText，否则使用替身文本框。
+
+用法: python benchmarks/bench_output.py [-n 20000] [--headless]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_output import OutputPipeline  # noqa: E402
+
+
+class FakeText:
+    """只实现OutputPipeline用到的Text接口，按行保存内容"""
+
+    def __init__(self):
+        self.lines = ['']
+        self.calls = 0
+
+    def config(self, **kwargs):
+        self.calls += 1
+
+    def insert(self, index, text):
+        self.calls += 1
+        parts = text.split('\n')
+        self.lines[-1] += parts[0]
+        self.lines.extend(parts[1:])
+
+    def delete(self, start, end):
+        self.calls += 1
+        del self.lines[:int(end.split('.')[0]) - 1]
+
+    def see(self, index):
+        self.calls += 1
+
+    def update(self):
+        pass
+
+    def after(self, ms, func):
+        return None
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def make_widget(headless):
+    if headless:
+        widget = FakeText()
+        return None, widget, widget.update
+    import tkinter as tk
+    from tkinter import scrolledtext
+    root = tk.Tk()
+    widget = scrolledtext.ScrolledText(root, wrap=tk.WORD, state='disabled', height=15)
+    widget.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    return root, widget, root.update
+
+
+def pip_lines(count):
+    for i in range(count):
+        yield f"  building 'ext_{i % 97}' extension: gcc -pthread -O2 -fPIC -c src/module_{i}.c -o build/module_{i}.o\n"
+
+
+def legacy(widget, flush, count):
+    """baseline的append_output：每行一次状态切换、插入和滚动"""
+    import tkinter as tk
+    start = time.perf_counter()
+    for line in pip_lines(count):
+        widget.config(state=tk.NORMAL)
+        widget.insert(tk.END, line)
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)
+    flush()
+    return time.perf_counter() - start
+
+
+def pipelined(widget, flush, count, max_lines):
+    log_path = os.path.join(tempfile.mkdtemp(prefix='pipmgr-bench-'), 'output.log')
+    pipeline = OutputPipeline(widget, max_lines=max_lines, log_path=log_path)
+    done = threading.Event()
+
+    def worker():
+        for line in pip_lines(count):
+            pipeline.write(line)
+        done.set()
+
+    start = time.perf_counter()
+    threading.Thread(target=worker, daemon=True).start()
+    while not done.is_set():
+        pipeline.drain()
+        flush()
+        time.sleep(pipeline.interval / 1000)
+    pipeline.stop()
+    flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--lines', type=int, default=20000)
+    parser.add_argument('--max-lines', type=int, default=5000)
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    headless = args.headless or not (os.environ.get('DISPLAY') or sys.platform == 'win32')
+    print(f"后端: {'替身文本框' if headless else 'Tk ScrolledText'}，{args.lines} 行")
+
+    root, widget, flush = make_widget(headless)
+    elapsed = legacy(widget, flush, args.lines)
+    print(f"逐行输出: {args.lines / elapsed:>10.0f} 行/秒 ({elapsed:.2f}s)")
+    if root is not None:
+        root.destroy()
+
+    root, widget, flush = make_widget(headless)
+    elapsed = pipelined(widget, flush, args.lines, args.max_lines)
+    print(f"批量管道: {args.lines / elapsed:>10.0f} 行/秒 ({elapsed:.2f}s)")
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == '__main__':
+    main()
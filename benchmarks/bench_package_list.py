@@ -0,0 +1,183 @@
+"""包列表基准测试：首屏时间与滚动延迟
+
+比较原来的"排序+逐行插入"方式与PackageListView(虚拟化)在1k/10k/100k行下的
+首屏时间(time-to-first-paint)和滚动延迟。有显示器(DISPLAY)时使用真实的Tk，
+否则使用只记录调用的替身Treeview，可在无界面的构建机上运行。
+
+用法: python benchmarks/bench_package_list.py [--sizes 1000 10000 100000] [--headless]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import PackageRecord, sort_records  # noqa: E402
+from pip_package_view import PackageListView  # noqa: E402
+
+
+class FakeTreeview:
+    """只实现PackageListView用到的Treeview接口"""
+
+    def __init__(self):
+        self.items = {}
+        self.order = []
+        self.selected = ()
+        self.calls = 0
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.calls += 1
+        self.items[iid] = values
+        if index == 'end':
+            self.order.append(iid)
+        else:
+            self.order.insert(index, iid)
+        return iid
+
+    def item(self, iid, option=None, values=None):
+        self.calls += 1
+        if values is not None:
+            self.items[iid] = values
+        return self.items[iid]
+
+    def delete(self, *iids):
+        self.calls += 1
+        for iid in iids:
+            self.items.pop(iid, None)
+        if iids:
+            removed = set(iids)
+            self.order = [iid for iid in self.order if iid not in removed]
+
+    def detach(self, iid):
+        self.calls += 1
+        self.order.remove(iid)
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+        if iid in self.order:
+            self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, items):
+        self.selected = tuple(items)
+
+    def focus(self):
+        return ''
+
+    def yview(self, *args):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+
+def make_records(count):
+    return [
+        PackageRecord(f"package-{(i * 7919) % count:06d}", f"1.{i % 30}.0", '', 'pip', None, None)
+        for i in range(count)
+    ]
+
+
+def legacy_fill(tree, records):
+    """baseline的update_package_list：先排序再逐行插入"""
+    tree.delete(*tree.get_children())
+    for pkg in sorted(records, key=lambda x: x.name.lower()):
+        tree.insert('', 'end', values=(pkg.name, pkg.version))
+
+
+def make_widgets(headless):
+    if headless:
+        tree = FakeTreeview()
+        return None, tree, FakeScrollbar(), tree.update_idletasks
+    import tkinter as tk
+    from tkinter import ttk
+    root = tk.Tk()
+    root.geometry('800x600')
+    tree = ttk.Treeview(root, columns=('name', 'version'), show='headings')
+    scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=tree.yview)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    root.update()
+    return root, tree, scrollbar, root.update
+
+
+def bench_size(count, headless, scroll_steps):
+    records = make_records(count)
+    results = {'rows': count}
+
+    root, tree, scrollbar, flush = make_widgets(headless)
+    start = time.perf_counter()
+    legacy_fill(tree, records)
+    flush()
+    results['legacy_first_paint_ms'] = (time.perf_counter() - start) * 1000
+    if root is not None:
+        root.destroy()
+
+    root, tree, scrollbar, flush = make_widgets(headless)
+    view = PackageListView(tree, scrollbar, virtual_threshold=0)
+    start = time.perf_counter()
+    view.set_rows(sort_records(records))  # 每次清单刷新只排序一次
+    flush()
+    results['virtual_first_paint_ms'] = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for step in range(scroll_steps):
+        start = time.perf_counter()
+        view.yview('scroll', 1 if step % 2 == 0 else 3, 'units')
+        flush()
+        latencies.append((time.perf_counter() - start) * 1000)
+    results['scroll_median_ms'] = statistics.median(latencies)
+    results['scroll_max_ms'] = max(latencies)
+
+    start = time.perf_counter()
+    view.yview('moveto', 0.5)
+    flush()
+    results['jump_ms'] = (time.perf_counter() - start) * 1000
+    if root is not None:
+        root.destroy()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--scroll-steps', type=int, default=200)
+    parser.add_argument('--headless', action='store_true', help='即使有显示器也使用替身Treeview')
+    args = parser.parse_args()
+
+    headless = args.headless or not (os.environ.get('DISPLAY') or sys.platform == 'win32')
+    print(f"后端: {'替身Treeview' if headless else 'Tk'}")
+    print(f"{'行数':>8} {'原首屏ms':>10} {'虚拟首屏ms':>10} {'滚动中位ms':>10} {'滚动最大ms':>10} {'跳转ms':>8}")
+    for count in args.sizes:
+        r = bench_size(count, headless, args.scroll_steps)
+        print(f"{r['rows']:>8} {r['legacy_first_paint_ms']:>10.1f} {r['virtual_first_paint_ms']:>10.1f} "
+              f"{r['scroll_median_ms']:>10.3f} {r['scroll_max_ms']:>10.3f} {r['jump_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
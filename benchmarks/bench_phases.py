@@ -0,0 +1,72 @@
+"""阶段解析基准测试：PhaseTracker处理pip输出的开销
+
+生成一次安装N个包的合成pip输出(Collecting/Downloading/原始进度行/构建/安装)，
+测量逐行feed的吞吐量、进度快照的耗时以及保存JSON和Chrome trace的耗时，
+确认解析不会拖慢输出管道。
+
+用法: python benchmarks/bench_phases.py [-n 500] [--progress-lines 40]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_phases import PhaseTracker  # noqa: E402
+
+
+def synthetic_stream(count, progress_lines):
+    lines = ["Looking in indexes: https://pypi.org/simple\n"]
+    for i in range(count):
+        name = f"pkg-{i:04d}"
+        size = 1_000_000 + i * 1000
+        lines.append(f"Collecting {name}>=1.0 (from -r requirements.txt (line {i + 1}))\n")
+        lines.append(f"  Downloading {name.replace('-', '_')}-1.0.{i}-py3-none-any.whl ({size / 1e6:.1f} MB)\n")
+        for step in range(progress_lines + 1):
+            lines.append(f"Progress {size * step // progress_lines} of {size}\n")
+        if i % 10 == 0:
+            lines.append("  Preparing metadata (pyproject.toml): started\n")
+            lines.append("  Preparing metadata (pyproject.toml): finished with status 'done'\n")
+    lines.append("Building wheels for collected packages: " + ', '.join(
+        f"pkg-{i:04d}" for i in range(0, count, 10)) + "\n")
+    for i in range(0, count, 10):
+        lines.append(f"  Building wheel for pkg-{i:04d} (pyproject.toml): started\n")
+        lines.append(f"  Building wheel for pkg-{i:04d} (pyproject.toml): finished with status 'done'\n")
+    lines.append("Installing collected packages: " + ', '.join(f"pkg-{i:04d}" for i in range(count)) + "\n")
+    lines.append("Successfully installed " + ' '.join(f"pkg-{i:04d}-1.0.{i}" for i in range(count)) + "\n")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=500)
+    parser.add_argument('--progress-lines', type=int, default=40, help='每个文件的原始进度行数')
+    args = parser.parse_args()
+
+    lines = synthetic_stream(args.count, args.progress_lines)
+    tracker = PhaseTracker(['python', '-m', 'pip', 'install', '-r', 'requirements.txt'])
+    start = time.perf_counter()
+    hidden = sum(1 for line in lines if tracker.feed(line))
+    elapsed = time.perf_counter() - start
+    tracker.finish(0)
+    print(f"{len(lines)} 行输出(其中进度行 {hidden})，解析 {elapsed * 1000:.1f} ms，"
+          f"{len(lines) / elapsed:,.0f} 行/秒，每行 {elapsed / len(lines) * 1e6:.2f} µs")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        tracker.progress()
+    print(f"进度快照: {(time.perf_counter() - start) * 1000:.3f} µs/次")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        report_path, trace_path = tracker.save(directory)
+        elapsed = time.perf_counter() - start
+        print(f"保存报告和trace: {elapsed * 1000:.1f} ms  ({len(tracker.spans)} 个区间，"
+              f"{os.path.getsize(report_path) + os.path.getsize(trace_path):,} 字节)")
+    print(tracker.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""常驻pip进程基准测试：空操作安装的端到端延迟
+
+对一个已经安装的包执行 `pip install` (输出 "Requirement already satisfied")，
+比较每次启动 `python -m pip` 子进程与通过常驻PipWorker执行的耗时。
+使用 --no-index 和 --disable-pip-version-check，不访问网络。
+
+用法: python benchmarks/bench_pip_worker.py [--repeat 5] [--package pip]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_worker import PipWorker  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--package', default='pip', help='一个已经安装的包')
+    parser.add_argument('--python', default=sys.executable)
+    args = parser.parse_args()
+
+    pip_args = ['install', '--no-index', '--disable-pip-version-check', args.package]
+
+    subprocess_times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        subprocess.run([args.python, '-m', 'pip', *pip_args],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        subprocess_times.append(time.perf_counter() - start)
+
+    worker = PipWorker(args.python)
+    start = time.perf_counter()
+    worker.start()
+    startup = time.perf_counter() - start
+    worker_times = []
+    try:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if worker.run(pip_args) != 0:
+                raise SystemExit("pip工作进程执行失败")
+            worker_times.append(time.perf_counter() - start)
+    finally:
+        worker.stop()
+
+    sub = statistics.median(subprocess_times) * 1000
+    wrk = statistics.median(worker_times) * 1000
+    print(f"子进程:   中位数 {sub:.0f} ms (min {min(subprocess_times) * 1000:.0f} ms)")
+    print(f"常驻进程: 中位数 {wrk:.0f} ms (min {min(worker_times) * 1000:.0f} ms)，"
+          f"一次性启动 {startup * 1000:.0f} ms")
+    print(f"每条命令节省 {sub - wrk:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""安装预览基准测试：首次解析、命中缓存的再次预览，以及按固定版本安装与普通安装的比较
+
+在临时目录中生成一个依赖M个合成包的顶层包(wheel放在本地目录，用 --no-index --find-links)，
+新建虚拟环境后分别测量：首次预览(pip --dry-run --report)、相同需求再次预览(命中缓存，
+不运行pip)、按预览结果加 --no-deps 安装(经过引擎的安装队列，以及直接调用pip)；再卸载后用
+普通的 pip install 安装同一个需求作对比(pip需要重新解析依赖)，并检查两种方式安装的版本集合相同。
+
+用法: python benchmarks/bench_preview.py [-m 30]
+"""
+import argparse
+import base64
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_engine import PipEngine  # noqa: E402
+from pip_preview import PlanCache  # noqa: E402
+
+
+def build_wheel(directory, name, version, requires=()):
+    """生成一个可安装的最小wheel"""
+    module = name.replace('-', '_')
+    dist_info = f"{module}-{version}.dist-info"
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    metadata += ''.join(f"Requires-Dist: {requirement}\n" for requirement in requires)
+    files = {
+        f"{module}/__init__.py": f"VERSION = {version!r}\n".encode(),
+        f"{dist_info}/METADATA": metadata.encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = []
+    for path, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+        record.append(f"{path},sha256={digest},{len(data)}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ('\n'.join(record) + '\n').encode()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    with open(os.path.join(directory, f"{module}-{version}-py3-none-any.whl"), 'wb') as f:
+        f.write(buffer.getvalue())
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def pip(python, *args):
+    subprocess.run([python, '-m', 'pip', *args, '-q', '--disable-pip-version-check'],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def installed(python, names):
+    output = subprocess.run([python, '-m', 'pip', 'list', '--format=freeze', '--disable-pip-version-check'],
+                            check=True, capture_output=True, text=True).stdout
+    return {line for line in output.splitlines() if line.split('==')[0].lower() in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-m', '--packages', type=int, default=30, help='顶层包的依赖数量')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wheels = os.path.join(tmp, 'wheels')
+        os.makedirs(wheels)
+        deps = [f"preview-dep-{i:03d}" for i in range(args.packages)]
+        for name in deps:
+            for version in ('1.0', '1.1', '2.0'):
+                build_wheel(wheels, name, version)
+        build_wheel(wheels, 'preview-app', '1.0', [f"{name}<2" for name in deps])
+        names = {'preview-app', *deps}
+
+        venv = os.path.join(tmp, 'venv')
+        subprocess.run([sys.executable, '-m', 'venv', venv], check=True)
+        python = os.path.join(venv, 'Scripts' if os.name == 'nt' else 'bin', 'python')
+        options = ['--no-index', '--find-links', wheels]
+
+        engine = PipEngine(use_worker=False)
+        engine.plans = PlanCache(os.path.join(tmp, 'plans'))
+        engine.auto_snapshot = False
+        plans = timed('首次预览(pip --dry-run)', lambda: engine.preview(['preview-app'], options, [python]).result())
+        print(f"  {len(plans[0].changes)} 个变化")
+        plans = timed('再次预览(命中缓存)', lambda: engine.preview(['preview-app'], options, [python]).result())
+        assert plans[0].cached
+        timed('按计划安装(--no-deps)', lambda: engine.install_plans(plans).result())
+        pinned = installed(python, names)
+        engine.close()
+
+        pip(python, 'uninstall', '-y', *sorted(names))
+        timed('直接pip安装固定版本(--no-deps)', pip, python, 'install', *options, '--no-deps', *sorted(pinned))
+        pip(python, 'uninstall', '-y', *sorted(names))
+        timed('对比: 普通安装(pip解析依赖)', pip, python, 'install', *options, 'preview-app')
+        assert installed(python, names) == pinned
+        print(f"  两种方式安装的版本集合相同({len(pinned)} 个包)")
+
+
+if __name__ == '__main__':
+    main()
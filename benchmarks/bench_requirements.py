@@ -0,0 +1,89 @@
+"""需求文件比较基准测试：进程内判断已满足的需求 vs pip依赖解析
+
+生成包含N个分发包的合成site-packages和一个N行的需求文件(带版本范围、
+环境标记和少量未安装的包)，测量进程内解析+比较的耗时，以及让pip对
+已满足的部分做一次 `install --dry-run` 依赖解析的耗时(不访问网络)。
+
+用法: python benchmarks/bench_requirements.py [-n 300] [--missing 3]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import InventoryEngine, MODE_METADATA  # noqa: E402
+from pip_requirements import check_requirements, parse_requirements_txt  # noqa: E402
+
+
+def make_site_packages(root, count):
+    for i in range(count):
+        name = f"req-pkg-{i:04d}"
+        version = f"1.{i % 20}.0"
+        dist_info = os.path.join(root, f"{name.replace('-', '_')}-{version}.dist-info")
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, 'METADATA'), 'w', encoding='utf-8') as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\n")
+        with open(os.path.join(dist_info, 'RECORD'), 'w', encoding='utf-8') as f:
+            f.write('')
+
+
+def requirement_line(i):
+    name = f"req-pkg-{i:04d}"
+    kind = i % 4
+    if kind == 0:
+        return f"{name}==1.{i % 20}.0"
+    if kind == 1:
+        return f"{name}>=1.0,<2"
+    if kind == 2:
+        return f'{name}~=1.{i % 20} ; python_version >= "3.6"'
+    return f"{name}  # 不固定版本"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=300)
+    parser.add_argument('--missing', type=int, default=3, help='需求文件中未安装的包数量')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='pipmgr-req-')
+    try:
+        site = os.path.join(root, 'site')
+        make_site_packages(site, args.count)
+        satisfied_path = os.path.join(root, 'satisfied.txt')
+        full_path = os.path.join(root, 'requirements.txt')
+        lines = [requirement_line(i) for i in range(args.count - args.missing)]
+        with open(satisfied_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines + [f"not-installed-{i}>=1" for i in range(args.missing)]) + '\n')
+
+        records = InventoryEngine(mode=MODE_METADATA, paths=[site]).load()
+        start = time.perf_counter()
+        check = check_requirements(parse_requirements_txt(full_path).requirements, records)
+        in_process = time.perf_counter() - start
+        print(f"进程内比较: {in_process * 1000:.1f} ms  已满足 {len(check.satisfied)}，"
+              f"交给pip {len(check.unsatisfied)}: {' '.join(check.unsatisfied)}")
+
+        env = dict(os.environ, PYTHONPATH=site)
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-m', 'pip', 'install', '--dry-run', '--no-index',
+             '--disable-pip-version-check', '-r', satisfied_path],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True
+        )
+        resolver = time.perf_counter() - start
+        satisfied_lines = result.stdout.count('Requirement already satisfied')
+        print(f"pip依赖解析(仅已满足部分): {resolver * 1000:.0f} ms  "
+              f"(退出码 {result.returncode}，already satisfied {satisfied_lines} 行)")
+        print(f"跳过的解析耗时约为进程内比较的 {resolver / in_process:.0f} 倍")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
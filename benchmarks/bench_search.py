@@ -0,0 +1,70 @@
+"""包名过滤基准测试：线性扫描 vs PackageSearchIndex
+
+模拟逐字输入查询，比较baseline的 `query in name.lower()` 线性过滤与索引过滤
+每次按键的耗时，并检查拼写错误(如reqeusts)能否通过模糊匹配找到。
+
+用法: python benchmarks/bench_search.py [-n 100000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import PackageRecord, sort_records  # noqa: E402
+from pip_search import PackageSearchIndex  # noqa: E402
+
+
+WORDS = ['py', 'django', 'flask', 'requests', 'numpy', 'test', 'lib', 'data', 'json',
+         'http', 'async', 'cli', 'tools', 'ext', 'plugin', 'core', 'api', 'client',
+         'aws', 'sdk', 'azure', 'google', 'cloud', 'Sphinx', 'types']
+QUERIES = ['requests', 'django-rest', 'types_', 'pytest-cov', 'reqeusts', 'flsk']
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    names = {'requests', 'flask'}
+    while len(names) < count:
+        parts = [rng.choice(WORDS) for _ in range(rng.randint(1, 3))]
+        names.add(rng.choice('-_.').join(parts) + str(rng.randint(0, 9999)))
+    return sort_records(PackageRecord(n, '1.0', '', 'pip', None, None) for n in names)
+
+
+def linear_filter(records, query):
+    query = query.strip().lower()
+    return [pkg for pkg in records if query in pkg.name.lower()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    start = time.perf_counter()
+    index = PackageSearchIndex(records)
+    print(f"{len(records)} 个包，建立索引 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    linear, indexed = [], []
+    for query in QUERIES:
+        for i in range(1, len(query) + 1):
+            prefix = query[:i]
+            start = time.perf_counter()
+            linear_filter(records, prefix)
+            linear.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            index.search(prefix)
+            indexed.append((time.perf_counter() - start) * 1000)
+
+    print(f"线性过滤: 中位数 {statistics.median(linear):.2f} ms, 最大 {max(linear):.2f} ms")
+    print(f"索引过滤: 中位数 {statistics.median(indexed):.2f} ms, 最大 {max(indexed):.2f} ms")
+    for typo in ('reqeusts', 'flsk'):
+        found = [r.name for r in index.search(typo)[:3]]
+        print(f"模糊匹配 {typo!r}: {found}")
+
+
+if __name__ == '__main__':
+    main()
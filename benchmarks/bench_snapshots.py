@@ -0,0 +1,124 @@
+"""环境快照基准测试：保存和比较快照的耗时，保留wheel的开销，以及离线回滚
+
+1. 用N条合成记录测量保存快照(规范文本+sha256)和比较两个快照的耗时；
+2. 新建虚拟环境，从本地目录安装M个合成包的1.0版本，测量保存快照并把它们重新打包
+   保留到本地仓库的耗时(第一次)和再次保留(全部命中)的耗时；
+3. 把所有包升级到2.0后回滚到1.0的快照(--no-index，只用保留的wheel)，与从本地目录
+   重新安装1.0的耗时比较，并检查回滚后的版本集合与快照一致。其中一个包使用带本地
+   版本号的1.0+cu118(wheel文件名中保留 +)。
+
+用法: python benchmarks/bench_snapshots.py [-n 2000] [-m 30] [--size 200]
+"""
+import argparse
+import base64
+import collections
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_engine import PipEngine  # noqa: E402
+from pip_phases import format_bytes  # noqa: E402
+from pip_snapshots import SnapshotStore  # noqa: E402
+from pip_wheelhouse import Wheelhouse  # noqa: E402
+
+Record = collections.namedtuple('Record', ['name', 'version'])
+
+
+def build_wheel(directory, index, version, size):
+    """生成一个可安装的最小wheel，包含size字节的随机数据"""
+    name = f"snap_{index:04d}"
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        f"{name}/__init__.py": f"VERSION = {version!r}\n".encode(),
+        f"{name}/data.bin": os.urandom(size),
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: snap-{index:04d}\nVersion: {version}\n".encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = []
+    for path, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+        record.append(f"{path},sha256={digest},{len(data)}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ('\n'.join(record) + '\n').encode()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    with open(os.path.join(directory, f"{name}-{version}-py3-none-any.whl"), 'wb') as f:
+        f.write(buffer.getvalue())
+    return f"snap-{index:04d}"
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def pip_install(python, *args):
+    subprocess.run([python, '-m', 'pip', 'install', '-q', '--disable-pip-version-check', '--isolated', *args],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--records', type=int, default=2000, help='合成快照的包数量')
+    parser.add_argument('-m', '--packages', type=int, default=30, help='虚拟环境中安装的合成包数量')
+    parser.add_argument('--size', type=int, default=200, help='每个包的数据大小(KB)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(os.path.join(tmp, 'store'))
+        old = [Record(f"package-{i}", '1.0') for i in range(args.records)]
+        new = [Record(r.name, '2.0') if i % 10 == 0 else r for i, r in enumerate(old)]
+        new += [Record(f"extra-{i}", '1.0') for i in range(args.records // 100)]
+        first = timed(f'保存快照({args.records}个包)', store.take, 'python-a', old)
+        timed('保存相同的快照(去重)', store.take, 'python-a', old)
+        second = store.take('python-a', new)
+        store = SnapshotStore(store.directory)  # 不使用已解析的缓存
+        diff = timed('比较两个快照(首次读取)', store.diff, first.id, second.id)
+        timed('比较两个快照(已缓存)', store.diff, first.id, second.id)
+        print(f"  变化: +{len(diff.added)} -{len(diff.removed)} ~{len(diff.changed)}")
+
+        wheels = os.path.join(tmp, 'wheels')
+        os.makedirs(wheels)
+        names = [build_wheel(wheels, i, '1.0', args.size * 1000) for i in range(args.packages)]
+        # 带本地版本号的包(例如 torch 2.0.0+cu118)
+        names.append(build_wheel(wheels, args.packages, '1.0+cu118', args.size * 1000))
+        for i in range(args.packages + 1):
+            build_wheel(wheels, i, '2.0', args.size * 1000)
+        pins = [f"{name}==1.0" for name in names[:-1]] + [f"{names[-1]}==1.0+cu118"]
+        venv = os.path.join(tmp, 'venv')
+        subprocess.run([sys.executable, '-m', 'venv', venv], check=True)
+        python = os.path.join(venv, 'Scripts' if os.name == 'nt' else 'bin', 'python')
+        pip_install(python, '--no-index', '--find-links', wheels, *pins)
+
+        engine = PipEngine(use_worker=False)
+        engine.snapshots = SnapshotStore(os.path.join(tmp, 'engine-snapshots'))
+        engine.wheelhouse = Wheelhouse(os.path.join(tmp, 'wheelhouse'))
+        base = timed(f'快照并保留{args.packages}个包(首次)', engine.take_snapshot, python, '基线', retain=names)
+        timed('再次快照并保留(已在仓库中)', engine.take_snapshot, python, '基线', retain=names)
+        print(f"  本地仓库 {format_bytes(engine.wheelhouse.total_size())}")
+
+        pip_install(python, '--no-index', '--find-links', wheels, *[f"{name}==2.0" for name in names])
+        result = timed('离线回滚到1.0', lambda: engine.rollback(python, base.id).result())
+        assert not result.missing, result.missing
+        current = engine.take_snapshot(python, '回滚后')
+        assert current.id == base.id, engine.snapshots.diff(base.id, current.id)
+        print(f"  回滚后与快照一致(含 {pins[-1]})，安装 {len(result.installed)} 个")
+
+        pip_install(python, '--no-index', '--find-links', wheels, *[f"{name}==2.0" for name in names])
+        timed('对比: 从本地目录重装1.0(下限)', pip_install, python, '--no-index', '--find-links', wheels, *pins)
+        engine.close()
+
+
+if __name__ == '__main__':
+    main()
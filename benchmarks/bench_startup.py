@@ -0,0 +1,80 @@
+"""冷启动基准测试：重复启动程序的启动耗时测量模式，汇总各阶段耗时
+
+每次启动都以 --startup-timing 运行，程序在清单核对完成后自动退出，
+报告从日志目录的 startup.jsonl 读取(打包的窗口程序没有标准输出)。
+需要图形环境(Linux下可以在 xvfb-run 中运行)。
+
+用法:
+    python benchmarks/bench_startup.py [--repeat 5]
+    python benchmarks/bench_startup.py --exe dist/PipManagerGUI.exe   # PyInstaller打包版本
+    python benchmarks/bench_startup.py --no-cache                      # 每次启动前删除清单缓存
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pip_common import get_data_dir  # noqa: E402
+from pip_inventory import inventory_cache_path  # noqa: E402
+from pip_startup import FLAG, REPORT_FILE  # noqa: E402
+
+
+def read_last_report(path, offset):
+    with open(path, encoding='utf-8') as f:
+        f.seek(offset)
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    if not lines:
+        raise SystemExit("程序没有输出启动报告")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--exe', help='打包后的可执行文件，默认用当前解释器运行源码')
+    parser.add_argument('--no-cache', action='store_true', help='测量没有清单缓存时的启动')
+    parser.add_argument('--json', action='store_true', help='输出机器可读的汇总结果')
+    args = parser.parse_args()
+
+    if args.exe:
+        cmd = [args.exe, FLAG]
+    else:
+        cmd = [sys.executable, os.path.join(ROOT, 'pip_manager_tools.py'), FLAG]
+    report_path = os.path.join(get_data_dir('logs'), REPORT_FILE)
+
+    reports = []
+    for _ in range(args.repeat):
+        if args.no_cache and os.path.exists(inventory_cache_path()):
+            os.remove(inventory_cache_path())
+        offset = os.path.getsize(report_path) if os.path.exists(report_path) else 0
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True, timeout=120)
+        reports.append(read_last_report(report_path, offset))
+
+    phases = {}
+    for report in reports:
+        for name, ms in report['phases_ms'].items():
+            phases.setdefault(name, []).append(ms)
+    summary = {
+        'frozen': reports[0]['frozen'],
+        'cache': not args.no_cache,
+        'repeat': args.repeat,
+        'median_ms': {name: statistics.median(values) for name, values in phases.items()},
+        'total_median_ms': statistics.median(r['total_ms'] for r in reports),
+    }
+    if args.json:
+        print(json.dumps(summary))
+        return
+    print(f"{'打包版本' if summary['frozen'] else '源码'}，"
+          f"{'有' if summary['cache'] else '无'}清单缓存，{args.repeat} 次启动的中位数:")
+    for name, ms in summary['median_ms'].items():
+        print(f"  {name:<12} {ms:8.1f} ms")
+    print(f"  {'total':<12} {summary['total_median_ms']:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""文件校验基准测试：单进程与进程池计算哈希、缓存命中的再次校验，以及篡改检测
+
+在临时目录中生成N个合成包(每个包若干个随机数据文件，RECORD中带sha256)，分别测量：
+单进程校验、进程池校验(--workers，默认CPU数)、未变化时再次校验(全部命中缓存)、
+修改和删除少量文件后的增量校验，并检查这些文件都被报告出来。
+
+用法: python benchmarks/bench_verify.py [-n 200] [--files 20] [--size 64] [--workers 4]
+"""
+import argparse
+import base64
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_inventory import PackageRecord  # noqa: E402
+from pip_phases import format_bytes  # noqa: E402
+from pip_verify import VERIFY_DAMAGED, Verifier  # noqa: E402
+
+
+def make_site(site, count, files, size):
+    """生成count个包，每个包files个文件，文件大小在size/2~size*1.5之间"""
+    rng = random.Random(0)
+    records = []
+    total = 0
+    for i in range(count):
+        name = f"verify_pkg_{i:04d}"
+        dist_info = os.path.join(site, f"{name}-1.0.dist-info")
+        os.makedirs(os.path.join(site, name))
+        os.makedirs(dist_info)
+        rows = []
+        for j in range(files):
+            data = rng.randbytes(rng.randint(size // 2, size * 3 // 2))
+            relative = f"{name}/module_{j}.py"
+            with open(os.path.join(site, relative), 'wb') as f:
+                f.write(data)
+            digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+            rows.append(f"{relative},sha256={digest},{len(data)}")
+            total += len(data)
+        rows.append(f"{name}-1.0.dist-info/RECORD,,")
+        with open(os.path.join(dist_info, 'RECORD'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(rows) + '\n')
+        records.append(PackageRecord(name, '1.0', site, 'pip', None, dist_info))
+    return records, total
+
+
+def timed(label, verifier, records, total=None):
+    start = time.perf_counter()
+    results = verifier.verify(records)
+    elapsed = time.perf_counter() - start
+    rate = f"  {format_bytes(int(total / elapsed))}/s" if total else ''
+    damaged = sum(1 for result in results.values() if result.status == VERIFY_DAMAGED)
+    print(f"{label:<24} {elapsed * 1000:9.1f} ms{rate}  有问题的包 {damaged}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--packages', type=int, default=200)
+    parser.add_argument('--files', type=int, default=20, help='每个包的文件数')
+    parser.add_argument('--size', type=int, default=64, help='平均文件大小(KB)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程池大小')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        site = os.path.join(tmp, 'site-packages')
+        records, total = make_site(site, args.packages, args.files, args.size * 1024)
+        print(f"{args.packages} 个包，{args.packages * args.files} 个文件，共 {format_bytes(total)}，"
+              f"CPU {os.cpu_count()} 个")
+
+        timed('单进程', Verifier(os.path.join(tmp, 'single.json'), workers=1), records, total)
+        pooled = Verifier(os.path.join(tmp, 'pool.json'), workers=args.workers)
+        timed(f'进程池({args.workers}个进程)', pooled, records, total)
+        timed('再次校验(命中缓存)', pooled, records)
+
+        rng = random.Random(1)
+        changed = rng.sample(records, 5)
+        for record in changed[:3]:
+            with open(os.path.join(site, record.name, 'module_0.py'), 'ab') as f:
+                f.write(b'# modified\n')
+        for record in changed[3:]:
+            os.remove(os.path.join(site, record.name, 'module_1.py'))
+        results = timed('修改5个包后再次校验', pooled, records)
+        reported = {result.name for result in results.values() if result.status == VERIFY_DAMAGED}
+        assert reported == {record.name for record in changed}, reported
+        print("  被修改和删除的文件都已检出")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""本地wheel仓库基准测试：在本地模拟镜像上比较串行与并行(多镜像)预下载，以及离线安装
+
+生成N个合成wheel，启动两个本地简单索引(PEP 503 HTML，带sha256)模拟两个镜像，
+每个文件请求有固定延迟并按 --rate 限速。先用真实pip解析需求(--dry-run --report)，
+再分别测量：单连接串行下载、单镜像多连接、两个镜像多连接、再次预下载(全部命中)、
+按容量淘汰；最后在新建的虚拟环境中比较从仓库离线安装和从模拟索引安装的耗时。
+
+用法: python benchmarks/bench_wheelhouse.py [-n 40] [--size 200] [--rate 2000] [--no-install]
+"""
+import argparse
+import base64
+import hashlib
+import http.server
+import io
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pip_engine import PipEngine  # noqa: E402
+from pip_phases import format_bytes  # noqa: E402
+from pip_wheelhouse import Prefetcher, Wheelhouse, resolve_requirements  # noqa: E402
+
+
+def build_wheel(directory, index, size):
+    """生成一个可安装的最小wheel，包含size字节的随机数据(不可压缩)"""
+    name = f"pkg_{index:04d}"
+    filename = f"{name}-1.0-py3-none-any.whl"
+    dist_info = f"{name}-1.0.dist-info"
+    files = {
+        f"{name}/__init__.py": f"VALUE = {index}\n".encode(),
+        f"{name}/data.bin": os.urandom(size),
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: pkg-{index:04d}\nVersion: 1.0\n".encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = []
+    for path, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+        record.append(f"{path},sha256={digest},{len(data)}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ('\n'.join(record) + '\n').encode()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    with open(os.path.join(directory, filename), 'wb') as f:
+        f.write(buffer.getvalue())
+    return f"pkg-{index:04d}", filename
+
+
+def make_handler(directory, projects, latency, rate):
+    hashes = {}
+    for filename in projects.values():
+        with open(os.path.join(directory, filename), 'rb') as f:
+            hashes[filename] = hashlib.sha256(f.read()).hexdigest()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, body, content_type, throttle=False):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            chunk = 16 * 1024
+            for offset in range(0, len(body), chunk):
+                self.wfile.write(body[offset:offset + chunk])
+                if throttle and rate:
+                    time.sleep(chunk / (rate * 1000))
+
+        def do_GET(self):
+            time.sleep(latency)
+            parts = self.path.strip('/').split('/')
+            if parts[0] == 'simple' and len(parts) == 1:
+                body = ''.join(f'<a href="{name}/">{name}</a>' for name in projects).encode()
+                return self.send_body(body, 'text/html')
+            if parts[0] == 'simple' and parts[1] in projects:
+                filename = projects[parts[1]]
+                body = f'<a href="../../files/{filename}#sha256={hashes[filename]}">{filename}</a>'.encode()
+                return self.send_body(body, 'text/html')
+            if parts[0] == 'files' and parts[-1] in hashes:
+                with open(os.path.join(directory, parts[-1]), 'rb') as f:
+                    return self.send_body(f.read(), 'application/octet-stream', throttle=True)
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    return Handler
+
+
+def serve(port_queue, directory, projects, latency, rate):
+    """在独立进程中运行模拟镜像，避免与下载线程争用GIL"""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), make_handler(directory, projects, latency, rate))
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def timed_fetch(label, wheelhouse, mirrors, items, connections):
+    prefetcher = Prefetcher(wheelhouse, mirrors, connections=connections)
+    start = time.perf_counter()
+    results = prefetcher.fetch(items)
+    elapsed = time.perf_counter() - start
+    downloaded = [r for r in results if r.source]
+    by_source = {}
+    for result in downloaded:
+        by_source[result.source] = by_source.get(result.source, 0) + 1
+    total = sum(r.size for r in downloaded)
+    print(f"{label:<22} {elapsed * 1000:8.0f} ms  下载 {len(downloaded):>3} 个 ({format_bytes(total)})"
+          f"  {format_bytes(int(total / elapsed)) + '/s' if downloaded else ''}  "
+          f"{', '.join(f'{s}: {n}' for s, n in sorted(by_source.items()))}")
+    return elapsed
+
+
+def timed_install(label, python, args):
+    start = time.perf_counter()
+    subprocess.run([python, '-m', 'pip', 'install', '-q', '--disable-pip-version-check', *args],
+                   check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed * 1000:8.0f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=40, help='wheel数量')
+    parser.add_argument('--size', type=int, default=200, help='每个wheel的数据大小(KB)')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的服务器延迟(秒)')
+    parser.add_argument('--rate', type=float, default=2000, help='每个连接的限速(KB/s)，0表示不限速')
+    parser.add_argument('--connections', type=int, default=4, help='每个镜像的下载线程数')
+    parser.add_argument('--no-install', action='store_true', help='跳过离线安装比较')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files_dir = os.path.join(tmp, 'files')
+        os.makedirs(files_dir)
+        projects = dict(build_wheel(files_dir, i, args.size * 1000) for i in range(args.count))
+
+        mirrors = []
+        servers = []
+        for _ in range(2):
+            port_queue = multiprocessing.Queue()
+            server = multiprocessing.Process(
+                target=serve, args=(port_queue, files_dir, projects, args.latency, args.rate), daemon=True)
+            server.start()
+            servers.append(server)
+            mirrors.append(f'http://127.0.0.1:{port_queue.get(timeout=10)}/simple/')
+
+        engine = PipEngine(use_worker=False)
+        requirements = list(projects)
+        start = time.perf_counter()
+        items = resolve_requirements(requirements, engine.run_command, sys.executable,
+                                     index_url=mirrors[0], options=['--isolated'])
+        print(f"pip解析 {len(items)} 个文件: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        serial = timed_fetch('串行(1个连接)', Wheelhouse(os.path.join(tmp, 'wh1')), mirrors[:1], items, 1)
+        timed_fetch(f'1个镜像 x {args.connections}连接', Wheelhouse(os.path.join(tmp, 'wh2')),
+                    mirrors[:1], items, args.connections)
+        wheelhouse = Wheelhouse(os.path.join(tmp, 'wh3'))
+        parallel = timed_fetch(f'2个镜像 x {args.connections}连接', wheelhouse, mirrors, items, args.connections)
+        timed_fetch('再次预下载(已缓存)', wheelhouse, mirrors, items, args.connections)
+        print(f"并行加速: {serial / parallel:.1f}x，仓库 {format_bytes(wheelhouse.total_size())}")
+
+        limit = wheelhouse.total_size() // 2
+        start = time.perf_counter()
+        removed = wheelhouse.evict(limit)
+        print(f"LRU淘汰到 {format_bytes(limit)}: 删除 {len(removed)} 个文件，"
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        timed_fetch('补齐被淘汰的文件', wheelhouse, mirrors, items, args.connections)
+
+        if not args.no_install:
+            for label, options in (('从模拟索引安装', ['--isolated', '--index-url', mirrors[0]]),
+                                   ('从本地仓库离线安装', ['--isolated', *wheelhouse.install_options()])):
+                venv = os.path.join(tmp, 'venv-' + str(len(options)))
+                subprocess.run([sys.executable, '-m', 'venv', venv], check=True)
+                python = os.path.join(venv, 'Scripts' if os.name == 'nt' else 'bin', 'python')
+                timed_install(label, python, [*options, *requirements])
+
+        engine.close()
+        for server in servers:
+            server.terminate()
+
+
+if __name__ == '__main__':
+    main()
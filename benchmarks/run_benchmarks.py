@@ -0,0 +1,394 @@
+"""界面热点路径基准测试套件(可在无界面环境运行)
+
+生成可配置大小的合成site-packages和pip输出流，直接调用PipInstallerGUI的
+load_installed_packages、update_package_list、filter_packages、append_output
+和parse_error。这些方法借用到一个轻量的宿主对象上执行，不创建主窗口：
+有显示器(DISPLAY，包括Xvfb)时列表和输出框使用真实的Tk控件，否则使用替身控件。
+另外测量按RECORD统计磁盘占用(FootprintScanner)的冷统计和缓存命中耗时。
+
+结果写成JSON(包含提交号、Python版本和参数)，用 --compare 与之前的结果比较：
+    python benchmarks/run_benchmarks.py -o before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+
+用法: python benchmarks/run_benchmarks.py [--packages 5000] [--lines 20000] [--repeat 5]
+                                          [--headless] [-o 结果.json] [--compare 旧结果.json]
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from bench_inventory import make_site_packages  # noqa: E402
+from bench_output import FakeText  # noqa: E402
+from bench_package_list import FakeScrollbar, FakeTreeview  # noqa: E402
+from pip_deps import DependencyIndex  # noqa: E402
+from pip_engine import PipEngine  # noqa: E402
+from pip_footprint import DEFAULT_WORKERS, FootprintScanner  # noqa: E402
+from pip_envs import current_environment  # noqa: E402
+from pip_inventory import InventoryEngine, MODE_METADATA  # noqa: E402
+from pip_manager_tools import PipInstallerGUI  # noqa: E402
+from pip_output import OutputPipeline  # noqa: E402
+from pip_package_view import PackageListView  # noqa: E402
+from pip_search import PackageSearchIndex  # noqa: E402
+
+RESULT_VERSION = 1
+# 比较时最小耗时超过该比例视为变慢(最小值受系统噪声影响最小)
+DEFAULT_THRESHOLD = 0.15
+
+
+class FakeVar:
+    """StringVar替身(工作线程也会调用set)"""
+
+    def __init__(self, value=''):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class FakeEntry:
+    def __init__(self, text=''):
+        self.text = text
+
+    def get(self):
+        return self.text
+
+
+class GuiHost:
+    """借用PipInstallerGUI的方法；after()把回调放入队列，由基准测试在主线程中执行"""
+
+    load_installed_packages = PipInstallerGUI.load_installed_packages
+    _on_inventory_refreshed = PipInstallerGUI._on_inventory_refreshed
+    update_package_list = PipInstallerGUI.update_package_list
+    patch_package_list = PipInstallerGUI.patch_package_list
+    filter_packages = PipInstallerGUI.filter_packages
+    package_row_values = PipInstallerGUI.package_row_values
+    update_env_row = PipInstallerGUI.update_env_row
+    mark_startup = PipInstallerGUI.mark_startup
+    append_output = PipInstallerGUI.append_output
+    parse_error = PipInstallerGUI.parse_error
+    sort_rows = PipInstallerGUI.sort_rows
+
+    def __init__(self, site, headless, log_path):
+        self.startup_timer = None
+        self.callbacks = queue.SimpleQueue()
+        self.root = None
+        if headless:
+            tree, scrollbar, self.output_area = FakeTreeview(), FakeScrollbar(), FakeText()
+            self.env_tree = FakeTreeview()
+            self.flush = tree.update_idletasks
+        else:
+            import tkinter as tk
+            from tkinter import scrolledtext, ttk
+            self.root = tk.Tk()
+            self.root.geometry('800x600')
+            tree = ttk.Treeview(self.root, columns=('name', 'version', 'size', 'files', 'verify', 'outdated'),
+                                show='headings')
+            scrollbar = ttk.Scrollbar(self.root, orient=tk.VERTICAL, command=tree.yview)
+            self.env_tree = ttk.Treeview(self.root, columns=('packages',), show='headings')
+            self.output_area = scrolledtext.ScrolledText(self.root, state='disabled', height=10)
+            tree.pack(fill=tk.BOTH, expand=True)
+            self.output_area.pack(fill=tk.BOTH, expand=True)
+            self.root.update()
+            self.flush = self.root.update
+        self.status_var = FakeVar()
+        self.pkg_entry = FakeEntry()
+        self.outdated = {}
+        self.footprints = {}
+        self.verify_results = {}
+        self.sort_key = 'name'
+        self.installed_packages = []
+        self.active_env = current_environment()
+        self.engine = PipEngine(use_worker=False)
+        # 清单缓存写到临时目录，不覆盖当前解释器的真实缓存
+        self.cache_path = os.path.join(os.path.dirname(log_path), 'inventory.json')
+        self.reset_inventory(site)
+        self.search_index = PackageSearchIndex([])
+        self.package_view = PackageListView(tree, scrollbar, row_values=self.package_row_values)
+        self.output = OutputPipeline(self.output_area, log_path=log_path)
+
+    def reset_inventory(self, site):
+        """换成新的(无缓存)清单引擎，并交给引擎使用"""
+        self.inventory = InventoryEngine(mode=MODE_METADATA, paths=[site], cache_path=self.cache_path)
+        self.dep_index = DependencyIndex(environment={})
+        self.engine.inventories[self.inventory.python] = self.inventory
+        self.engine.dep_indexes[self.inventory.python] = self.dep_index
+
+    def start_footprint_scan(self):
+        pass  # 磁盘占用由bench_footprint单独测量
+
+    def after(self, ms, func, *args):
+        self.callbacks.put((func, args))
+
+    def after_cancel(self, after_id):
+        pass
+
+    def show_error(self, message, critical=False):
+        raise RuntimeError(message)
+
+    def run_pending(self, timeout=120):
+        """等待并执行一个after回调"""
+        func, args = self.callbacks.get(timeout=timeout)
+        func(*args)
+        self.flush()
+
+    def close(self):
+        self.output.stop()
+        self.engine.close()
+        if self.root is not None:
+            self.root.destroy()
+
+
+def pip_stream(count):
+    """合成的pip安装输出"""
+    templates = (
+        "Collecting package-{i}>=1.0 (from -r requirements.txt (line {i}))\n",
+        "  Downloading package_{i}-1.{i}.0-py3-none-any.whl (1.{i} MB)\n",
+        "  building 'ext_{i}' extension: gcc -pthread -O2 -fPIC -c src/module_{i}.c -o build/module_{i}.o\n",
+        "Requirement already satisfied: dependency-{i} in ./site-packages (from package-{i}) (2.0)\n",
+    )
+    return [templates[i % len(templates)].format(i=i) for i in range(count)]
+
+
+def error_outputs(count):
+    """合成的失败输出：较长的构建日志，最后一行为各类错误或无法识别的错误"""
+    endings = (
+        "ERROR: Could not find a version that satisfies the requirement nonexistent (from versions: none)\n",
+        "ERROR: Could not install packages due to an OSError: [Errno 104] Connection reset by peer\n",
+        "ERROR: Could not install packages due to an EnvironmentError: [Errno 13] Permission denied\n",
+        "ERROR: Cannot uninstall 'distutils-package'. It is a distutils installed project.\n",
+        "error: subprocess-exited-with-error\n",
+    )
+    body = ''.join(pip_stream(60))
+    return [body + endings[i % len(endings)] for i in range(count)]
+
+
+def summarize(timings, **extra):
+    result = {
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'runs': len(timings),
+    }
+    result.update(extra)
+    return result
+
+
+def bench_load(host, site, repeat):
+    """清单加载：冷加载(无缓存)、无变化的刷新、少量包变化后的增量刷新"""
+    timings = {'cold': [], 'warm': [], 'incremental': []}
+    for _ in range(repeat):
+        host.reset_inventory(site)
+        host.package_view.set_rows([])
+        for phase in ('cold', 'warm', 'incremental'):
+            if phase == 'incremental':
+                upgrade_dists(site, 20)
+            start = time.perf_counter()
+            host.load_installed_packages(rebuild_index=phase == 'cold')
+            host.run_pending()
+            timings[phase].append((time.perf_counter() - start) * 1000)
+    return {f'load_installed_packages.{phase}': summarize(values, packages=len(host.installed_packages))
+            for phase, values in timings.items()}
+
+
+def upgrade_dists(site, count):
+    """模拟pip升级若干个包：改名.dist-info目录并修改METADATA中的版本号"""
+    names = sorted(name for name in os.listdir(site) if name.endswith('.dist-info'))
+    for name in names[:count]:
+        project, version = name[:-len('.dist-info')].rsplit('-', 1)
+        new_version = f"{version}.post1" if '.post' not in version else version.split('.post')[0]
+        target = os.path.join(site, f"{project}-{new_version}.dist-info")
+        os.rename(os.path.join(site, name), target)
+        meta = os.path.join(target, 'METADATA')
+        with open(meta, encoding='utf-8') as f:
+            text = f.read()
+        with open(meta, 'w', encoding='utf-8') as f:
+            f.write(text.replace(f"Version: {version}\n", f"Version: {new_version}\n", 1))
+
+
+def bench_update(host, repeat):
+    records = host.installed_packages
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        host.update_package_list(records)
+        host.flush()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'update_package_list': summarize(timings, rows=len(records))}
+
+
+def bench_filter(host, repeat):
+    """逐字符输入查询，每次按键执行一次filter_packages"""
+    queries = ['synthetic-pkg-01', 'pkg 49', 'synthtic', 'zzz']
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            for end in range(1, len(query) + 1):
+                host.pkg_entry.text = query[:end]
+                start = time.perf_counter()
+                host.filter_packages()
+                host.flush()
+                timings.append((time.perf_counter() - start) * 1000)
+    host.pkg_entry.text = ''
+    host.filter_packages()
+    return {'filter_packages': summarize(timings, keystrokes=len(timings) // repeat)}
+
+
+def bench_output(host, lines, repeat):
+    """append_output写入整段pip输出后刷新到文本框"""
+    stream = pip_stream(lines)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in stream:
+            host.append_output(line)
+        host.output.drain(budget=None)
+        host.flush()
+        timings.append((time.perf_counter() - start) * 1000)
+    best = min(timings)
+    return {'append_output': summarize(timings, lines=lines, lines_per_s=lines / best * 1000)}
+
+
+def bench_parse_error(host, count, repeat):
+    outputs = error_outputs(count)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for output in outputs:
+            host.parse_error(output)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'parse_error': summarize(timings, outputs=count,
+                                     us_per_call=min(timings) * 1000 / count)}
+
+
+def bench_footprint(host, workdir, repeat):
+    """按RECORD统计磁盘占用：单线程和线程池的冷统计，以及按mtime命中缓存的再次统计"""
+    records = host.installed_packages
+    cache_path = os.path.join(workdir, 'footprints.json')
+    timings = {'cold_1thread': [], 'cold': [], 'warm': []}
+    for _ in range(repeat):
+        for phase in timings:
+            if phase != 'warm' and os.path.exists(cache_path):
+                os.remove(cache_path)
+            scanner = FootprintScanner(cache_path, workers=1 if phase == 'cold_1thread' else DEFAULT_WORKERS)
+            start = time.perf_counter()
+            scanner.measure(records)
+            timings[phase].append((time.perf_counter() - start) * 1000)
+    return {f'footprint.{phase}': summarize(values, packages=len(records)) for phase, values in timings.items()}
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                        stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(dirty)
+
+
+def compare(old, new, threshold):
+    """打印与之前结果的对比，返回变慢的项目"""
+    slower = []
+    print(f"\n与 {old['meta'].get('commit') or '?'} 比较(最小耗时):")
+    print(f"{'项目':<36} {'之前ms':>10} {'现在ms':>10} {'变化':>8}")
+    for name, result in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f"{name:<36} {'-':>10} {result['min_ms']:>10.3f} {'新增':>8}")
+            continue
+        change = result['min_ms'] / before['min_ms'] - 1 if before['min_ms'] else 0.0
+        mark = ''
+        if change > threshold:
+            mark = '  变慢'
+            slower.append(name)
+        print(f"{name:<36} {before['min_ms']:>10.3f} {result['min_ms']:>10.3f} {change:>+8.1%}{mark}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=5000, help='合成分发包数量')
+    parser.add_argument('--lines', type=int, default=20000, help='合成pip输出行数')
+    parser.add_argument('--errors', type=int, default=2000, help='parse_error处理的失败输出数量')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--headless', action='store_true', help='即使有显示器也使用替身控件')
+    parser.add_argument('-o', '--output', help='结果JSON路径(默认 benchmarks/results/<时间>-<提交>.json)')
+    parser.add_argument('--compare', help='与之前的结果JSON比较')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='视为变慢的比例')
+    args = parser.parse_args()
+
+    headless = args.headless or not (os.environ.get('DISPLAY') or sys.platform == 'win32')
+    commit, dirty = git_revision()
+    workdir = tempfile.mkdtemp(prefix='pipmgr-suite-')
+    try:
+        site = os.path.join(workdir, 'site-packages')
+        make_site_packages(site, args.packages)
+        host = GuiHost(site, headless, os.path.join(workdir, 'output.log'))
+        results = {}
+        try:
+            results.update(bench_load(host, site, args.repeat))
+            results.update(bench_update(host, args.repeat))
+            results.update(bench_filter(host, args.repeat))
+            results.update(bench_output(host, args.lines, args.repeat))
+            results.update(bench_parse_error(host, args.errors, args.repeat))
+            results.update(bench_footprint(host, workdir, args.repeat))
+        finally:
+            host.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    data = {
+        'version': RESULT_VERSION,
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'fake' if headless else 'tk',
+            'params': {'packages': args.packages, 'lines': args.lines,
+                       'errors': args.errors, 'repeat': args.repeat},
+        },
+        'results': results,
+    }
+    print(f"后端: {'替身控件' if headless else 'Tk'}，提交 {commit or '?'}{' (有未提交修改)' if dirty else ''}")
+    print(f"{'项目':<36} {'中位ms':>10} {'最小ms':>10} {'最大ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<36} {result['median_ms']:>10.3f} {result['min_ms']:>10.3f} {result['max_ms']:>10.3f}")
+
+    output = args.output
+    if output is None:
+        directory = os.path.join(BENCH_DIR, 'results')
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S') + f"-{commit or 'unknown'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        if old.get('meta', {}).get('params') != data['meta']['params']:
+            print("注意: 两次运行的参数不同，结果不可直接比较")
+        if compare(old, data, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""镜像项目名索引：索引中全部项目名保存为可内存映射的本地文件，用于输入框自动补全
+
+文件格式(本机字节序，header中记录)：
+    header   MAGIC, 字节序, 项目数n, 哈希表位数b
+    offsets  (n+1)个uint32，第i个名称在blob中的起止位置
+    table    2**b个uint32的开放寻址哈希表(crc32，线性探测)，值为名称序号+1，0为空槽
+    blob     按字节序排好的规范化名称，每个后跟一个换行符
+前缀查询在offsets上二分查找；模糊查询生成编辑距离为1的变体，用哈希表判断完整名称是否
+存在，并对删除/换位变体做前缀查询。查询只访问少量页面，不需要把整个文件读入内存
+(在90万个名称上均为毫秒级，见 benchmarks/bench_catalog.py)。
+
+更新：有上次的serial且索引支持PyPI的XML-RPC时，只取 changelog_since_serial 的变化；
+否则带 If-None-Match/If-Modified-Since 请求 /simple/，未变化时服务器返回304；只有
+这两种方式都不可用时才重新下载完整列表。
+"""
+import bisect
+import collections
+import gzip
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import xmlrpc.client
+import zlib
+from array import array
+from urllib.parse import urljoin, urlsplit
+from xml.parsers.expat import ExpatError
+
+from pip_common import get_data_dir, normalize_name
+from pip_outdated import ACCEPT, ConnectionPool
+
+
+MAGIC = b'PMCATLG1'
+_HEADER = struct.Struct('<8sBxxxII')  # MAGIC, 字节序(1为小端), 项目数, 哈希表位数
+DEFAULT_LIMIT = 20
+MAX_AGE = 24 * 3600  # 超过这个时间才在启动时自动更新
+DOWNLOAD_TIMEOUT = 120.0
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789-'
+_PROJECT_RE = re.compile(r'<a\s[^>]*>([^<]+)</a>', re.IGNORECASE)
+
+MODE_FULL = 'full'
+MODE_CHANGELOG = 'changelog'
+MODE_NOT_MODIFIED = 'not-modified'
+
+# 一次更新的结果：方式、新增和删除的项目数、总项目数、耗时(秒)
+CatalogUpdate = collections.namedtuple('CatalogUpdate', ['mode', 'added', 'removed', 'count', 'seconds'])
+
+
+def parse_project_list(body, content_type=''):
+    """解析 /simple/ 根页面(PEP 691 JSON或HTML)，返回规范化项目名列表和serial(没有时为None)"""
+    if 'json' in (content_type or ''):
+        data = json.loads(body)
+        names = [normalize_name(project['name']) for project in data.get('projects', [])]
+        return names, data.get('meta', {}).get('_last-serial')
+    text = body.decode('utf-8', 'replace') if isinstance(body, bytes) else body
+    return [normalize_name(name.strip()) for name in _PROJECT_RE.findall(text) if name.strip()], None
+
+
+def write_catalog(path, names):
+    """把项目名(任意顺序、可重复)写成索引文件(先写临时文件再替换)"""
+    encoded = sorted({name.encode('utf-8') for name in names if name})
+    count = len(encoded)
+    bits = max(4, (count * 2).bit_length())  # 装载因子不超过0.5
+    mask = (1 << bits) - 1
+    offsets = array('I', [0]) * (count + 1)
+    table = array('I', [0]) * (1 << bits)
+    position = 0
+    for index, name in enumerate(encoded):
+        offsets[index] = position
+        position += len(name) + 1
+        slot = zlib.crc32(name) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = index + 1
+    offsets[count] = position
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, sys.byteorder == 'little', count, bits))
+        offsets.tofile(f)
+        table.tofile(f)
+        f.write(b'\n'.join(encoded) + (b'\n' if encoded else b''))
+    os.replace(tmp, path)
+    return count
+
+
+class _Names:
+    """索引文件中按序排列的名称(bytes)，供bisect使用"""
+
+    def __init__(self, offsets, mapped, base):
+        self.offsets = offsets
+        self.mapped = mapped
+        self.base = base  # blob在文件中的起始位置
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.mapped[self.base + self.offsets[index]:self.base + self.offsets[index + 1] - 1]
+
+
+class ProjectCatalog:
+    """一个索引URL的项目名索引(查询线程安全；update()在后台线程中调用)"""
+
+    def __init__(self, index_url, directory=None, timeout=DOWNLOAD_TIMEOUT):
+        self.index_url = index_url.rstrip('/') + '/'
+        directory = directory or get_data_dir('catalog')
+        digest = hashlib.sha1(self.index_url.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(directory, f'{digest}.idx')
+        self.meta_path = os.path.join(directory, f'{digest}.json')
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._file = self._map = None
+        self._views = []
+        self._names = None
+        self._table = None
+        self._mask = 0
+        self.open()
+
+    # ---- 打开和关闭 ----
+
+    def open(self):
+        """映射索引文件，文件不存在或格式不符时返回False"""
+        with self._lock:
+            self._close()
+            try:
+                f = open(self.path, 'rb')
+            except OSError:
+                return False
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                f.close()
+                return False
+            magic, little, count, bits = _HEADER.unpack_from(mapped)
+            if magic != MAGIC or bool(little) != (sys.byteorder == 'little'):
+                mapped.close()
+                f.close()
+                return False
+            view = memoryview(mapped)
+            start = _HEADER.size
+            offsets = view[start:start + (count + 1) * 4].cast('I')
+            start += (count + 1) * 4
+            self._table = view[start:start + (4 << bits)].cast('I')
+            start += 4 << bits
+            self._views = [offsets, self._table, view]
+            self._names = _Names(offsets, mapped, start)
+            self._mask = (1 << bits) - 1
+            self._file, self._map = f, mapped
+            return True
+
+    def _close(self):
+        if self._map is not None:
+            for view in self._views:
+                view.release()
+            self._views = []
+            self._names = self._table = None
+            self._map.close()
+            self._file.close()
+            self._file = self._map = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __len__(self):
+        return len(self._names) if self._names is not None else 0
+
+    def names(self):
+        """全部项目名(bytes列表)"""
+        with self._lock:
+            if self._names is None:
+                return []
+            return self._map[self._names.base:].split(b'\n')[:-1]
+
+    # ---- 查询 ----
+
+    def contains(self, name):
+        with self._lock:
+            return self._contains(normalize_name(name).encode('utf-8'))
+
+    def _contains(self, key):
+        if self._names is None:
+            return False
+        table, mask, names = self._table, self._mask, self._names
+        slot = zlib.crc32(key) & mask
+        while True:
+            value = table[slot]
+            if not value:
+                return False
+            if names[value - 1] == key:
+                return True
+            slot = (slot + 1) & mask
+
+    def _prefix(self, key, limit):
+        names = self._names
+        index = bisect.bisect_left(names, key)
+        results = []
+        while index < len(names) and len(results) < limit:
+            name = names[index]
+            if not name.startswith(key):
+                break
+            results.append(name)
+            index += 1
+        return results
+
+    def prefix(self, query, limit=DEFAULT_LIMIT):
+        """以query开头的项目名(按字母顺序)"""
+        key = normalize_name(query.strip()).encode('utf-8')
+        with self._lock:
+            if self._names is None or not key:
+                return []
+            return [name.decode('utf-8') for name in self._prefix(key, limit)]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """补全候选：前缀匹配，不足时补充编辑距离为1的模糊匹配"""
+        key = normalize_name(query.strip()).encode('utf-8')
+        with self._lock:
+            if self._names is None or not key:
+                return []
+            results = self._prefix(key, limit)
+            if len(results) < limit and len(key) >= 3:
+                seen = set(results)
+                results += [name for name in self._fuzzy(key, limit) if name not in seen]
+            return [name.decode('utf-8') for name in results[:limit]]
+
+    def _fuzzy(self, key, limit):
+        """编辑距离为1的变体：完整名称查哈希表，删除/换位变体再做前缀查询
+
+        与输入的共同前缀越长越靠前，其次按常见的输入错误：换位、多打、打错、漏打一个字符。
+        """
+        text = key.decode('utf-8')
+        transposes = [text[:i] + text[i + 1] + text[i] + text[i + 2:] for i in range(len(text) - 1)]
+        deletes = [text[:i] + text[i + 1:] for i in range(len(text))]
+        replaces = [text[:i] + c + text[i + 1:] for i in range(len(text)) for c in _ALPHABET]
+        inserts = [text[:i] + c + text[i:] for i in range(len(text) + 1) for c in _ALPHABET]
+        matches = []
+        seen = {key}
+        for kind, variants in enumerate((transposes, deletes, replaces, inserts)):
+            for variant in variants:
+                encoded = variant.encode('utf-8')
+                if encoded not in seen:
+                    seen.add(encoded)
+                    if self._contains(encoded):
+                        common = len(os.path.commonprefix([key, encoded]))
+                        matches.append((-common, kind, encoded))
+        results = [encoded for _, _, encoded in sorted(matches)]
+        for variant in transposes + deletes:
+            if len(results) >= limit:
+                break
+            if len(variant) >= 3:
+                for name in self._prefix(variant.encode('utf-8'), limit - len(results)):
+                    if name not in seen:
+                        seen.add(name)
+                        results.append(name)
+        return results[:limit]
+
+    # ---- 更新 ----
+
+    def load_meta(self):
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_meta(self, meta):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.meta_path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def stale(self, max_age=MAX_AGE):
+        """没有索引，或上次检查已超过max_age秒"""
+        return not len(self) or time.time() - self.load_meta().get('checked', 0) > max_age
+
+    def update(self):
+        """增量更新索引，返回CatalogUpdate"""
+        start = time.perf_counter()
+        meta = self.load_meta()
+        meta['url'] = self.index_url
+        if len(self) and meta.get('serial') and meta.get('changelog', True):
+            try:
+                entries = self._changelog(meta['serial'])
+            except (OSError, http.client.HTTPException, xmlrpc.client.Error, ExpatError, ValueError):
+                # 该索引不支持XML-RPC(包括对POST返回HTML页面的镜像)，以后直接用条件请求
+                meta['changelog'] = False
+            else:
+                added, removed = self._apply_changelog(entries, meta)
+                meta['checked'] = time.time()
+                self.save_meta(meta)
+                return CatalogUpdate(MODE_CHANGELOG, added, removed, len(self), time.perf_counter() - start)
+
+        headers = {'Accept': ACCEPT, 'Accept-Encoding': 'gzip'}
+        if len(self):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        status, response_headers, body = self._get(self.index_url, headers)
+        meta['checked'] = time.time()
+        if status == 304:
+            self.save_meta(meta)
+            return CatalogUpdate(MODE_NOT_MODIFIED, 0, 0, len(self), time.perf_counter() - start)
+        if status != 200:
+            raise OSError(f"HTTP {status}: {self.index_url}")
+        if response_headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        names, serial = parse_project_list(body, response_headers.get('Content-Type', ''))
+        serial = serial or response_headers.get('X-PyPI-Last-Serial')
+        old = set(self.names()) if len(self) else set()
+        new = {name.encode('utf-8') for name in names}
+        self._replace(new)
+        meta.update(etag=response_headers.get('ETag'), last_modified=response_headers.get('Last-Modified'),
+                    serial=int(serial) if serial else None, changelog=True)
+        self.save_meta(meta)
+        return CatalogUpdate(MODE_FULL, len(new - old), len(old - new) if old else 0, len(self),
+                             time.perf_counter() - start)
+
+    def _get(self, url, headers):
+        pool = ConnectionPool(timeout=self.timeout, size=1)
+        try:
+            for _ in range(3):
+                status, response_headers, body = pool.request(url, headers)
+                if status not in (301, 302, 303, 307, 308):
+                    return status, response_headers, body
+                url = urljoin(url, response_headers.get('Location', ''))
+            raise OSError(f"重定向次数过多: {url}")
+        finally:
+            pool.close()
+
+    def _changelog(self, serial):
+        """PyPI XML-RPC changelog_since_serial：[(项目名, 版本, 时间戳, 操作, serial)]"""
+        parts = urlsplit(self.index_url)
+        cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        conn = cls(parts.hostname, parts.port, timeout=self.timeout)
+        try:
+            body = xmlrpc.client.dumps((serial,), 'changelog_since_serial').encode('utf-8')
+            conn.request('POST', '/pypi', body, {'Content-Type': 'text/xml'})
+            response = conn.getresponse()
+            data = response.read()
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise OSError(f"HTTP {response.status}")
+        (entries,), _ = xmlrpc.client.loads(data)
+        return entries
+
+    def _apply_changelog(self, entries, meta):
+        """按变化记录增删项目名，有变化时重写索引文件，返回 (新增数, 删除数)"""
+        added, removed = set(), set()
+        for name, _version, _timestamp, action, serial in entries:
+            key = normalize_name(name).encode('utf-8')
+            if action == 'remove project':
+                added.discard(key)
+                removed.add(key)
+            else:
+                removed.discard(key)
+                added.add(key)
+            meta['serial'] = max(meta.get('serial') or 0, serial)
+        with self._lock:
+            added = {key for key in added if not self._contains(key)}
+            removed = {key for key in removed if self._contains(key)}
+        if added or removed:
+            names = set(self.names())
+            names |= added
+            names -= removed
+            self._replace(names)
+        return len(added), len(removed)
+
+    def _replace(self, names):
+        with self._lock:
+            self._close()  # Windows下不能替换仍被映射的文件
+        write_catalog(self.path, (name.decode('utf-8') for name in names))
+        self.open()
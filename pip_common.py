@@ -0,0 +1,45 @@
+"""pip管理工具的公共辅助函数"""
+import os
+import re
+import subprocess
+import sys
+
+
+# Windows下启动子进程时不弹出控制台窗口
+CREATE_NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+
+# 本地wheel仓库预下载(pip_wheelhouse)的默认连接数和结果状态；界面和命令行启动时
+# 只需要这些常量，不必导入pip_wheelhouse(http.client、ssl、shutil)
+PREFETCH_CONNECTIONS = 4  # 每个镜像的下载线程数
+PREFETCH_CACHED = 'cached'
+PREFETCH_DOWNLOADED = 'downloaded'
+PREFETCH_FAILED = 'failed'
+
+PREFETCH_NAMES = {
+    PREFETCH_CACHED: '已在仓库中',
+    PREFETCH_DOWNLOADED: '已下载',
+    PREFETCH_FAILED: '下载失败',
+}
+
+_NORMALIZE_RE = re.compile(r"[-_.]+")
+
+
+def normalize_name(name):
+    """按PEP 503规范化包名"""
+    return _NORMALIZE_RE.sub("-", name).lower()
+
+
+def wheel_version(version):
+    """wheel文件名中的版本部分：只把 - 换成 _(本地版本的 + 和 . 保持不变)"""
+    return version.replace('-', '_')
+
+
+def get_data_dir(*parts):
+    """返回(并创建)程序的缓存/数据目录"""
+    if os.name == 'nt':
+        base = os.getenv('LOCALAPPDATA') or os.getenv('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    path = os.path.join(base, 'PipManagerGUI', *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,141 @@
+"""安装后的并行字节码编译
+
+pip在安装时逐个编译 .py 文件，大型包的编译时间占安装时间的相当一部分。启用后安装命令
+加上 --no-compile，pip结束后从新安装的包的RECORD中取出 .py 文件，按文件大小均分给多个
+`python -m compileall -i -` 进程(目标环境的解释器，每个进程从标准输入读取文件列表)同时编译。
+优化级别通过解释器的 -O/-OO 选项传递，旧版本Python的compileall也能使用。生成的 .pyc 像pip
+自己编译时一样补记到RECORD中，卸载时会一并删除。
+"""
+import collections
+import concurrent.futures
+import csv
+import os
+import posixpath
+import re
+import subprocess
+import time
+
+from pip_common import CREATE_NO_WINDOW, normalize_name
+
+
+OPTIMIZE_LEVELS = (0, 1, 2)
+# 随任务选项进入安装队列的伪选项(不传给pip)，同一批任务的优化级别一致
+COMPILE_OPTION = '--parallel-compile='
+OPTIMIZE_NAMES = {
+    0: '不优化',
+    1: '-O (去掉assert)',
+    2: '-OO (再去掉文档字符串)',
+}
+
+# 一次并行编译：文件数、编译失败的文件数、实际耗时(秒)、进程数
+CompileResult = collections.namedtuple('CompileResult', ['files', 'failed', 'wall', 'workers'])
+
+_INSTALLED_RE = re.compile(r"^Successfully installed (.+)")
+
+
+def compile_option(level):
+    """安装后以优化级别level并行编译的伪选项"""
+    return f'{COMPILE_OPTION}{level}'
+
+
+def split_compile_option(options):
+    """从选项中取出并行编译的优化级别(没有时为None)，返回(级别, 其余的pip选项)"""
+    level, rest = None, []
+    for option in options:
+        if option.startswith(COMPILE_OPTION):
+            level = int(option[len(COMPILE_OPTION):])
+        else:
+            rest.append(option)
+    return level, rest
+
+
+def installed_names(lines):
+    """pip输出中 "Successfully installed a-1.0 b-2.0" 列出的规范化包名"""
+    names = set()
+    for line in lines:
+        match = _INSTALLED_RE.match(line)
+        if match:
+            names.update(normalize_name(item.rsplit('-', 1)[0]) for item in match.group(1).split())
+    return names
+
+
+def source_files(record):
+    """RECORD中site目录内的 .py 文件(绝对路径)；没有RECORD时为空列表"""
+    if not record.path or not record.path.endswith('.dist-info'):
+        return []
+    try:
+        with open(os.path.join(record.path, 'RECORD'), encoding='utf-8', newline='') as f:
+            rows = [row[0] for row in csv.reader(f) if row]
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return []
+    # 脚本等site目录外的文件pip也不编译
+    return [os.path.normpath(os.path.join(record.location, path)) for path in rows
+            if path.endswith('.py') and not path.startswith('..')]
+
+
+def record_compiled(record):
+    """把 .py 文件旁 __pycache__ 中的 .pyc 补记到RECORD(不带哈希，与pip一致)，返回补记的条数"""
+    path = os.path.join(record.path, 'RECORD')
+    try:
+        with open(path, encoding='utf-8', newline='') as f:
+            text = f.read()
+        listed = {row[0] for row in csv.reader(text.splitlines()) if row}
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return 0
+    added = []
+    for relative in sorted(listed):
+        if not relative.endswith('.py') or relative.startswith('..'):
+            continue
+        directory, name = posixpath.split(relative)
+        cache = posixpath.join(directory, '__pycache__')
+        try:
+            entries = os.listdir(os.path.join(record.location, cache))
+        except OSError:
+            continue
+        # 模块名.解释器标签[.opt-N].pyc
+        pattern = re.compile(re.escape(name[:-3]) + r"\.[\w-]+(?:\.opt-\d)?\.pyc")
+        added.extend(posixpath.join(cache, entry) for entry in entries
+                     if pattern.fullmatch(entry) and posixpath.join(cache, entry) not in listed)
+    if added:
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            if text and not text.endswith('\n'):
+                f.write('\r\n')
+            csv.writer(f).writerows([entry, '', ''] for entry in sorted(set(added)))
+    return len(set(added))
+
+
+def split_chunks(files, count):
+    """按文件大小把文件分成count组(大文件优先，每次放入当前最小的一组)"""
+    sized = []
+    for path in files:
+        try:
+            sized.append((os.path.getsize(path), path))
+        except OSError:
+            pass
+    sized.sort(reverse=True)
+    chunks = [[0, []] for _ in range(max(1, min(count, len(sized))))]
+    for size, path in sized:
+        chunk = min(chunks, key=lambda c: c[0])
+        chunk[0] += size
+        chunk[1].append(path)
+    return [paths for _size, paths in chunks if paths]
+
+
+def compile_files(python, files, optimize=0, workers=None, creationflags=CREATE_NO_WINDOW):
+    """用workers个compileall进程并行编译files，返回CompileResult"""
+    chunks = split_chunks(files, workers or os.cpu_count() or 1)
+    flags = ['-' + 'O' * optimize] if optimize else []
+    start = time.perf_counter()
+
+    def run(paths):
+        process = subprocess.run([python, *flags, '-m', 'compileall', '-q', '-i', '-'],
+                                 input='\n'.join(paths) + '\n', stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 universal_newlines=True, creationflags=creationflags)
+        # -q 时只输出编译失败的文件(例如只支持Python 2的模块，pip也会忽略这些错误)
+        return sum(1 for line in process.stdout.splitlines() if line.startswith('*** Error compiling'))
+
+    if not chunks:
+        return CompileResult(0, 0, 0.0, 0)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        results = list(pool.map(run, chunks))
+    return CompileResult(sum(len(paths) for paths in chunks), sum(results), time.perf_counter() - start, len(chunks))
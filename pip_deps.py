@@ -0,0 +1,208 @@
+"""依赖关系索引：根据各分发包的Requires-Dist建立正向/反向依赖图，用于卸载前的影响分析
+
+环境标记(markers)按当前解释器求值，不满足的依赖不计入；只在某个extra下才需要的
+依赖保留extra名称，显示为 "包名[extra]"。每个标记字符串只求值一次。
+索引按PackageRecord增量更新，只重新读取新增或变化的分发包。
+"""
+import collections
+import os
+import re
+import threading
+
+from pip_common import normalize_name
+
+
+# 一条依赖：依赖的规范化包名、原始需求字符串、所属extra(没有则为None)
+Dependency = collections.namedtuple('Dependency', ['name', 'requirement', 'extra'])
+
+# 卸载分析结果：{被卸载的包: [(依赖它的包, Dependency)]}，以及可以一并卸载的孤立依赖
+RemovalPlan = collections.namedtuple('RemovalPlan', ['dependents', 'orphans'])
+
+_REQUIREMENT_RE = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_EXTRA_RE = re.compile(r"""\bextra\s*==\s*['"]([^'"]+)['"]""")
+
+
+def read_requires(meta_path):
+    """读取元数据目录中的依赖声明，返回 (需求字符串, 标记字符串) 列表"""
+    if meta_path.endswith('.dist-info'):
+        return _read_requires_dist(os.path.join(meta_path, 'METADATA'))
+    if os.path.isdir(meta_path):
+        return _read_requires_txt(os.path.join(meta_path, 'requires.txt'))
+    return []
+
+
+def _read_requires_dist(path):
+    requires = []
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line in ('\n', '\r\n'):
+                    break
+                if line.startswith('Requires-Dist:'):
+                    requirement, _, marker = line[14:].partition(';')
+                    requires.append((requirement.strip(), marker.strip()))
+    except OSError:
+        pass
+    return requires
+
+
+def _read_requires_txt(path):
+    """egg-info的requires.txt：[extra]、[extra:marker] 或 [:marker] 分节"""
+    requires = []
+    section_marker = ''
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('['):
+                    extra, _, marker = line[1:-1].partition(':')
+                    markers = [f'({marker})'] if marker else []
+                    if extra:
+                        markers.append(f'extra == "{extra}"')
+                    section_marker = ' and '.join(markers)
+                    continue
+                requirement, _, marker = line.partition(';')
+                marker = ' and '.join(m for m in (section_marker, marker.strip()) if m)
+                requires.append((requirement.strip(), marker))
+    except OSError:
+        pass
+    return requires
+
+
+class DependencyIndex:
+    """已安装分发包之间的依赖图(线程安全)"""
+
+    def __init__(self, environment=None):
+        self.environment = environment  # 标记求值环境，默认当前解释器
+        self._records = {}  # 规范化包名 -> PackageRecord
+        self._requires = {}  # 规范化包名 -> [Dependency]
+        self._requested = {}  # 规范化包名 -> 是否由用户直接安装
+        self._reverse = {}  # 规范化包名 -> {依赖它的包名: Dependency}
+        self._markers = {}  # 标记字符串 -> (是否满足, extra)
+        self._lock = threading.Lock()
+
+    def update(self, records):
+        """与新的清单同步，只解析新增或变化的记录，返回重新解析的数量"""
+        current = {normalize_name(r.name): r for r in records}
+        with self._lock:
+            parsed = 0
+            for key in list(self._records):
+                if key not in current:
+                    self._forget(key)
+            for key, record in current.items():
+                if self._records.get(key) == record:
+                    continue
+                self._forget(key)
+                self._records[key] = record
+                self._requires[key] = self._parse(record)
+                self._requested[key] = self._is_requested(record)
+                parsed += 1
+            # 反向索引只依赖于正向边，整体重建比逐条维护更简单且足够快
+            reverse = {}
+            for key, dependencies in self._requires.items():
+                for dep in dependencies:
+                    users = reverse.setdefault(dep.name, {})
+                    existing = users.get(key)
+                    if existing is None or (existing.extra and not dep.extra):
+                        users[key] = dep  # 同时有必需依赖和extra依赖时显示必需的
+            self._reverse = reverse
+            return parsed
+
+    def _forget(self, key):
+        self._records.pop(key, None)
+        self._requires.pop(key, None)
+        self._requested.pop(key, None)
+
+    def _parse(self, record):
+        if not record.path:
+            return []  # pip list 回退模式没有元数据路径
+        dependencies = []
+        seen = set()
+        for requirement, marker in read_requires(record.path):
+            match = _REQUIREMENT_RE.match(requirement)
+            if not match:
+                continue
+            active, extra = self._marker(marker) if marker else (True, None)
+            if not active:
+                continue
+            name = normalize_name(match.group(1))
+            if name == normalize_name(record.name):
+                continue  # 例如 foo[all] 依赖 foo[extra]
+            if (name, extra) not in seen:
+                seen.add((name, extra))
+                dependencies.append(Dependency(name, requirement, extra))
+        return dependencies
+
+    def _marker(self, marker):
+        """按当前环境求值标记；extra条件替换为对应extra已启用"""
+        try:
+            return self._markers[marker]
+        except KeyError:
+            pass
+        match = _EXTRA_RE.search(marker)
+        extra = normalize_name(match.group(1)) if match else None
+        try:
+            from packaging.markers import Marker
+            environment = dict(self.environment or {})
+            environment['extra'] = extra or ''
+            active = Marker(marker).evaluate(environment)
+        except Exception:
+            active = True  # 无法解析的标记按需要处理，避免误判为孤立
+        self._markers[marker] = (active, extra)
+        return active, extra
+
+    def _is_requested(self, record):
+        """pip为用户直接安装的包写入REQUESTED；无法判断时视为直接安装"""
+        if not record.path or not record.path.endswith('.dist-info'):
+            return True
+        return os.path.exists(os.path.join(record.path, 'REQUESTED'))
+
+    def name_of(self, key):
+        record = self._records.get(key)
+        return record.name if record is not None else key
+
+    def requires(self, name):
+        """name直接依赖的已安装包"""
+        with self._lock:
+            return [dep for dep in self._requires.get(normalize_name(name), [])
+                    if dep.name in self._records]
+
+    def dependents(self, name):
+        """直接依赖name的已安装包，返回 [(包名, Dependency)]"""
+        with self._lock:
+            reverse = self._reverse.get(normalize_name(name), {})
+            return sorted(((self.name_of(key), dep) for key, dep in reverse.items()),
+                          key=lambda item: item[0].lower())
+
+    def removal_plan(self, names):
+        """分析卸载names的影响
+
+        dependents 只列出不在卸载集合内的依赖方；orphans 是卸载后不再被任何剩余包
+        依赖、且不是用户直接安装的包(逐层展开)。
+        """
+        with self._lock:
+            removing = {normalize_name(name) for name in names}
+            dependents = {}
+            for key in sorted(removing):
+                users = [(self.name_of(user), dep)
+                         for user, dep in self._reverse.get(key, {}).items()
+                         if user not in removing]
+                if users:
+                    dependents[self.name_of(key)] = sorted(users, key=lambda item: item[0].lower())
+
+            orphans = []
+            changed = True
+            while changed:
+                changed = False
+                candidates = {dep.name for key in removing for dep in self._requires.get(key, [])
+                              if dep.name in self._records and dep.name not in removing}
+                for key in sorted(candidates):
+                    if self._requested.get(key, True):
+                        continue
+                    if all(user in removing for user in self._reverse.get(key, {})):
+                        removing.add(key)
+                        orphans.append(self.name_of(key))
+                        changed = True
+            return RemovalPlan(dependents, orphans)
@@ -0,0 +1,688 @@
+"""核心引擎：不依赖Tk的清单、安装、卸载和镜像源切换接口
+
+图形界面(pip_manager_tools)和命令行(pip_manager_cli)都是它的客户端。耗时操作
+返回concurrent.futures.Future，结果为结构化的namedtuple；过程中的事件以
+listener(job, event, data) 回调通知(在工作线程中调用)：
+    'status'、'output'、'trace'、'idle'  安装队列事件(job为InstallJob)
+    'command'    即将执行一条pip命令(data为命令列表)
+    'uninstall'  一个包卸载完成(data为UninstallResult)
+    'prefetch'   一个文件预下载到本地仓库(data为pip_wheelhouse.PrefetchResult)
+    'failover'   安装遇到网络错误，改用其它镜像重试(data为 (原镜像, 新镜像) 名称)
+    'snapshot'   保存了一个环境快照(data为pip_snapshots.Snapshot)
+"""
+import collections
+import concurrent.futures
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from pip_common import CREATE_NO_WINDOW, PREFETCH_CONNECTIONS, normalize_name
+from pip_compile import compile_files, installed_names, record_compiled, source_files, split_compile_option
+from pip_deps import DependencyIndex
+from pip_envs import marker_environment, scan_inventories
+from pip_footprint import FootprintScanner
+from pip_inventory import InventoryEngine
+from pip_jobs import FAILED, SUCCEEDED, InstallQueue, requirement_name
+from pip_phases import with_progress
+from pip_preview import (InstallPlan, PlanCache, index_url_of, inventory_fingerprint, pinned_requirements,
+                         plan_key, resolve_plan)
+from pip_snapshots import SnapshotStore, dependency_closure, retain_wheels
+from pip_uninstall import FAILED as UNINSTALL_FAILED, bulk_uninstall
+from pip_verify import Verifier
+from pip_worker import WorkerError, get_worker, interpreter_key, pip_available, pip_version, stop_workers
+
+
+# 预设镜像源
+PIP_CONFIGS = {
+    'default': {'url': 'https://pypi.org/simple', 'trusted_host': 'pypi.org'},
+    'tsinghua': {'url': 'https://pypi.tuna.tsinghua.edu.cn/simple', 'trusted_host': 'pypi.tuna.tsinghua.edu.cn'},
+    'aliyun': {'url': 'https://mirrors.aliyun.com/pypi/simple/', 'trusted_host': 'mirrors.aliyun.com'},
+    'douban': {'url': 'https://pypi.douban.com/simple/', 'trusted_host': 'pypi.douban.com'},
+    'ustc': {'url': 'https://pypi.mirrors.ustc.edu.cn/simple/', 'trusted_host': 'pypi.mirrors.ustc.edu.cn'},
+    'tencent': {'url': 'https://mirrors.cloud.tencent.com/pypi/simple', 'trusted_host': 'mirrors.cloud.tencent.com'}
+}
+
+# 中文名称
+DISPLAY_NAMES = {
+    'default': '默认官方源',
+    'tsinghua': '清华大学',
+    'aliyun': '阿里云',
+    'douban': '豆瓣',
+    'ustc': '中科大',
+    'tencent': '腾讯云',
+    'custom': '自定义源'
+}
+
+# 一个安装任务的结果：解释器、需求、状态(SUCCEEDED/FAILED)、错误说明、pip输出
+InstallResult = collections.namedtuple('InstallResult', ['python', 'requirement', 'status', 'reason', 'output'])
+
+# 一个包的卸载结果：解释器、包名、状态(pip_uninstall的REMOVED/SKIPPED/FAILED)
+UninstallResult = collections.namedtuple('UninstallResult', ['python', 'name', 'status'])
+
+# 一次回滚的结果：解释器、目标快照、安装的需求、卸载的包名、仓库中缺少的wheel、状态(SUCCEEDED/FAILED)
+RollbackResult = collections.namedtuple('RollbackResult',
+                                        ['python', 'snapshot', 'installed', 'removed', 'missing', 'status'])
+
+# 常见错误信息 -> 说明
+_ERROR_PATTERNS = [
+    (re.compile(r"ERROR: Could not find a version that satisfies the requirement (\w+)", re.IGNORECASE),
+     "包不存在或名称错误"),
+    (re.compile(r"ERROR: Could not install packages due to an OSError", re.IGNORECASE),
+     "网络连接失败，请检查镜像源"),
+    (re.compile(r"ERROR: Could not install packages due to an EnvironmentError: \[Errno 13\]", re.IGNORECASE),
+     "权限不足，请尝试管理员权限运行"),
+    (re.compile(r"ERROR: Cannot uninstall '.*'", re.IGNORECASE),
+     "依赖冲突，请使用--user参数"),
+]
+
+# 网络类失败(换一个镜像可能成功)；权限和磁盘错误同样以OSError报告，需要排除
+_NETWORK_RE = re.compile(
+    r"Could not install packages due to an OSError|Could not fetch URL|NewConnectionError|"
+    r"ConnectTimeoutError|ReadTimeoutError|Max retries exceeded|ProxyError|SSLError|"
+    r"Temporary failure in name resolution|Name or service not known|getaddrinfo failed|"
+    r"Connection (?:refused|reset|aborted)|HTTP error 5\d\d|IncompleteRead|ProtocolError",
+    re.IGNORECASE)
+_LOCAL_OSERROR_RE = re.compile(r"\[Errno (?:13|28)\]|Permission denied|No space left", re.IGNORECASE)
+_COLLECTING_RE = re.compile(r"^\s*Collecting ")
+_INDEX_OPTIONS = ('-i', '--index-url', '--no-index')
+MAX_FAILOVER = 2  # 一次安装最多改用的镜像数
+
+
+def describe_error(output):
+    """把pip的错误输出归纳为一句说明"""
+    for pattern, message in _ERROR_PATTERNS:
+        if pattern.search(output):
+            return message
+    return "未知错误"
+
+
+# ---- 镜像源配置 ----
+
+def is_network_error(output):
+    """pip输出是否为网络类失败"""
+    return bool(_NETWORK_RE.search(output)) and not _LOCAL_OSERROR_RE.search(output)
+
+
+def pip_config_path():
+    """用户级pip配置文件路径"""
+    if os.name == 'nt':
+        return os.path.join(os.getenv('APPDATA'), 'pip', 'pip.ini')
+    return os.path.expanduser('~/.pip/pip.conf')
+
+
+def backup_config(path=None):
+    """备份配置文件，返回备份路径(配置文件不存在时返回None)"""
+    path = path or pip_config_path()
+    if os.path.exists(path):
+        import shutil
+        backup_path = f"{path}.bak"
+        shutil.copyfile(path, backup_path)
+        return backup_path
+    return None
+
+
+def current_source(path=None):
+    """当前配置的镜像源名称：PIP_CONFIGS中的键、'custom' 或 'default'"""
+    path = path or pip_config_path()
+    if not os.path.exists(path):
+        return 'default'
+
+    from configparser import ConfigParser
+    config = ConfigParser()
+    config.read(path)
+    try:
+        url = config.get('global', 'index-url')
+    except Exception:
+        return 'default'
+    for name, info in PIP_CONFIGS.items():
+        if info['url'] == url:
+            return name
+    return 'custom'
+
+
+def apply_source(name, custom_url=None, path=None):
+    """把镜像源写入pip配置(先备份)，返回备份路径；名称无效或缺少自定义URL时抛出ValueError"""
+    path = path or pip_config_path()
+    if name == 'custom':
+        if not custom_url:
+            raise ValueError("必须提供自定义源URL")
+        config = {'url': custom_url, 'trusted_host': ''}
+    else:
+        config = PIP_CONFIGS.get(name)
+        if not config:
+            raise ValueError("无效的镜像源")
+
+    backup_path = backup_config(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    from configparser import ConfigParser
+    cfg = ConfigParser()
+    if os.path.exists(path):
+        cfg.read(path)
+    if not cfg.has_section('global'):
+        cfg.add_section('global')
+    cfg.set('global', 'index-url', config['url'])
+    if config['trusted_host']:
+        cfg.set('global', 'trusted-host', config['trusted_host'])
+    elif cfg.has_option('global', 'trusted-host'):
+        cfg.remove_option('global', 'trusted-host')
+    with open(path, 'w') as f:
+        cfg.write(f)
+    return backup_path
+
+
+def restore_default_source(path=None):
+    """删除pip配置文件(先备份)，返回备份路径；已经是默认配置时返回None"""
+    path = path or pip_config_path()
+    if not os.path.exists(path):
+        return None
+    backup_path = backup_config(path)
+    os.remove(path)
+    return backup_path
+
+
+def mirror_urls(names):
+    """镜像源名称(PIP_CONFIGS中的键)或URL -> URL列表"""
+    return [PIP_CONFIGS[name]['url'] if name in PIP_CONFIGS else name for name in names]
+
+
+class PipEngine:
+    """清单、安装、卸载操作的入口(线程安全)，可同时操作多个环境"""
+
+    def __init__(self, listener=None, use_worker=True, creationflags=CREATE_NO_WINDOW):
+        self.listener = listener
+        self.use_worker = use_worker  # 通过常驻pip进程执行命令
+        self.worker_failed = set()  # 常驻进程无法启动的解释器(interpreter_key)，只对这些解释器每次新建进程
+        self.creationflags = creationflags
+        self.inventories = {}  # 解释器 -> InventoryEngine(每个环境单独缓存)
+        self.dep_indexes = {}  # 解释器 -> DependencyIndex
+        self.footprints = FootprintScanner()  # 各包的磁盘占用(按 .dist-info 的mtime缓存)
+        self.verifier = Verifier()  # 按RECORD校验已安装的文件(哈希按文件大小和mtime缓存)
+        self.plans = PlanCache()  # 安装预览的解析结果
+        self.processes = set()
+        # 各镜像的成功率和延迟，网络类失败时按它选择重试的镜像(首次使用时加载)
+        self._health = None
+        self.failover = True
+        # 安装队列：选项相同的任务合并为一次pip调用
+        self.queue = InstallQueue(
+            listener=self._on_job_event,
+            run_command=self.run_install,
+            command_builder=self.build_install_command,
+            prepare=self._before_install,
+            complete=self._after_install
+        )
+        # 任务选项中带有 compile_option(级别) 时安装命令加 --no-compile，pip结束后按RECORD用
+        # compile_workers个compileall进程并行编译新安装的 .py 文件
+        self.compile_workers = os.cpu_count() or 1
+        # 每次安装/卸载前保存快照，并把可能被改变的包保留到本地仓库，用于离线回滚
+        self.snapshots = SnapshotStore()
+        self.auto_snapshot = True
+        self._lock = threading.Lock()
+        self._waiters = []  # [(任务列表, Future)]
+        self.wheelhouse = None  # 本地wheel仓库，首次使用时创建
+        self.catalogs = {}  # 索引URL -> ProjectCatalog(镜像全部项目名，用于补全)
+        self._executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='pip-engine')
+
+    @property
+    def health(self):
+        """MirrorHealth；pip_mirrors会导入http.client和ssl，不放在启动路径上"""
+        with self._lock:
+            if self._health is None:
+                from pip_mirrors import MirrorHealth
+                self._health = MirrorHealth()
+            return self._health
+
+    def _emit(self, job, event, data):
+        if self.listener is not None:
+            self.listener(job, event, data)
+
+    # ---- 清单 ----
+
+    def inventory(self, python=None):
+        python = python or sys.executable
+        with self._lock:
+            engine = self.inventories.get(python)
+            if engine is None:
+                engine = self.inventories[python] = InventoryEngine(python)
+            return engine
+
+    def dep_index(self, python=None):
+        python = python or sys.executable
+        with self._lock:
+            index = self.dep_indexes.get(python)
+            if index is None:
+                index = self.dep_indexes[python] = DependencyIndex()
+            return index
+
+    def refresh_inventory(self, python=None, update_deps=True):
+        """刷新清单(只处理有变化的包)，有变化时保存缓存并更新依赖索引，返回InventoryDelta"""
+        inventory = self.inventory(python)
+        delta = inventory.refresh()
+        changed = bool(delta.added or delta.removed or delta.changed)
+        if changed:
+            inventory.save_cache()
+        if update_deps or changed:
+            index = self.dep_index(python)
+            if index.environment is None:
+                index.environment = marker_environment(inventory.python)
+            index.update(delta.records)
+        return delta
+
+    def scan(self, pythons, callback=None):
+        """并行刷新多个环境的清单并保存缓存，返回Future，结果为 {解释器: InventoryDelta或异常}"""
+        engines = {python: self.inventory(python) for python in pythons}
+
+        def on_scanned(python, result):
+            if not isinstance(result, Exception) and (result.added or result.removed or result.changed):
+                engines[python].save_cache()
+            if callback is not None:
+                callback(python, result)
+
+        return self._executor.submit(scan_inventories, engines, callback=on_scanned)
+
+    def footprint(self, python=None, callback=None):
+        """在后台统计该环境各包的磁盘占用，返回Future，结果为 {规范化包名: Footprint}
+
+        callback(record, footprint) 在每个需要重新统计的包完成时调用(在工作线程中)。
+        """
+        inventory = self.inventory(python)
+
+        def measure():
+            records = inventory.records() or self.refresh_inventory(python).records
+            return self.footprints.measure(records, callback)
+
+        return self._executor.submit(measure)
+
+    def verify(self, python=None, progress=None):
+        """在后台按RECORD校验该环境所有已安装的文件，返回Future，结果为 {规范化包名: VerifyResult}
+
+        progress(已完成字节, 需要计算的总字节) 在每批哈希完成时调用(在工作线程中)。
+        """
+        def verify():
+            records = self.refresh_inventory(python, update_deps=False).records
+            return self.verifier.verify(records, progress)
+
+        return self._executor.submit(verify)
+
+    def check_requirements(self, requirements, python=None):
+        """需求与该环境清单的比较结果(RequirementCheck)"""
+        from pip_requirements import check_requirements
+        inventory = self.inventory(python)
+        records = inventory.records() or inventory.refresh().records
+        return check_requirements(requirements, records, marker_environment(inventory.python))
+
+    # ---- 执行pip ----
+
+    def build_install_command(self, python, options, requirements):
+        """构建安装命令(一批任务合并为一次pip调用)"""
+        args = []
+        for requirement in requirements:
+            # 需求文件中的可编辑安装 "-e 路径" 需要拆成两个参数
+            args.extend(requirement.split(None, 1) if requirement.startswith('-e ') else [requirement])
+        optimize, options = split_compile_option(options)
+        if optimize is not None and '--no-compile' not in options:
+            options.append('--no-compile')  # 装完后由_after_install并行编译
+        return [python, "-m", "pip", "install", *options, *args]
+
+    def run_command(self, cmd, on_line):
+        """执行一次pip调用并逐行回调输出，返回退出码(在调用线程中运行)"""
+        if not pip_available(cmd[0], self.creationflags):
+            on_line(f"未找到有效的pip环境: {cmd[0]}\n")
+            return None
+
+        self._emit(None, 'command', cmd)
+        key = interpreter_key(cmd[0])
+        if self.use_worker and key not in self.worker_failed:
+            # 优先交给常驻pip进程执行，省去启动解释器和导入pip的时间
+            worker = get_worker(cmd[0], self.creationflags)
+            try:
+                worker.start()
+            except (OSError, WorkerError):
+                self.worker_failed.add(key)
+            else:
+                try:
+                    # pip支持时输出原始下载进度，用于确定进度条
+                    return worker.run(with_progress(cmd[3:], worker.version), on_line)
+                except WorkerError as e:
+                    on_line(f"{e}\n")
+                    return None
+
+        process = subprocess.Popen(
+            cmd[:3] + with_progress(cmd[3:], pip_version(cmd[0])),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            creationflags=self.creationflags
+        )
+        self.processes.add(process)
+        try:
+            for line in process.stdout:
+                on_line(line)
+            return process.wait()
+        finally:
+            self.processes.discard(process)
+
+    def run_install(self, cmd, on_line):
+        """执行一次安装调用；网络类失败时改用健康状况最好的其它镜像重试
+
+        重试只对这次调用加 -i/--trusted-host，不修改pip配置；命令中已指定索引时不重试。
+        每次尝试的结果(网络类失败记为失败)和索引响应时间记入self.health。
+        """
+        if any(option in cmd for option in _INDEX_OPTIONS):
+            return self.run_command(cmd, on_line)
+        source = name = current_source()
+        fallbacks = [n for n in self.health.rank(PIP_CONFIGS) if n != source][:MAX_FAILOVER]
+        attempt = cmd
+        while True:
+            output = []
+            collecting = None  # 第一行 Collecting 的时间，到下一行输出即一次索引查询的耗时
+            latency_ms = None
+
+            def collect(line):
+                nonlocal collecting, latency_ms
+                now = time.perf_counter()
+                if latency_ms is None:
+                    if collecting is not None:
+                        latency_ms = (now - collecting) * 1000
+                    elif _COLLECTING_RE.match(line):
+                        collecting = now
+                output.append(line)
+                on_line(line)
+
+            code = self.run_command(attempt, collect)
+            network = code not in (0, None) and is_network_error(''.join(output))
+            if code == 0 or network:
+                self.health.record(name, code == 0, latency_ms)
+            if not network or not self.failover or not fallbacks:
+                return code
+            previous, name = name, fallbacks.pop(0)
+            self._emit(None, 'failover', (previous, name))
+            on_line(f"\n[网络错误，改用 {DISPLAY_NAMES[name]} 重试]\n")
+            config = PIP_CONFIGS[name]
+            attempt = cmd[:4] + ['-i', config['url'], '--trusted-host', config['trusted_host']] + cmd[4:]
+
+    # ---- 安装 ----
+
+    def install(self, requirements, options=(), pythons=(None,)):
+        """把需求加入各环境的安装队列(每个环境合并为一次pip调用，各环境同时进行)
+
+        返回Future，结果为InstallResult列表(所有任务成功或失败后完成)。
+        """
+        jobs = []
+        for python in pythons:
+            jobs.extend(self.queue.enqueue_many(requirements, options, python))
+        return self.watch(jobs)
+
+    def preview(self, requirements, options=(), pythons=(None,)):
+        """为各环境解析需求(--dry-run --report)而不安装，返回Future，结果为InstallPlan列表
+
+        相同的需求、选项、索引和已安装版本集合直接使用缓存的解析结果；任一环境解析失败时
+        Future抛出RuntimeError。
+        """
+        return self._executor.submit(self._preview, list(requirements), list(options), list(pythons))
+
+    def _preview(self, requirements, options, pythons):
+        def plan(python):
+            python = python or sys.executable
+            start = time.perf_counter()
+            records = self.refresh_inventory(python, update_deps=False).records
+            # 并行编译的伪选项不影响解析，只在按计划安装时使用
+            _optimize, pip_options = split_compile_option(options)
+            key = plan_key(python, requirements, pip_options, index_url_of(pip_options),
+                           inventory_fingerprint(records))
+            changes = self.plans.get(key)
+            cached = changes is not None
+            if not cached:
+                changes = resolve_plan(requirements, pip_options, self.run_install, python, records)
+                self.plans.put(key, changes)
+            return InstallPlan(python, requirements, options, changes, cached, time.perf_counter() - start)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(pythons))) as pool:
+            return list(pool.map(plan, pythons))
+
+    def install_plans(self, plans):
+        """按预览得到的固定版本集合安装(加 --no-deps，pip不再解析依赖)，返回Future，结果为InstallResult列表"""
+        jobs = []
+        for plan in plans:
+            if plan.changes:
+                jobs.extend(self.queue.enqueue_many(pinned_requirements(plan), [*plan.options, '--no-deps'],
+                                                    plan.python))
+        return self.watch(jobs)
+
+    def watch(self, jobs):
+        """返回在jobs全部结束时完成的Future"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._waiters.append((list(jobs), future))
+        self._check_waiters()
+        return future
+
+    def _check_waiters(self):
+        finished = []
+        with self._lock:
+            for waiter in list(self._waiters):
+                jobs, future = waiter
+                if all(job.status in (SUCCEEDED, FAILED) for job in jobs):
+                    self._waiters.remove(waiter)
+                    finished.append(waiter)
+        for jobs, future in finished:
+            future.set_result([
+                InstallResult(job.python, job.requirement, job.status,
+                              describe_error(job.error) if job.status == FAILED else '',
+                              ''.join(job.output))
+                for job in jobs
+            ])
+
+    def _on_job_event(self, job, event, data):
+        self._emit(job, event, data)
+        if event == 'status' and data in (SUCCEEDED, FAILED):
+            self._check_waiters()
+
+    # ---- 卸载 ----
+
+    def uninstall(self, plan, on_progress=None):
+        """plan为 {解释器: 包名列表}，每个环境一次pip调用，各环境同时进行
+
+        返回Future，结果为UninstallResult列表；on_progress(已完成数, 总数, UninstallResult)
+        在每个包处理完时调用(在工作线程中)。
+        """
+        return self._executor.submit(self._uninstall, dict(plan), on_progress)
+
+    def _uninstall(self, plan, on_progress):
+        total = sum(len(names) for names in plan.values())
+        done = 0
+        lock = threading.Lock()
+
+        def uninstall(python):
+            def progress(_done, _total, name, status):
+                nonlocal done
+                result = UninstallResult(python, name, status)
+                with lock:
+                    done += 1
+                    current = done
+                self._emit(None, 'uninstall', result)
+                if on_progress is not None:
+                    on_progress(current, total, result)
+
+            if self.auto_snapshot:
+                try:
+                    self.take_snapshot(python, '卸载 ' + ' '.join(plan[python]), retain=plan[python])
+                except OSError:
+                    pass  # 快照失败不影响卸载
+            statuses = bulk_uninstall(plan[python], self.run_command, python=python, on_progress=progress)
+            return [UninstallResult(python, name, status) for name, status in statuses.items()]
+
+        if not plan:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            return [result for results in pool.map(uninstall, plan) for result in results]
+
+    # ---- 本地wheel仓库 ----
+
+    def get_wheelhouse(self):
+        with self._lock:
+            if self.wheelhouse is None:
+                from pip_wheelhouse import Wheelhouse  # 用到时才导入(http.client、ssl、shutil)
+                self.wheelhouse = Wheelhouse()
+            return self.wheelhouse
+
+    def prefetch(self, requirements, pythons=(None,), mirrors=(), index_url=None,
+                 connections=PREFETCH_CONNECTIONS):
+        """为各环境解析需求，把所需的分发文件并行下载到本地仓库
+
+        mirrors为镜像源名称(PIP_CONFIGS中的键)或URL，下载分布在这些镜像上；各环境需要的
+        同一文件只下载一次。返回Future，结果为PrefetchResult列表；任一环境解析失败时
+        Future抛出RuntimeError。
+        """
+        return self._executor.submit(self._prefetch, list(requirements), list(pythons),
+                                     mirror_urls(mirrors), index_url, connections)
+
+    def _prefetch(self, requirements, pythons, mirrors, index_url, connections):
+        from pip_wheelhouse import Prefetcher, resolve_requirements
+
+        def resolve(python):
+            return resolve_requirements(requirements, self.run_command, python or sys.executable, index_url)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(pythons))) as pool:
+            resolved = list(pool.map(resolve, pythons))
+        items = {}
+        for batch in resolved:
+            for item in batch:
+                items.setdefault(item.filename, item)
+        prefetcher = Prefetcher(self.get_wheelhouse(), mirrors, connections)
+        return prefetcher.fetch(list(items.values()), callback=lambda result: self._emit(None, 'prefetch', result))
+
+    # ---- 快照和回滚 ----
+
+    def take_snapshot(self, python=None, label='', retain=(), with_dependencies=False):
+        """刷新清单并保存快照，返回Snapshot
+
+        retain中的已安装包(with_dependencies时连同其已安装依赖)重新打包保留到本地仓库。
+        """
+        python = python or sys.executable
+        self.refresh_inventory(python)
+        records = self.inventory(python).records()
+        snapshot = self.snapshots.take(python, records, label)
+        if retain:
+            if with_dependencies:
+                keys = dependency_closure(self.dep_index(python), retain)
+            else:
+                keys = {normalize_name(name) for name in retain}
+            wheelhouse = self.get_wheelhouse()
+            retain_wheels([r for r in records if normalize_name(r.name) in keys], wheelhouse)
+            wheelhouse.save()
+        self._emit(None, 'snapshot', snapshot)
+        return snapshot
+
+    def diff_snapshots(self, python, old_id, new_id=None):
+        """在后台比较两个快照，返回Future，结果为SnapshotDiff
+
+        new_id为None时与当前状态比较：先刷新清单并保存快照(未变化时不会新增记录)。
+        """
+        def diff():
+            return self.snapshots.diff(old_id, new_id or self.take_snapshot(python, '比较时的当前状态').id)
+
+        return self._executor.submit(diff)
+
+    def _after_install(self, python, options, lines, trace, on_line):
+        """安装队列每批pip调用成功之后：启用并行编译时编译新安装的包(用户自己指定了 --no-compile 时不编译)"""
+        optimize, options = split_compile_option(options)
+        if optimize is None or '--no-compile' in options:
+            return
+        names = installed_names(lines)
+        if not names:
+            return
+        records = [record for record in self.refresh_inventory(python, update_deps=False).records
+                   if normalize_name(record.name) in names]
+        files = [path for record in records for path in source_files(record)]
+        trace.begin_compile(len(files))
+        result = compile_files(python, files, optimize, self.compile_workers, self.creationflags)
+        for record in records:
+            record_compiled(record)  # 卸载时一并删除
+        trace.end_compile()
+        on_line(f"并行编译 {result.files} 个文件({result.workers} 个进程，优化级别 {optimize})，"
+                f"耗时 {result.wall:.1f}s" + (f"，{result.failed} 个文件无法编译" if result.failed else '') + "\n")
+
+    def _before_install(self, python, requirements):
+        """安装队列每批pip调用之前：保存快照，保留请求的包及其依赖的当前版本"""
+        if self.auto_snapshot:
+            names = [requirement_name(r) for r in requirements if not r.startswith('-')]
+            self.take_snapshot(python, '安装 ' + ' '.join(requirements), retain=names, with_dependencies=True)
+
+    def rollback(self, python, snapshot_id, on_line=None):
+        """把环境恢复到快照(ID或其前缀)中的版本集合，只使用本地仓库中的wheel，不访问网络
+
+        先保存当前状态的快照，卸载快照之后新增的包，再用 --no-index --no-deps 安装版本
+        不同或已被删除的包；仓库中缺少任一需要的wheel时不做任何修改。
+        返回Future，结果为RollbackResult；pip输出逐行传给on_line。
+        """
+        return self._executor.submit(self._rollback, python or sys.executable, snapshot_id,
+                                     on_line or (lambda line: None))
+
+    def _rollback(self, python, snapshot_id, on_line):
+        target = self.snapshots.resolve(python, snapshot_id)
+        current = self.take_snapshot(python, f'回滚到 {target.id[:12]} 之前')
+        diff = self.snapshots.diff(target.id, current.id)
+        wheelhouse = self.get_wheelhouse()
+        wanted = diff.removed + [(name, old) for name, old, _new in diff.changed]
+        installed = [f"{name}=={version}" for name, version in wanted]
+        removed = [name for name, _version in diff.added]
+        missing = [f"{name}=={version}" for name, version in wanted if wheelhouse.find(name, version) is None]
+        if missing:
+            return RollbackResult(python, target, [], [], missing, FAILED)
+
+        status = SUCCEEDED
+        if removed:
+            statuses = bulk_uninstall(removed, self.run_command, python=python)
+            if any(value == UNINSTALL_FAILED for value in statuses.values()):
+                status = FAILED
+        if installed:
+            cmd = [python, '-m', 'pip', 'install', *wheelhouse.install_options(), '--no-deps', *installed]
+            if self.run_command(cmd, on_line) != 0:
+                status = FAILED
+            wheelhouse.touch([wheelhouse.find(name, version) for name, version in wanted])
+            wheelhouse.save()
+        self.take_snapshot(python, f'回滚到 {target.id[:12]}')
+        return RollbackResult(python, target, installed, removed, [], status)
+
+    # ---- 项目名索引 ----
+
+    def catalog(self, index_url=None):
+        """索引(默认为pip配置的index-url)的项目名索引"""
+        # 启动后才用到，用到时再导入(gzip、mmap、xmlrpc.client和pip_outdated)
+        from pip_catalog import ProjectCatalog
+        from pip_outdated import configured_index_url
+        url = index_url or configured_index_url()
+        with self._lock:
+            catalog = self.catalogs.get(url)
+            if catalog is None:
+                catalog = self.catalogs[url] = ProjectCatalog(url)
+            return catalog
+
+    def update_catalog(self, index_url=None):
+        """在后台增量更新项目名索引，返回Future，结果为CatalogUpdate"""
+        return self._executor.submit(self.catalog(index_url).update)
+
+    # ---- 镜像源 ----
+
+    def current_source(self):
+        return current_source()
+
+    def set_source(self, name, custom_url=None):
+        return apply_source(name, custom_url)
+
+    def restore_default_source(self):
+        return restore_default_source()
+
+    def close(self):
+        """终止正在执行的命令并停止常驻pip进程"""
+        self.queue.terminate()
+        for process in list(self.processes):
+            process.terminate()
+        stop_workers()
+        self._executor.shutdown(wait=False)
+        for catalog in list(self.catalogs.values()):
+            catalog.close()
@@ -0,0 +1,265 @@
+"""Python环境发现与并行清单扫描
+
+查找当前解释器、PATH中的系统解释器、conda环境以及常见目录下的虚拟环境(含pyvenv.cfg)，
+用户手动添加的解释器和搜索目录保存在数据目录的 environments.json 中。
+每个环境使用独立的InventoryEngine(各自的清单缓存)，可以用线程池同时扫描。
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import re
+import subprocess
+import sys
+
+from pip_common import CREATE_NO_WINDOW, get_data_dir
+from pip_worker import interpreter_key
+
+
+# 一个Python环境：显示名称、解释器路径、类型、环境前缀目录
+Environment = collections.namedtuple('Environment', ['name', 'python', 'kind', 'prefix'])
+
+KIND_CURRENT = 'current'
+KIND_VENV = 'venv'
+KIND_CONDA = 'conda'
+KIND_SYSTEM = 'system'
+KIND_CUSTOM = 'custom'
+
+KIND_NAMES = {
+    KIND_CURRENT: '当前',
+    KIND_VENV: '虚拟环境',
+    KIND_CONDA: 'conda',
+    KIND_SYSTEM: '系统',
+    KIND_CUSTOM: '手动添加',
+}
+
+SETTINGS_FILE = 'environments.json'
+# 查找虚拟环境时向下搜索的目录层数
+VENV_SEARCH_DEPTH = 2
+
+_PYTHON_NAME_RE = re.compile(r'^python(3(\.\d+)?)?(\.exe)?$', re.IGNORECASE)
+
+# 在目标解释器中计算PEP 508环境标记变量(与packaging.markers.default_environment一致)
+_MARKER_SCRIPT = '''
+import json, os, platform, sys
+info = sys.implementation.version
+version = f"{info.major}.{info.minor}.{info.micro}"
+if info.releaselevel != "final":
+    version += info.releaselevel[0] + str(info.serial)
+print(json.dumps({
+    "implementation_name": sys.implementation.name,
+    "implementation_version": version,
+    "os_name": os.name,
+    "platform_machine": platform.machine(),
+    "platform_release": platform.release(),
+    "platform_system": platform.system(),
+    "platform_version": platform.version(),
+    "python_full_version": platform.python_version(),
+    "platform_python_implementation": platform.python_implementation(),
+    "python_version": ".".join(platform.python_version_tuple()[:2]),
+    "sys_platform": sys.platform,
+}))
+'''
+_marker_environments = {}
+
+
+def env_python(prefix):
+    """返回环境前缀目录中的解释器路径，不存在时返回None"""
+    if os.name == 'nt':
+        candidates = [os.path.join(prefix, 'Scripts', 'python.exe'), os.path.join(prefix, 'python.exe')]
+    else:
+        candidates = [os.path.join(prefix, 'bin', 'python3'), os.path.join(prefix, 'bin', 'python')]
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def marker_environment(python=None):
+    """返回目标解释器的环境标记变量(按解释器缓存)；当前解释器返回None，由packaging自行计算"""
+    key = interpreter_key(python)
+    if python is None or key == interpreter_key(sys.executable):
+        return None
+    if key not in _marker_environments:
+        output = subprocess.check_output(
+            [python, '-c', _MARKER_SCRIPT],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            creationflags=CREATE_NO_WINDOW
+        )
+        _marker_environments[key] = json.loads(output)
+    return _marker_environments[key]
+
+
+def load_settings():
+    """读取用户添加的解释器和虚拟环境搜索目录"""
+    try:
+        with open(os.path.join(get_data_dir(), SETTINGS_FILE), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return {'pythons': list(data.get('pythons', [])), 'search_roots': list(data.get('search_roots', []))}
+
+
+def save_settings(settings):
+    with open(os.path.join(get_data_dir(), SETTINGS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+
+def current_environment():
+    """运行本程序的解释器所在的环境"""
+    prefix = sys.prefix
+    if prefix != getattr(sys, 'base_prefix', prefix):
+        label = os.path.basename(prefix)
+    elif os.path.isdir(os.path.join(prefix, 'conda-meta')):
+        label = f"conda {os.path.basename(prefix)}"
+    else:
+        label = f"Python {sys.version_info[0]}.{sys.version_info[1]}"
+    return Environment(label, sys.executable, KIND_CURRENT, prefix)
+
+
+def _system_pythons():
+    """PATH中的python/python3/python3.X(按真实路径去重，跳过pyenv等工具的shims)"""
+    seen = set()
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        if os.path.basename(os.path.normpath(directory)) == 'shims':
+            continue
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for name in names:
+            if not _PYTHON_NAME_RE.match(name):
+                continue
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or not os.access(path, os.X_OK):
+                continue
+            real = os.path.realpath(path)
+            if real in seen:
+                continue
+            seen.add(real)
+            prefix = os.path.dirname(os.path.dirname(path)) if os.name != 'nt' else directory
+            if os.path.isfile(os.path.join(prefix, 'pyvenv.cfg')):
+                continue  # 已激活的虚拟环境，由虚拟环境查找负责
+            yield Environment(f"{name} ({directory})", path, KIND_SYSTEM, prefix)
+
+
+def _conda_prefixes():
+    """conda记录的环境列表，以及常见安装目录下的envs"""
+    prefixes = []
+    try:
+        with open(os.path.expanduser('~/.conda/environments.txt'), encoding='utf-8') as f:
+            prefixes.extend(line.strip() for line in f if line.strip())
+    except OSError:
+        pass
+    roots = [os.environ.get('CONDA_PREFIX', '')]
+    for name in ('anaconda3', 'miniconda3', 'miniforge3', 'mambaforge', 'Anaconda3', 'Miniconda3'):
+        roots.append(os.path.expanduser(os.path.join('~', name)))
+    for root in roots:
+        if root and os.path.isdir(os.path.join(root, 'conda-meta')):
+            prefixes.append(root)
+            try:
+                with os.scandir(os.path.join(root, 'envs')) as it:
+                    prefixes.extend(entry.path for entry in it if entry.is_dir())
+            except OSError:
+                pass
+    return prefixes
+
+
+def _venv_search_roots(extra_roots=()):
+    roots = [os.getcwd(), os.path.expanduser('~')]
+    if os.environ.get('WORKON_HOME'):
+        roots.append(os.environ['WORKON_HOME'])
+    for name in ('.virtualenvs', '.venvs', 'venvs', '.local/share/virtualenvs'):
+        roots.append(os.path.expanduser(os.path.join('~', name)))
+    if os.environ.get('VIRTUAL_ENV'):
+        roots.append(os.path.dirname(os.environ['VIRTUAL_ENV']))
+    roots.extend(extra_roots)
+    return roots
+
+
+def _find_venvs(root, depth=VENV_SEARCH_DEPTH):
+    """在root下查找包含pyvenv.cfg的目录(不进入隐藏目录和已找到的环境)"""
+    if os.path.isfile(os.path.join(root, 'pyvenv.cfg')):
+        yield root
+        return
+    if depth <= 0:
+        return
+    try:
+        with os.scandir(root) as it:
+            entries = [entry.path for entry in it
+                       if entry.is_dir(follow_symlinks=False)
+                       and (not entry.name.startswith('.') or entry.name in ('.venv', '.virtualenvs', '.venvs'))
+                       and entry.name not in ('node_modules', 'site-packages', '__pycache__')]
+    except OSError:
+        return
+    for path in entries:
+        yield from _find_venvs(path, depth - 1)
+
+
+def discover_environments(settings=None):
+    """查找本机的Python环境，返回Environment列表(当前解释器在最前)"""
+    settings = settings or load_settings()
+    environments = []
+    seen = set()
+    prefixes = set()
+
+    def add(env):
+        key = interpreter_key(env.python)
+        if key not in seen:
+            seen.add(key)
+            prefixes.add(os.path.normcase(os.path.abspath(env.prefix)))
+            environments.append(env)
+
+    current = current_environment()
+    add(current)
+
+    for path in settings['pythons']:
+        if os.path.isfile(path):
+            add(Environment(f"{os.path.basename(path)} ({os.path.dirname(path)})", path,
+                            KIND_CUSTOM, os.path.dirname(os.path.dirname(path))))
+
+    for root in _venv_search_roots(settings['search_roots']):
+        for prefix in _find_venvs(root):
+            python = env_python(prefix)
+            if python:
+                add(Environment(os.path.basename(prefix), python, KIND_VENV, prefix))
+
+    for prefix in _conda_prefixes():
+        python = env_python(prefix)
+        if python:
+            add(Environment(f"conda {os.path.basename(prefix)}", python, KIND_CONDA, prefix))
+
+    base_real = os.path.realpath(current.python) if current.prefix == sys.base_prefix else None
+    for env in _system_pythons():
+        if os.path.realpath(env.python) == base_real:
+            continue
+        if os.path.normcase(os.path.abspath(env.prefix)) in prefixes:
+            continue  # 例如conda基础环境的bin目录在PATH中
+        add(env)
+    return environments
+
+
+def scan_inventories(engines, max_workers=None, callback=None):
+    """用线程池同时刷新多个InventoryEngine
+
+    engines 为 {键: InventoryEngine}；返回 {键: InventoryDelta或异常}。
+    每个环境刷新完成时调用 callback(键, 结果)(在工作线程中)。扫描主要是
+    文件系统访问和等待子进程(获取sys.path)，线程池即可并行。
+    """
+    results = {}
+    if not engines:
+        return results
+    workers = max_workers or min(32, (os.cpu_count() or 1) * 4, len(engines))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(engine.refresh): key for key, engine in engines.items()}
+        for future in concurrent.futures.as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            results[key] = result
+            if callback is not None:
+                callback(key, result)
+    return results
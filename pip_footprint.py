@@ -0,0 +1,149 @@
+"""包的磁盘占用：按RECORD统计每个分发包的文件数和大小
+
+有RECORD的包(wheel安装)逐个stat其中列出的文件(包括site目录外的脚本)；没有RECORD的
+包(egg-info、.egg、egg-link)遍历元数据目录和top_level.txt中的顶层包。stat在线程池中
+并行执行。结果按元数据路径缓存，键为 .dist-info 目录的mtime(重新安装或升级时会变化)，
+之后的刷新只需对每个包stat一次。
+"""
+import collections
+import concurrent.futures
+import csv
+import importlib.machinery
+import json
+import os
+import threading
+
+from pip_common import get_data_dir, normalize_name
+
+
+CACHE_VERSION = 1
+DEFAULT_WORKERS = 8
+
+# 一个包的占用：字节数、文件数
+Footprint = collections.namedtuple('Footprint', ['size', 'files'])
+
+
+def footprint_cache_path():
+    return os.path.join(get_data_dir(), 'footprints.json')
+
+
+def _record_paths(record):
+    """RECORD中列出的文件(绝对路径)；没有RECORD时返回None"""
+    try:
+        with open(os.path.join(record.path, 'RECORD'), encoding='utf-8', newline='') as f:
+            rows = [row[0] for row in csv.reader(f) if row]
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+    return [os.path.normpath(os.path.join(record.location, path)) for path in rows]
+
+
+def _walk_paths(record):
+    """没有RECORD时：元数据本身(目录或文件)以及top_level.txt中的顶层包和模块"""
+    roots = [record.path]
+    if os.path.isdir(record.path) and not record.path.endswith('.egg'):
+        try:
+            with open(os.path.join(record.path, 'top_level.txt'), encoding='utf-8') as f:
+                top_level = [line.strip() for line in f if line.strip()]
+        except OSError:
+            top_level = []
+        for name in top_level:
+            base = os.path.join(record.location, *name.split('/'))
+            roots.append(base)
+            roots.extend(base + suffix for suffix in importlib.machinery.all_suffixes())
+    paths = []
+    for root in roots:
+        if os.path.isdir(root):
+            for directory, _dirs, names in os.walk(root):
+                paths.extend(os.path.join(directory, name) for name in names)
+        elif os.path.lexists(root):
+            paths.append(root)
+    return paths
+
+
+def measure_distribution(record):
+    """统计一个已安装分发包的Footprint(在工作线程中调用)"""
+    paths = _record_paths(record) if record.path.endswith('.dist-info') else None
+    if paths is None:
+        paths = _walk_paths(record)
+    size = files = 0
+    for path in set(paths):
+        try:
+            st = os.lstat(path)
+        except OSError:
+            continue  # RECORD中已被删除的文件(例如未生成的.pyc)
+        size += st.st_size
+        files += 1
+    return Footprint(size, files)
+
+
+class FootprintScanner:
+    """并行统计多个包的占用，结果按元数据路径和mtime缓存(线程安全)"""
+
+    def __init__(self, cache_path=None, workers=DEFAULT_WORKERS):
+        self.cache_path = cache_path or footprint_cache_path()
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._entries = None  # 元数据路径 -> [mtime_ns, size, files]
+
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                return data['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        with self._lock:
+            entries = {path: entry for path, entry in (self._entries or {}).items() if os.path.lexists(path)}
+            self._entries = entries
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def measure(self, records, callback=None):
+        """返回 {规范化包名: Footprint}；callback(record, footprint) 在每个新统计的包完成时调用"""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entries = dict(self._entries)
+        results = {}
+        pending = []
+        for record in records:
+            try:
+                mtime = os.stat(record.path).st_mtime_ns
+            except OSError:
+                continue
+            entry = entries.get(record.path)
+            if entry is not None and entry[0] == mtime:
+                results[normalize_name(record.name)] = Footprint(entry[1], entry[2])
+            else:
+                pending.append((record, mtime))
+        if not pending:
+            return results
+
+        def measure(item):
+            record, mtime = item
+            footprint = measure_distribution(record)
+            with self._lock:
+                self._entries[record.path] = [mtime, footprint.size, footprint.files]
+            if callback is not None:
+                callback(record, footprint)
+            return record, footprint
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+            for record, footprint in pool.map(measure, pending):
+                results[normalize_name(record.name)] = footprint
+        self.save()
+        return results
+
+
+def total_footprint(footprints):
+    """所有包的总占用"""
+    return Footprint(sum(f.size for f in footprints.values()), sum(f.files for f in footprints.values()))
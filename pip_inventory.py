@@ -0,0 +1,386 @@
+"""已安装包清单：直接读取 .dist-info/.egg-info 元数据，必要时回退到 pip list"""
+import collections
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from pip_common import CREATE_NO_WINDOW, get_data_dir, normalize_name
+
+
+# 一个已安装分发包的结构化记录
+PackageRecord = collections.namedtuple(
+    'PackageRecord',
+    ['name', 'version', 'location', 'installer', 'editable', 'path']
+)
+
+# 两次刷新之间的差异：新增、删除、变更的记录，以及刷新后的完整清单
+InventoryDelta = collections.namedtuple(
+    'InventoryDelta',
+    ['added', 'removed', 'changed', 'records']
+)
+
+METADATA_SUFFIXES = ('.dist-info', '.egg-info', '.egg', '.egg-link')
+
+MODE_METADATA = 'metadata'
+MODE_PIP = 'pip'
+MODE_AUTO = 'auto'
+
+# 清单缓存格式版本，格式变化时旧缓存自动失效
+CACHE_VERSION = 1
+
+
+def read_metadata_headers(path):
+    """读取METADATA/PKG-INFO头部，遇到空行(正文开始)即停止"""
+    headers = {}
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line in ('\n', '\r\n'):
+                break
+            if line[0] in ' \t':
+                continue  # 多行字段的续行，这里不需要
+            key, sep, value = line.partition(':')
+            if sep and key not in headers:
+                headers[key] = value.strip()
+    return headers
+
+
+def _read_text(path):
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _editable_location(meta_dir):
+    """根据direct_url.json判断是否为可编辑安装，返回项目路径"""
+    try:
+        with open(os.path.join(meta_dir, 'direct_url.json'), encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not info.get('dir_info', {}).get('editable'):
+        return None
+    url = info.get('url', '')
+    if url.startswith('file://'):
+        from urllib.parse import unquote, urlparse
+        path = unquote(urlparse(url).path)
+        if os.name == 'nt' and path.startswith('/'):
+            path = path[1:]
+        return path
+    return url
+
+
+def _read_egg_link(path):
+    """读取旧式develop安装的 .egg-link，返回 (项目路径, egg-info路径)"""
+    project = _read_text(path).splitlines()
+    if not project:
+        return None, None
+    project = project[0].strip()
+    try:
+        for entry in os.scandir(project):
+            if entry.name.endswith('.egg-info'):
+                return project, entry.path
+    except OSError:
+        pass
+    return project, None
+
+
+def read_distribution(site_dir, entry_name):
+    """从site目录下的单个元数据条目构建PackageRecord，无法识别时返回None"""
+    meta_path = os.path.join(site_dir, entry_name)
+    editable = None
+
+    if entry_name.endswith('.dist-info'):
+        metadata_file = os.path.join(meta_path, 'METADATA')
+    elif entry_name.endswith('.egg-info'):
+        if os.path.isdir(meta_path):
+            metadata_file = os.path.join(meta_path, 'PKG-INFO')
+        else:
+            metadata_file = meta_path
+    elif entry_name.endswith('.egg'):
+        metadata_file = os.path.join(meta_path, 'EGG-INFO', 'PKG-INFO')
+    elif entry_name.endswith('.egg-link'):
+        editable, meta_path = _read_egg_link(meta_path)
+        if not meta_path:
+            return None
+        metadata_file = os.path.join(meta_path, 'PKG-INFO')
+    else:
+        return None
+
+    try:
+        headers = read_metadata_headers(metadata_file)
+    except OSError:
+        return None
+    name = headers.get('Name')
+    if not name:
+        return None
+
+    installer = ''
+    if entry_name.endswith('.dist-info'):
+        installer = _read_text(os.path.join(meta_path, 'INSTALLER'))
+        editable = _editable_location(meta_path)
+
+    return PackageRecord(
+        name=name,
+        version=headers.get('Version', ''),
+        location=site_dir,
+        installer=installer,
+        editable=editable,
+        path=meta_path,
+    )
+
+
+def _stat_key(st):
+    return st.st_mtime_ns, st.st_ino
+
+
+class SiteSnapshot:
+    """单个site目录的快照，以目录及各元数据条目的mtime/inode为键"""
+
+    def __init__(self, site_dir):
+        self.site_dir = site_dir
+        self.dir_key = None
+        self.entries = {}  # 条目名 -> (mtime_ns, inode)
+        self.records = {}  # 条目名 -> PackageRecord
+        self.dirty = True  # 上次扫描有读取失败的条目时需要重新检查
+
+    def update(self, force=False):
+        """与磁盘比较并只重新读取有变化的条目，返回是否有变化"""
+        try:
+            dir_key = _stat_key(os.stat(self.site_dir))
+        except OSError:
+            changed = bool(self.records)
+            self.dir_key = None
+            self.entries.clear()
+            self.records.clear()
+            return changed
+        if dir_key == self.dir_key and not self.dirty and not force:
+            return False
+
+        changed = False
+        self.dirty = False
+        seen = set()
+        try:
+            with os.scandir(self.site_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if not name.endswith(METADATA_SUFFIXES):
+                        continue
+                    try:
+                        key = _stat_key(entry.stat())
+                    except OSError:
+                        continue
+                    seen.add(name)
+                    if self.entries.get(name) == key:
+                        continue
+                    record = read_distribution(self.site_dir, name)
+                    if record is None:
+                        # 可能正在写入，下次刷新时重试
+                        self.dirty = True
+                        self.entries.pop(name, None)
+                        if self.records.pop(name, None) is not None:
+                            changed = True
+                        continue
+                    self.entries[name] = key
+                    if self.records.get(name) != record:
+                        self.records[name] = record
+                        changed = True
+        except OSError:
+            self.dirty = True
+            return changed
+
+        for name in list(self.records):
+            if name not in seen:
+                del self.records[name]
+                self.entries.pop(name, None)
+                changed = True
+        self.dir_key = dir_key
+        return changed
+
+
+def inventory_cache_path(python=None):
+    """返回某个解释器的清单缓存文件路径"""
+    import hashlib
+    python = os.path.normcase(os.path.abspath(python or sys.executable))
+    digest = hashlib.sha1(python.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_data_dir('inventory'), f'{digest}.json')
+
+
+def sort_records(records):
+    """按名称(不区分大小写)排序"""
+    return sorted(records, key=lambda r: r.name.lower())
+
+
+def installed_paths(path, flags):
+    """sys.path去掉第一项：脚本所在目录(-c、-m和交互模式下为当前目录)，其中的元数据目录
+    (开发中的检出、打包目录)不是已安装的包；-P/PYTHONSAFEPATH时没有这一项"""
+    return list(path if getattr(flags, 'safe_path', False) else path[1:])
+
+
+# 在其它解释器中按installed_paths的规则取sys.path(不能导入本模块，只用标准库)
+_SITE_PATHS_SCRIPT = ("import sys, json; "
+                      "print(json.dumps(sys.path if getattr(sys.flags, 'safe_path', False) else sys.path[1:]))")
+
+
+class InventoryEngine:
+    """已安装包清单引擎
+
+    metadata 模式在进程内读取 sys.path 上的元数据目录；
+    pip 模式调用 `pip list --format=json -v`；
+    auto 模式优先读取元数据，出错时回退到 pip。
+    """
+
+    def __init__(self, python=None, mode=MODE_AUTO, paths=None, cache_path=None):
+        self.python = python or sys.executable
+        self.mode = mode
+        self.paths = list(paths) if paths else None
+        self.cache_path = cache_path or inventory_cache_path(self.python)
+        self._site_paths = None
+        self._snapshots = {}  # site目录 -> SiteSnapshot
+        self._current = {}  # 规范化包名 -> PackageRecord
+        self._lock = threading.Lock()
+
+    def site_paths(self):
+        """返回待扫描的目录列表(按sys.path顺序，不含脚本所在目录/当前目录)"""
+        if self.paths is not None:
+            return self.paths
+        if self._site_paths is None:
+            if os.path.abspath(self.python) == os.path.abspath(sys.executable):
+                paths = installed_paths(sys.path, sys.flags)
+            else:
+                output = subprocess.check_output(
+                    [self.python, "-c", _SITE_PATHS_SCRIPT],
+                    stderr=subprocess.DEVNULL,
+                    universal_newlines=True,
+                    creationflags=CREATE_NO_WINDOW
+                )
+                paths = json.loads(output)
+            self._site_paths = [p for p in paths if os.path.isdir(p)]
+        return self._site_paths
+
+    def load(self):
+        """完整加载已安装包，返回按名称排序的PackageRecord列表"""
+        with self._lock:
+            self._snapshots.clear()
+            self._current.clear()
+        return self.refresh().records
+
+    def refresh(self, force=False):
+        """增量刷新，只重新读取新增、删除或变化的分发包，返回InventoryDelta"""
+        with self._lock:
+            if self.mode == MODE_PIP:
+                return self._apply(self.load_from_pip())
+            try:
+                return self._apply(self._refresh_snapshots(force))
+            except Exception:
+                if self.mode == MODE_METADATA:
+                    raise
+                return self._apply(self.load_from_pip())
+
+    def records(self):
+        """返回最近一次加载的清单"""
+        return sort_records(self._current.values())
+
+    def load_cache(self):
+        """读取上次保存的清单并作为当前清单，返回排序后的记录；没有可用缓存时返回None
+
+        之后的第一次refresh会与缓存比较，只报告真正的变化。
+        """
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION or data.get('python') != self.python:
+                return None
+            records = [PackageRecord(*row) for row in data['records']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        with self._lock:
+            if self._current:
+                return self.records()  # 已经有真实扫描结果
+            self._current = {normalize_name(r.name): r for r in records}
+        return self.records()
+
+    def save_cache(self):
+        """把当前清单写入紧凑的缓存文件(先写临时文件再替换)"""
+        with self._lock:
+            rows = [list(r) for r in self._current.values()]
+        data = {'version': CACHE_VERSION, 'python': self.python, 'records': rows}
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _refresh_snapshots(self, force):
+        paths = self.site_paths()
+        for site_dir in list(self._snapshots):
+            if site_dir not in paths:
+                del self._snapshots[site_dir]
+        changed = not self._current
+        for site_dir in paths:
+            snapshot = self._snapshots.get(site_dir)
+            if snapshot is None:
+                # 首次扫描该目录：当前清单可能来自缓存，必须重新汇总
+                snapshot = self._snapshots[site_dir] = SiteSnapshot(site_dir)
+                changed = True
+            if snapshot.update(force):
+                changed = True
+        if not changed:
+            return None
+
+        seen = set()
+        records = []
+        for site_dir in paths:
+            for record in self._snapshots[site_dir].records.values():
+                key = normalize_name(record.name)
+                if key not in seen:
+                    seen.add(key)
+                    records.append(record)
+        return records
+
+    def _apply(self, records):
+        """用新清单替换当前清单，并计算差异"""
+        if records is None:
+            return InventoryDelta([], [], [], self.records())
+        previous = self._current
+        current = {normalize_name(r.name): r for r in records}
+        added = [r for key, r in current.items() if key not in previous]
+        removed = [r for key, r in previous.items() if key not in current]
+        changed = [r for key, r in current.items()
+                   if key in previous and previous[key] != r]
+        self._current = current
+        return InventoryDelta(
+            sort_records(added), sort_records(removed), sort_records(changed),
+            self.records()
+        )
+
+    def load_from_pip(self):
+        """通过 pip list 子进程获取清单"""
+        cmd = [self.python, "-m", "pip", "list", "--format=json", "-v"]
+        for path in self.paths or ():
+            cmd += ["--path", path]
+        output = subprocess.check_output(
+            cmd,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            creationflags=CREATE_NO_WINDOW
+        )
+        records = []
+        for item in json.loads(output):
+            records.append(PackageRecord(
+                name=item['name'],
+                version=item['version'],
+                location=item.get('location', ''),
+                installer=item.get('installer', ''),
+                editable=item.get('editable_project_location'),
+                path=None,
+            ))
+        return sort_records(records)
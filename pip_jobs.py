@@ -0,0 +1,306 @@
+"""安装任务队列：把选项相同的排队任务合并成一次pip调用，并把输出和失败归属到各任务"""
+import collections
+import itertools
+import re
+import subprocess
+import sys
+import threading
+
+from pip_common import CREATE_NO_WINDOW, normalize_name
+from pip_phases import PhaseTracker
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+STATUS_NAMES = {
+    QUEUED: '排队中',
+    RUNNING: '安装中',
+    SUCCEEDED: '成功',
+    FAILED: '失败',
+}
+
+_NAME = r"([A-Za-z0-9][A-Za-z0-9._-]*)"
+_COLLECTING_RE = re.compile(r"^\s*Collecting " + _NAME + r"(?:.*\(from ([^)]+)\))?")
+_SATISFIED_RE = re.compile(r"^\s*Requirement already satisfied: " + _NAME + r"(?:.*\(from ([^)]+)\))?")
+# 能指出是哪个包导致失败的错误信息
+_BLAME_RES = [
+    re.compile(r"Could not find a version that satisfies the requirement " + _NAME),
+    re.compile(r"No matching distribution found for " + _NAME),
+    re.compile(r"The user requested " + _NAME),
+    re.compile(r"Could not build wheels for " + _NAME),
+    re.compile(r"Failed building wheel for " + _NAME),
+    re.compile(r"Invalid requirement: '?" + _NAME),
+]
+_CANNOT_INSTALL_RE = re.compile(r"Cannot install (.+?) because")
+
+_job_ids = itertools.count(1)
+
+
+def requirement_name(requirement):
+    """从需求字符串中取出规范化的项目名"""
+    match = re.match(r"\s*" + _NAME, requirement)
+    return normalize_name(match.group(1)) if match else normalize_name(requirement)
+
+
+class InstallJob:
+    """一个排队的安装任务"""
+
+    def __init__(self, requirement, options=(), python=None):
+        self.id = next(_job_ids)
+        self.requirement = requirement.strip()
+        self.name = requirement_name(self.requirement)
+        self.options = tuple(options)
+        self.python = python or sys.executable
+        self.status = QUEUED
+        self.output = []
+        self.error = ''
+        self.isolated = False  # 合并安装失败后单独重试的任务不再与其它任务合并
+        self.reported = False  # 失败信息是否已经提示过用户
+        self.trace = None  # 最近一次执行的阶段耗时(同一批任务共用)
+
+    @property
+    def batch_key(self):
+        """选项和解释器都相同的任务才能合并到同一次pip调用中"""
+        return self.python, self.options
+
+
+class InstallQueue:
+    """线程安全的安装队列和调度器
+
+    每个解释器(环境)有自己的调度线程，不同环境的安装同时进行。调度线程每次
+    取出该环境的队首任务，并把队列中所有可兼容的任务(相同解释器和选项、
+    项目名不重复)合并成一次 `pip install`，这样整批任务只需一次依赖解析和
+    一次下载。合并安装失败时，能从错误信息中定位到的任务标记为失败，
+    其余任务重新排队；无法定位时逐个单独重试。
+
+    listener(job, event, data) 会从调度线程中调用，event 为 'status'、'output'，
+    每批pip调用结束时以 'trace' 传出该批的PhaseTracker(job为批中第一个任务)，
+    所有环境的队列都清空时以 listener(None, 'idle', None) 通知。
+    prepare(python, requirements) 在每批pip调用之前调用(例如保存环境快照)，
+    complete(python, options, lines, trace, on_line) 在pip调用成功之后、该批结束之前调用
+    (例如编译字节码，耗时计入trace)，两者抛出的异常只记入输出，不影响安装。
+    """
+
+    def __init__(self, listener=None, run_command=None, command_builder=None, prepare=None, complete=None):
+        self.listener = listener
+        self.run_command = run_command or self._run_command
+        self.command_builder = command_builder or self._build_command
+        self.prepare = prepare
+        self.complete = complete
+        self.jobs = []
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+        self._workers = {}  # 解释器 -> 调度线程
+        self._processes = set()
+
+    def enqueue(self, requirement, options=(), python=None):
+        """加入一个安装任务并确保调度线程在运行"""
+        return self.enqueue_many([requirement], options, python)[0]
+
+    def enqueue_many(self, requirements, options=(), python=None):
+        """一次加入多个任务，保证它们在调度线程取任务之前全部入队(从而合并为一次pip调用)"""
+        jobs = [InstallJob(requirement, options, python) for requirement in requirements]
+        with self._lock:
+            self.jobs.extend(jobs)
+            self._pending.extend(jobs)
+        for job in jobs:
+            self._emit(job, 'status', QUEUED)
+        self.start()
+        return jobs
+
+    def start(self):
+        """为每个有排队任务的环境启动调度线程"""
+        with self._lock:
+            for python in {job.python for job in self._pending}:
+                if python not in self._workers:
+                    worker = self._workers[python] = threading.Thread(
+                        target=self._run, args=(python,), daemon=True
+                    )
+                    worker.start()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending) or bool(self._workers)
+
+    def next_batch(self, python=None):
+        """取出下一批可以合并执行的任务(python不为None时只取该环境的任务)"""
+        with self._lock:
+            first = None
+            for job in self._pending:
+                if python is None or job.python == python:
+                    first = job
+                    break
+            if first is None:
+                return []
+            self._pending.remove(first)
+            batch = [first]
+            if first.isolated:
+                return batch
+            names = {first.name}
+            remaining = collections.deque()
+            for job in self._pending:
+                if job.batch_key == first.batch_key and not job.isolated and job.name not in names:
+                    batch.append(job)
+                    names.add(job.name)
+                else:
+                    remaining.append(job)
+            self._pending = remaining
+            return batch
+
+    def _requeue_front(self, jobs):
+        with self._lock:
+            self._pending.extendleft(reversed(jobs))
+
+    def _build_command(self, python, options, requirements):
+        return [python, "-m", "pip", "install", *options, *requirements]
+
+    def _run(self, python):
+        while True:
+            batch = self.next_batch(python)
+            if not batch:
+                with self._lock:
+                    if any(job.python == python for job in self._pending):
+                        continue
+                    del self._workers[python]
+                    idle = not self._workers and not self._pending
+                break
+            self.run_batch(batch)
+        if idle:
+            self._emit(None, 'idle', None)
+
+    def run_batch(self, batch):
+        """执行一批任务并把结果归属到各任务"""
+        for job in batch:
+            job.status = RUNNING
+            self._emit(job, 'status', RUNNING)
+        if self.prepare is not None:
+            try:
+                self.prepare(batch[0].python, [job.requirement for job in batch])
+            except Exception as e:
+                batch[0].output.append(f"安装前准备失败: {e}\n")
+                self._emit(batch[0], 'output', batch[0].output[-1])
+
+        by_name = {job.name: job for job in batch}
+        parents = {}  # 依赖包名 -> 引入它的任务
+        current = batch[0]
+        lines = []
+        trace = PhaseTracker(python=batch[0].python)
+        for job in batch:
+            job.trace = trace
+
+        def on_line(line):
+            nonlocal current
+            if trace.feed(line):
+                return  # 下载进度行只用于进度条
+            lines.append(line)
+            job = self._attribute(line, by_name, parents) or current
+            current = job
+            job.output.append(line)
+            self._emit(job, 'output', line)
+
+        try:
+            first = batch[0]
+            cmd = self.command_builder(first.python, first.options, [job.requirement for job in batch])
+            trace.command = cmd
+            return_code = self.run_command(cmd, on_line)
+        except Exception as e:
+            return_code = None
+            on_line(f"发生意外错误: {e}\n")
+        if return_code == 0 and self.complete is not None:
+            try:
+                self.complete(first.python, first.options, list(lines), trace, on_line)
+            except Exception as e:
+                on_line(f"安装后处理失败: {e}\n")
+        trace.finish(return_code)
+        self._emit(batch[0], 'trace', trace)
+
+        if return_code == 0:
+            for job in batch:
+                job.status = SUCCEEDED
+                self._emit(job, 'status', SUCCEEDED)
+            return
+
+        blamed = self._blame(lines, by_name, parents)
+        if len(batch) == 1:
+            blamed = {batch[0]}
+        for job in blamed:
+            job.status = FAILED
+            job.error = ''.join(job.output)
+            self._emit(job, 'status', FAILED)
+
+        innocent = [job for job in batch if job not in blamed]
+        if not innocent:
+            return
+        if not blamed:
+            # 无法判断是谁导致失败：拆开逐个重试
+            for job in innocent:
+                job.isolated = True
+        for job in innocent:
+            job.status = QUEUED
+            job.output.append("\n[合并安装失败，重新排队]\n")
+            self._emit(job, 'status', QUEUED)
+        self._requeue_front(innocent)
+
+    def _attribute(self, line, by_name, parents):
+        """根据 Collecting/Requirement already satisfied 行判断输出属于哪个任务"""
+        match = _COLLECTING_RE.match(line) or _SATISFIED_RE.match(line)
+        if not match:
+            return None
+        name = normalize_name(match.group(1))
+        if name in by_name:
+            return by_name[name]
+        if match.group(2):
+            # "(from requests)"：依赖包的输出归属到引入它的任务
+            origin = requirement_name(match.group(2).split(',')[0])
+            parent = by_name.get(origin) or parents.get(origin)
+            if parent is not None:
+                parents[name] = parent
+                return parent
+        return None
+
+    def _blame(self, lines, by_name, parents):
+        """从错误信息中找出导致失败的任务"""
+        names = set()
+        for line in lines:
+            for pattern in _BLAME_RES:
+                for match in pattern.finditer(line):
+                    names.add(normalize_name(match.group(1)))
+            match = _CANNOT_INSTALL_RE.search(line)
+            if match:
+                for part in re.split(r",| and ", match.group(1)):
+                    if part.strip():
+                        names.add(requirement_name(part))
+        blamed = set()
+        for name in names:
+            job = by_name.get(name) or parents.get(name)
+            if job is not None:
+                blamed.add(job)
+        return blamed
+
+    def _run_command(self, cmd, on_line):
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            creationflags=CREATE_NO_WINDOW
+        )
+        self._processes.add(process)
+        try:
+            for line in process.stdout:
+                on_line(line)
+            return process.wait()
+        finally:
+            self._processes.discard(process)
+
+    def terminate(self):
+        for process in list(self._processes):
+            process.terminate()
+
+    def _emit(self, job, event, data):
+        if self.listener is not None:
+            self.listener(job, event, data)
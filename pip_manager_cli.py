@@ -0,0 +1,627 @@
+"""命令行入口：基于PipEngine，在多个环境中并行执行批量操作(不需要图形界面)
+
+    python pip_manager_cli.py envs
+    python pip_manager_cli.py list --env myvenv --json
+    python pip_manager_cli.py list --size
+    python pip_manager_cli.py -v verify --env myvenv
+    python pip_manager_cli.py install requests "numpy<2" --all-envs
+    python pip_manager_cli.py install -r requirements.txt --env /path/to/python
+    python pip_manager_cli.py uninstall six --env a --env b
+    python pip_manager_cli.py mirror set tsinghua
+    python pip_manager_cli.py mirror health
+    python pip_manager_cli.py catalog update
+    python pip_manager_cli.py catalog search reqeusts
+    python pip_manager_cli.py batch jobs.json
+    python pip_manager_cli.py wheelhouse prefetch -r requirements.txt --mirror tsinghua --mirror aliyun
+    python pip_manager_cli.py install -r requirements.txt --from-wheelhouse
+    python pip_manager_cli.py install -U requests --preview
+    python pip_manager_cli.py install numpy pandas --parallel-compile 1
+    python pip_manager_cli.py snapshot list --env a
+    python pip_manager_cli.py snapshot rollback 3f2a9c --env a
+
+--env 可以是环境名称(见 envs 命令)、解释器路径或环境目录，可重复；--all-envs 表示
+所有发现的环境；都不指定时使用运行本程序的解释器。--json 输出每行一个JSON对象
+(事件和最终结果)，便于脚本处理。任一操作失败时退出码为1。
+
+安装遇到网络错误时自动改用健康状况最好的其它镜像重试(只对该次调用生效)；
+mirror health 显示各镜像的成功率和延迟，mirror test 测速并记入健康记录。
+catalog 维护镜像全部项目名的本地索引(增量更新)，search 支持前缀和模糊匹配。
+
+wheelhouse prefetch 把需求(含依赖)的分发文件并行下载到本地仓库，--mirror 可重复，
+下载分布在这些镜像上；install --from-wheelhouse 只从本地仓库安装(--no-index)。
+
+每次安装/卸载前自动保存环境快照(--no-snapshot 关闭)，并把可能被改变的包重新打包
+保留到本地仓库；snapshot diff 比较两个快照(或与当前状态)，snapshot rollback
+只用本地仓库中的wheel恢复到快照中的版本，不访问网络。
+
+批量文件为JSON列表(或带 "jobs" 键的对象)，按顺序执行，相邻的安装步骤合并提交：
+    [{"action": "install", "requirements": ["requests"], "envs": ["a", "b"], "options": ["-U"]},
+     {"action": "install", "requirements_file": "requirements.txt"},
+     {"action": "uninstall", "packages": ["six"], "envs": ["a"]}]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from pip_engine import DISPLAY_NAMES, PIP_CONFIGS, PipEngine
+from pip_common import PREFETCH_FAILED, PREFETCH_NAMES, normalize_name
+from pip_compile import OPTIMIZE_LEVELS, compile_option
+from pip_envs import KIND_CUSTOM, KIND_NAMES, Environment, current_environment, discover_environments, env_python
+from pip_footprint import Footprint, total_footprint
+from pip_jobs import FAILED, STATUS_NAMES
+from pip_phases import format_bytes
+from pip_preview import ACTION_NAMES
+from pip_uninstall import FAILED as UNINSTALL_FAILED, REMOVED
+from pip_verify import VERIFY_DAMAGED, VERIFY_NAMES, VERIFY_NO_RECORD
+
+
+UNINSTALL_NAMES = {REMOVED: '已卸载', UNINSTALL_FAILED: '卸载失败'}
+
+
+class Reporter:
+    """把引擎事件输出为文本或JSON行(多个工作线程同时调用)"""
+
+    def __init__(self, json_mode=False, verbose=False, trace_dir=None):
+        self.json_mode = json_mode
+        self.verbose = verbose
+        self.trace_dir = trace_dir
+        self.labels = {}  # 解释器 -> 环境名称
+        self._lock = threading.Lock()
+
+    def label(self, python):
+        return self.labels.get(python, python)
+
+    def emit(self, data, text=None):
+        with self._lock:
+            if self.json_mode:
+                print(json.dumps(data, ensure_ascii=False), flush=True)
+            elif text is not None:
+                print(text, flush=True)
+
+    def on_event(self, job, event, data):
+        if event == 'output':
+            if self.verbose:
+                self.emit({'event': 'output', 'python': job.python, 'line': data},
+                          f"[{self.label(job.python)}] {data.rstrip()}")
+        elif event == 'status':
+            self.emit({'event': 'status', 'python': job.python, 'requirement': job.requirement, 'status': data},
+                      f"[{self.label(job.python)}] {job.requirement}: {STATUS_NAMES[data]}" if self.verbose else None)
+        elif event == 'command':
+            self.emit({'event': 'command', 'python': data[0], 'args': data[3:]},
+                      f"[{self.label(data[0])}] pip {' '.join(data[3:])}")
+        elif event == 'trace':
+            record = {'event': 'trace', 'python': data.python, 'phases': data.report()['phases']}
+            if self.trace_dir:
+                record['files'] = data.save(self.trace_dir)
+            self.emit(record, f"[{self.label(data.python)}] {data.summary()}")
+        elif event == 'uninstall':
+            self.emit({'event': 'uninstall', 'python': data.python, 'name': data.name, 'status': data.status},
+                      f"[{self.label(data.python)}] {data.name}: {UNINSTALL_NAMES.get(data.status, '未安装，已跳过')}")
+        elif event == 'failover':
+            self.emit({'event': 'failover', 'from': data[0], 'to': data[1]},
+                      f"网络错误: {DISPLAY_NAMES.get(data[0], data[0])} -> 改用 {DISPLAY_NAMES[data[1]]} 重试")
+        elif event == 'snapshot':
+            self.emit({'event': 'snapshot', **data._asdict()},
+                      f"[{self.label(data.python)}] 快照 {data.id[:12]} {data.label}" if self.verbose else None)
+        elif event == 'prefetch':
+            self.emit({'event': 'prefetch', **data._asdict()},
+                      f"{data.filename}: {PREFETCH_NAMES[data.status]}"
+                      + (f" ({format_bytes(data.size)}, {data.seconds:.2f}s, {data.source})"
+                         if data.source else '') + (f" {data.error}" if data.error else ''))
+
+
+def resolve_envs(names, all_envs=False):
+    """把 --env 参数解析为Environment列表"""
+    if all_envs:
+        return discover_environments()
+    if not names:
+        return [current_environment()]
+    environments = []
+    discovered = None
+    for name in names:
+        python = name if os.path.isfile(name) else env_python(name) if os.path.isdir(name) else None
+        if python:
+            prefix = name if os.path.isdir(name) else os.path.dirname(os.path.dirname(os.path.abspath(python)))
+            environments.append(Environment(os.path.basename(os.path.normpath(prefix)), python, KIND_CUSTOM, prefix))
+            continue
+        if discovered is None:
+            discovered = discover_environments()
+        matches = [env for env in discovered if name in (env.name, os.path.basename(env.prefix))]
+        if not matches:
+            raise SystemExit(f"未找到环境: {name}(可用 envs 命令查看)")
+        environments.append(matches[0])
+    return environments
+
+
+def command_envs(engine, reporter, args):
+    environments = discover_environments()
+    for env in environments:
+        reporter.emit({'event': 'environment', 'name': env.name, 'python': env.python,
+                       'kind': env.kind, 'prefix': env.prefix},
+                      f"{env.name:<30} {KIND_NAMES[env.kind]:<6} {env.python}")
+    return 0
+
+
+def command_list(engine, reporter, args):
+    environments = resolve_envs(args.env, args.all_envs)
+    results = engine.scan([env.python for env in environments]).result()
+    code = 0
+    for env in environments:
+        result = results[env.python]
+        if isinstance(result, Exception):
+            reporter.emit({'event': 'error', 'python': env.python, 'error': str(result)},
+                          f"# {env.name}: 无法读取 ({result})")
+            code = 1
+            continue
+        footprints = engine.footprint(env.python).result() if args.size else {}
+        records = result.records
+        if args.size:
+            records = sorted(records, key=lambda r: -footprints.get(normalize_name(r.name), Footprint(0, 0)).size)
+        if reporter.json_mode:
+            packages = [record._asdict() for record in records]
+            for package in packages:
+                footprint = footprints.get(normalize_name(package['name']))
+                if footprint is not None:
+                    package.update(footprint._asdict())
+            reporter.emit({'event': 'inventory', 'python': env.python, 'packages': packages})
+            continue
+        if len(environments) > 1:
+            print(f"# {env.name} ({env.python}): {len(result.records)} 个包")
+        for record in records:
+            footprint = footprints.get(normalize_name(record.name))
+            if footprint is None:
+                print(f"{record.name}=={record.version}")
+            else:
+                print(f"{format_bytes(footprint.size):>10} {footprint.files:>6}  {record.name}=={record.version}")
+        if args.size:
+            total = total_footprint(footprints)
+            print(f"{format_bytes(total.size):>10} {total.files:>6}  共 {len(records)} 个包")
+    return code
+
+
+def install_requirements(engine, environments, requirements, requirements_files, options):
+    """提交安装(需求文件只安装未满足的部分)，返回Future列表"""
+    from pip_requirements import load_requirements
+    futures = []
+    extra_options = []
+    file_requirements = []
+    for path in requirements_files or ():
+        parsed = load_requirements(path)
+        file_requirements.extend(parsed.requirements)
+        extra_options += [option for option in parsed.options if option not in extra_options]
+    for env in environments:
+        pending = list(requirements)
+        if file_requirements:
+            pending += engine.check_requirements(file_requirements, env.python).unsatisfied
+        if pending:
+            futures.append(engine.install(pending, list(options) + extra_options, pythons=[env.python]))
+    return futures
+
+
+def report_install(reporter, futures):
+    results = [result for future in futures for result in future.result()]
+    for result in results:
+        reporter.emit({'event': 'result', 'action': 'install', 'python': result.python,
+                       'requirement': result.requirement, 'status': result.status, 'reason': result.reason},
+                      f"[{reporter.label(result.python)}] {result.requirement}: {STATUS_NAMES[result.status]}"
+                      + (f" ({result.reason})" if result.reason else ''))
+    return 1 if any(result.status == FAILED for result in results) else 0
+
+
+def report_uninstall(reporter, future):
+    results = future.result()
+    for result in results:
+        reporter.emit({'event': 'result', 'action': 'uninstall', 'python': result.python,
+                       'name': result.name, 'status': result.status})
+    return 1 if any(result.status == UNINSTALL_FAILED for result in results) else 0
+
+
+def install_options(args, engine=None):
+    options = []
+    if getattr(args, 'from_wheelhouse', False):
+        options += engine.get_wheelhouse().install_options()
+    if args.upgrade:
+        options.append('--upgrade')
+    if args.user:
+        options.append('--user')
+    if args.index_url:
+        options += ['--index-url', args.index_url]
+    if getattr(args, 'parallel_compile', None) is not None:
+        options.append(compile_option(args.parallel_compile))
+    return options
+
+
+def command_verify(engine, reporter, args):
+    environments = resolve_envs(args.env, args.all_envs)
+    if args.workers:
+        engine.verifier.workers = args.workers
+    code = 0
+    for env in environments:
+        results = engine.verify(env.python).result()
+        damaged = [result for result in results.values() if result.status == VERIFY_DAMAGED]
+        for result in sorted(results.values(), key=lambda r: r.name.lower()):
+            text = None
+            if result.status == VERIFY_DAMAGED:
+                text = (f"{result.name}=={result.version}: {len(result.modified)} 个文件被修改，"
+                        f"{len(result.missing)} 个文件缺失")
+                if reporter.verbose:
+                    text += ''.join(f"\n    修改 {path}" for path in result.modified)
+                    text += ''.join(f"\n    缺失 {path}" for path in result.missing)
+            elif result.status == VERIFY_NO_RECORD and reporter.verbose:
+                text = f"{result.name}=={result.version}: {VERIFY_NAMES[result.status]}(没有RECORD)"
+            reporter.emit({'event': 'verify', 'python': env.python, **result._asdict()}, text)
+        reporter.emit({'event': 'result', 'action': 'verify', 'python': env.python, 'packages': len(results),
+                       'files': sum(result.checked for result in results.values()), 'damaged': len(damaged)},
+                      f"# {env.name}: 校验 {len(results)} 个包，{sum(r.checked for r in results.values())} 个文件，"
+                      f"{len(damaged)} 个包有问题")
+        if damaged:
+            code = 1
+    return code
+
+
+def preview_install(engine, reporter, environments, args):
+    """先显示解析得到的变化，确认后按固定版本集合安装"""
+    from pip_requirements import load_requirements
+    requirements = list(args.requirements)
+    options = install_options(args, engine)
+    for path in args.requirement_files or ():
+        parsed = load_requirements(path)
+        requirements += parsed.requirements
+        options += [option for option in parsed.options if option not in options]
+    try:
+        plans = engine.preview(requirements, options, [env.python for env in environments]).result()
+    except RuntimeError as e:
+        reporter.emit({'event': 'error', 'error': str(e)}, f"解析需求失败:\n{e}")
+        return 1
+    for plan in plans:
+        reporter.emit({'event': 'plan', 'python': plan.python, 'cached': plan.cached, 'seconds': plan.seconds,
+                       'changes': [change._asdict() for change in plan.changes]},
+                      f"# {reporter.label(plan.python)}: {len(plan.changes)} 个变化"
+                      f"({'缓存' if plan.cached else '解析'} {plan.seconds:.1f}s)")
+        for change in plan.changes if not reporter.json_mode else ():
+            current = f"{change.installed} -> " if change.installed else ''
+            reporter.emit(None, f"  {ACTION_NAMES[change.action]:<4} {change.name} {current}{change.version}"
+                                + ('' if change.requested else '  (依赖)'))
+    if not any(plan.changes for plan in plans):
+        return 0
+    if not args.yes:
+        if reporter.json_mode or not sys.stdin.isatty():
+            return 0
+        if input("按以上计划安装? [y/N] ").strip().lower() != 'y':
+            return 0
+    return report_install(reporter, [engine.install_plans(plans)])
+
+
+def command_install(engine, reporter, args):
+    if not args.requirements and not args.requirement_files:
+        raise SystemExit("请指定要安装的包或 -r 需求文件")
+    environments = resolve_envs(args.env, args.all_envs)
+    reporter.labels.update((env.python, env.name) for env in environments)
+    if args.compile_workers:
+        engine.compile_workers = args.compile_workers
+    if args.preview:
+        return preview_install(engine, reporter, environments, args)
+    futures = install_requirements(engine, environments, args.requirements, args.requirement_files,
+                                   install_options(args, engine))
+    if not futures:
+        reporter.emit({'event': 'result', 'action': 'install', 'status': 'satisfied'}, "所有需求都已满足")
+        return 0
+    code = report_install(reporter, futures)
+    if args.from_wheelhouse:
+        for future in futures:
+            for result in future.result():
+                engine.get_wheelhouse().mark_used_from_output(result.output)
+    return code
+
+
+def command_uninstall(engine, reporter, args):
+    environments = resolve_envs(args.env, args.all_envs)
+    reporter.labels.update((env.python, env.name) for env in environments)
+    return report_uninstall(reporter, engine.uninstall({env.python: list(args.packages) for env in environments}))
+
+
+def command_mirror(engine, reporter, args):
+    if args.action == 'set':
+        if not args.name:
+            raise SystemExit(f"请指定镜像源: {', '.join(list(PIP_CONFIGS) + ['custom'])}")
+        try:
+            backup = engine.set_source(args.name, args.url)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        reporter.emit({'event': 'mirror', 'source': args.name, 'backup': backup},
+                      f"已切换到 {DISPLAY_NAMES.get(args.name, args.name)}" + (f"，备份文件: {backup}" if backup else ''))
+    elif args.action == 'reset':
+        backup = engine.restore_default_source()
+        reporter.emit({'event': 'mirror', 'source': 'default', 'backup': backup},
+                      f"已恢复默认源，备份文件: {backup}" if backup else "已经是默认配置")
+    elif args.action == 'test':
+        from pip_mirrors import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, benchmark_mirrors
+        mirrors = {name: info['url'] for name, info in PIP_CONFIGS.items()}
+        if args.url:
+            mirrors['custom'] = args.url
+        probes = benchmark_mirrors(mirrors, timeout=args.timeout or DEFAULT_TIMEOUT,
+                                   concurrency=args.concurrency or DEFAULT_CONCURRENCY)
+        for probe in probes:
+            engine.health.record(probe.name, probe.error is None, probe.ttfb_ms, kind='probe')
+            reporter.emit({'event': 'probe', **probe._asdict()},
+                          f"{DISPLAY_NAMES[probe.name]:<8} " + (probe.error if probe.error else
+                          f"连接 {probe.connect_ms:.0f} ms  首字节 {probe.ttfb_ms:.0f} ms  "
+                          f"{format_bytes(int(probe.throughput or 0))}/s"))
+    elif args.action == 'health':
+        for name in engine.health.rank(PIP_CONFIGS):
+            stats = engine.health.stats(name)
+            rate = '-' if stats.success_rate is None else f"{stats.success_rate:.0%}"
+            latency = '-' if stats.latency_ms is None else f"{stats.latency_ms:.0f} ms"
+            reporter.emit({'event': 'health', **stats._asdict()},
+                          f"{DISPLAY_NAMES[name]:<8} 成功率 {rate:>5}  延迟 {latency:>8}  共 {stats.attempts} 次")
+    else:
+        source = engine.current_source()
+        url = PIP_CONFIGS.get(source, {}).get('url', '')
+        reporter.emit({'event': 'mirror', 'source': source, 'url': url},
+                      f"当前源: {DISPLAY_NAMES[source]} {url}")
+    return 0
+
+
+def command_wheelhouse(engine, reporter, args):
+    wheelhouse = engine.get_wheelhouse()
+    if args.action == 'prefetch':
+        from pip_requirements import load_requirements
+        requirements = list(args.requirements)
+        for path in args.requirement_files or ():
+            requirements += load_requirements(path).requirements
+        if not requirements:
+            raise SystemExit("请指定要下载的包或 -r 需求文件")
+        environments = resolve_envs(args.env, args.all_envs)
+        reporter.labels.update((env.python, env.name) for env in environments)
+        future = engine.prefetch(requirements, [env.python for env in environments],
+                                 mirrors=args.mirror or (), index_url=args.index_url,
+                                 connections=args.connections)
+        try:
+            results = future.result()
+        except RuntimeError as e:
+            reporter.emit({'event': 'error', 'error': str(e)}, f"解析需求失败:\n{e}")
+            return 1
+        downloaded = [result for result in results if result.source]
+        total = sum(result.size for result in downloaded)
+        reporter.emit({'event': 'result', 'action': 'prefetch', 'files': len(results),
+                       'downloaded': len(downloaded), 'bytes': total,
+                       'failed': sum(result.status == PREFETCH_FAILED for result in results)},
+                      f"共 {len(results)} 个文件，下载 {len(downloaded)} 个 ({format_bytes(total)})，"
+                      f"仓库 {format_bytes(wheelhouse.total_size())}")
+        return 1 if any(result.status == PREFETCH_FAILED for result in results) else 0
+    if args.action == 'prune':
+        limit = wheelhouse.limit if args.limit is None else int(args.limit * 1024 * 1024)
+        removed = wheelhouse.evict(limit)
+        reporter.emit({'event': 'result', 'action': 'prune', 'removed': removed},
+                      f"已删除 {len(removed)} 个文件，仓库 {format_bytes(wheelhouse.total_size())}")
+        return 0
+    for files, size, _used in wheelhouse.entries():
+        reporter.emit({'event': 'wheel', 'files': files, 'size': size},
+                      f"{format_bytes(size):>10}  {', '.join(files)}")
+    reporter.emit({'event': 'wheelhouse', 'path': wheelhouse.wheel_dir, 'size': wheelhouse.total_size()},
+                  f"# {wheelhouse.wheel_dir}: {format_bytes(wheelhouse.total_size())}")
+    return 0
+
+
+def command_catalog(engine, reporter, args):
+    catalog = engine.catalog(args.index_url)
+    if args.action == 'update' or (args.action == 'search' and not len(catalog)):
+        try:
+            update = engine.update_catalog(args.index_url).result()
+        except (OSError, ValueError) as e:
+            reporter.emit({'event': 'error', 'error': str(e)}, f"更新项目名索引失败: {e}")
+            return 1
+        reporter.emit({'event': 'catalog', 'url': catalog.index_url, **update._asdict()},
+                      f"{catalog.index_url}: {update.count:,} 个项目 ({update.mode}, "
+                      f"+{update.added} -{update.removed}, {update.seconds:.1f}s)")
+    if args.action == 'search':
+        for query in args.queries:
+            names = catalog.search(query, args.limit)
+            reporter.emit({'event': 'search', 'query': query, 'names': names}, '\n'.join(names))
+    return 0
+
+
+def format_diff(diff):
+    lines = [f"+ {name}=={version}" for name, version in diff.added]
+    lines += [f"- {name}=={version}" for name, version in diff.removed]
+    lines += [f"~ {name} {old} -> {new}" for name, old, new in diff.changed]
+    return '\n'.join(lines) or '没有变化'
+
+
+def command_snapshot(engine, reporter, args):
+    environments = resolve_envs(args.env, args.all_envs)
+    reporter.labels.update((env.python, env.name) for env in environments)
+    if args.action == 'list':
+        for env in environments:
+            for snapshot in engine.snapshots.history(env.python)[-args.limit:]:
+                reporter.emit({'event': 'snapshot', **snapshot._asdict()},
+                              f"{snapshot.id[:12]}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.time))}"
+                              f"  {snapshot.count:>4} 个包  [{env.name}] {snapshot.label}")
+        return 0
+    if args.action == 'take':
+        for env in environments:
+            records = engine.refresh_inventory(env.python).records if args.retain else ()
+            snapshot = engine.take_snapshot(env.python, args.label or '手动快照',
+                                            retain=[r.name for r in records])
+            reporter.emit({'event': 'snapshot', **snapshot._asdict()},
+                          f"[{env.name}] 快照 {snapshot.id[:12]}: {snapshot.count} 个包")
+        return 0
+    if len(environments) != 1:
+        raise SystemExit("diff 和 rollback 只能指定一个环境")
+    python = environments[0].python
+    if not args.ids:
+        raise SystemExit("请指定快照ID(可用 snapshot list 查看)")
+    try:
+        if args.action == 'diff':
+            old = engine.snapshots.resolve(python, args.ids[0])
+            new = (engine.snapshots.resolve(python, args.ids[1]) if len(args.ids) > 1
+                   else engine.take_snapshot(python, '比较时的当前状态'))
+            diff = engine.snapshots.diff(old.id, new.id)
+            reporter.emit({'event': 'diff', 'old': old.id, 'new': new.id, **diff._asdict()}, format_diff(diff))
+            return 0
+        def on_line(line):
+            if reporter.verbose:
+                reporter.emit({'event': 'output', 'python': python, 'line': line},
+                              f"[{reporter.label(python)}] {line.rstrip()}")
+
+        result = engine.rollback(python, args.ids[0], on_line).result()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if result.missing:
+        reporter.emit({'event': 'error', 'missing': result.missing},
+                      f"本地仓库中缺少以下wheel，无法离线回滚: {', '.join(result.missing)}")
+        return 1
+    reporter.emit({'event': 'result', 'action': 'rollback', 'python': python, 'snapshot': result.snapshot.id,
+                   'installed': result.installed, 'removed': result.removed, 'status': result.status},
+                  f"回滚到 {result.snapshot.id[:12]}: 安装 {len(result.installed)} 个，卸载 {len(result.removed)} 个，"
+                  f"{STATUS_NAMES[result.status]}")
+    return 1 if result.status == FAILED else 0
+
+
+def command_batch(engine, reporter, args):
+    with open(args.file, encoding='utf-8') as f:
+        data = json.load(f)
+    steps = data.get('jobs', []) if isinstance(data, dict) else data
+    base = os.path.dirname(os.path.abspath(args.file))
+    code = 0
+    pending = []  # 已提交、尚未等待的安装
+    for step in steps:
+        environments = resolve_envs(step.get('envs'), step.get('all_envs', False))
+        reporter.labels.update((env.python, env.name) for env in environments)
+        action = step.get('action')
+        if action == 'install':
+            files = [os.path.join(base, path) for path in
+                     ([step['requirements_file']] if step.get('requirements_file') else [])]
+            # 相邻的安装步骤一起提交，由安装队列按环境合并、并行执行
+            pending += install_requirements(engine, environments, step.get('requirements', []),
+                                            files, step.get('options', []))
+        elif action == 'uninstall':
+            if pending:
+                code |= report_install(reporter, pending)
+                pending = []
+            code |= report_uninstall(reporter, engine.uninstall(
+                {env.python: list(step.get('packages', [])) for env in environments}))
+        else:
+            raise SystemExit(f"未知的操作: {action}")
+    if pending:
+        code |= report_install(reporter, pending)
+    return code
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="pip管理工具命令行(不需要图形界面)")
+    parser.add_argument('--json', action='store_true', help='每行输出一个JSON对象')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示pip输出和任务状态变化')
+    parser.add_argument('--no-worker', action='store_true', help='每条命令启动新的pip进程')
+    parser.add_argument('--trace-dir', help='保存每次pip调用的阶段耗时(JSON和Chrome trace)')
+    parser.add_argument('--wheelhouse', help='本地wheel仓库目录(默认在数据目录中)')
+    parser.add_argument('--wheelhouse-limit', type=float, help='本地wheel仓库容量(MB)')
+    parser.add_argument('--no-snapshot', action='store_true', help='安装/卸载前不保存环境快照')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_env_options(p):
+        p.add_argument('--env', action='append', help='环境名称、解释器路径或环境目录(可重复)')
+        p.add_argument('--all-envs', action='store_true', help='所有发现的环境')
+
+    sub.add_parser('envs', help='列出发现的Python环境')
+
+    p = sub.add_parser('list', help='列出已安装的包')
+    p.add_argument('--size', action='store_true', help='显示各包的磁盘占用和文件数(按大小排序)')
+    add_env_options(p)
+
+    p = sub.add_parser('verify', help='按RECORD中的哈希校验已安装的文件')
+    p.add_argument('--workers', type=int, help='计算哈希的进程数(默认为CPU数)')
+    add_env_options(p)
+
+    p = sub.add_parser('install', help='安装包(各环境并行)')
+    p.add_argument('requirements', nargs='*')
+    p.add_argument('-r', '--requirement', dest='requirement_files', action='append',
+                   help='需求文件或pyproject.toml(只安装未满足的需求)')
+    p.add_argument('-U', '--upgrade', action='store_true')
+    p.add_argument('--user', action='store_true')
+    p.add_argument('-i', '--index-url')
+    p.add_argument('--from-wheelhouse', action='store_true', help='只从本地wheel仓库安装')
+    p.add_argument('--preview', action='store_true', help='先显示将要安装/升级/降级的包，确认后按固定版本安装')
+    p.add_argument('-y', '--yes', action='store_true', help='--preview 时不询问，直接安装')
+    p.add_argument('--parallel-compile', nargs='?', type=int, const=0, choices=OPTIMIZE_LEVELS, metavar='LEVEL',
+                   help='pip不编译字节码，装完后用多个进程并行编译，LEVEL为优化级别0/1/2(默认0)')
+    p.add_argument('--compile-workers', type=int, help='并行编译的进程数(默认CPU数)')
+    add_env_options(p)
+
+    p = sub.add_parser('uninstall', help='卸载包(各环境并行)')
+    p.add_argument('packages', nargs='+')
+    add_env_options(p)
+
+    p = sub.add_parser('mirror', help='查看或切换镜像源')
+    p.add_argument('action', nargs='?', choices=('show', 'set', 'reset', 'health', 'test'), default='show')
+    p.add_argument('name', nargs='?', help='镜像源名称')
+    p.add_argument('--url', help='自定义源URL(名称为custom时；test时一并测速)')
+    p.add_argument('--timeout', type=float, help='test: 每次请求的超时秒数(默认5)')
+    p.add_argument('--concurrency', type=int, help='test: 同时探测的镜像数(默认8)')
+
+    p = sub.add_parser('catalog', help='镜像项目名索引：更新或搜索')
+    p.add_argument('action', choices=('update', 'search'))
+    p.add_argument('queries', nargs='*')
+    p.add_argument('-i', '--index-url', help='索引地址(默认为pip配置的index-url)')
+    p.add_argument('--limit', type=int, default=20)
+
+    p = sub.add_parser('batch', help='执行JSON批量文件中的操作')
+    p.add_argument('file')
+
+    p = sub.add_parser('wheelhouse', help='本地wheel仓库：预下载、查看、清理')
+    p.add_argument('action', nargs='?', choices=('list', 'prefetch', 'prune'), default='list')
+    p.add_argument('requirements', nargs='*')
+    p.add_argument('-r', '--requirement', dest='requirement_files', action='append', help='需求文件')
+    p.add_argument('--mirror', action='append', help='下载使用的镜像源名称或URL(可重复)')
+    p.add_argument('-i', '--index-url', help='解析依赖使用的索引')
+    p.add_argument('--connections', type=int, default=4, help='每个镜像的下载线程数')
+    p.add_argument('--limit', type=float, help='prune: 清理到该大小(MB)')
+    add_env_options(p)
+
+    p = sub.add_parser('snapshot', help='环境快照：查看、比较、从本地wheel离线回滚')
+    p.add_argument('action', nargs='?', choices=('list', 'take', 'diff', 'rollback'), default='list')
+    p.add_argument('ids', nargs='*', help='快照ID或其前缀(diff只给一个时与当前状态比较)')
+    p.add_argument('--label', help='take: 快照说明')
+    p.add_argument('--retain', action='store_true', help='take: 把所有已安装的包保留到本地仓库')
+    p.add_argument('--limit', type=int, default=20, help='list: 显示最近的个数')
+    add_env_options(p)
+    return parser
+
+
+COMMANDS = {
+    'envs': command_envs,
+    'list': command_list,
+    'install': command_install,
+    'verify': command_verify,
+    'uninstall': command_uninstall,
+    'mirror': command_mirror,
+    'batch': command_batch,
+    'catalog': command_catalog,
+    'wheelhouse': command_wheelhouse,
+    'snapshot': command_snapshot,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reporter = Reporter(args.json, args.verbose, args.trace_dir)
+    engine = PipEngine(listener=reporter.on_event, use_worker=not args.no_worker)
+    engine.auto_snapshot = not args.no_snapshot
+    if args.wheelhouse or args.wheelhouse_limit:
+        from pip_wheelhouse import Wheelhouse
+        engine.wheelhouse = Wheelhouse(args.wheelhouse)
+        if args.wheelhouse_limit:
+            engine.wheelhouse.limit = int(args.wheelhouse_limit * 1024 * 1024)
+    try:
+        return COMMANDS[args.command](engine, reporter, args)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        engine.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
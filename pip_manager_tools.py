@@ -1,38 +1,30 @@
+import pip_startup
+STARTUP = pip_startup.StartupTimer()  # 启动计时从这里开始
 import multiprocessing
+multiprocessing.freeze_support()  # 打包后的子进程在导入界面模块之前就返回
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import subprocess
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
-import sys
-import re
 import os
-import shutil
-from packaging import version
-from configparser import ConfigParser
-multiprocessing.freeze_support()
-
-
-
-# 配置信息
-PIP_CONFIGS = {
-    'default': {'url': 'https://pypi.org/simple', 'trusted_host': 'pypi.org'},
-    'tsinghua': {'url': 'https://pypi.tuna.tsinghua.edu.cn/simple', 'trusted_host': 'pypi.tuna.tsinghua.edu.cn'},
-    'aliyun': {'url': 'https://mirrors.aliyun.com/pypi/simple/', 'trusted_host': 'mirrors.aliyun.com'},
-    'douban': {'url': 'https://pypi.douban.com/simple/', 'trusted_host': 'pypi.douban.com'},
-    'ustc': {'url': 'https://pypi.mirrors.ustc.edu.cn/simple/', 'trusted_host': 'pypi.mirrors.ustc.edu.cn'},
-    'tencent': {'url': 'https://mirrors.cloud.tencent.com/pypi/simple', 'trusted_host': 'mirrors.cloud.tencent.com'}
-}
-
-#添加中文映射
-DISPLAY_NAMES = {
-    'default': '默认官方源',
-    'tsinghua': '清华大学',
-    'aliyun': '阿里云',
-    'douban': '豆瓣',
-    'ustc': '中科大',
-    'tencent': '腾讯云',
-    'custom': '自定义源'
-}
+import subprocess
+import time
+# shutil、configparser、测速与更新检查模块(http.client/ssl)和目录监视(ctypes)只在用到时才导入
+from pip_common import PREFETCH_FAILED, PREFETCH_NAMES, normalize_name
+from pip_compile import OPTIMIZE_NAMES, compile_option
+from pip_engine import (DISPLAY_NAMES, PIP_CONFIGS, PipEngine, apply_source, current_source,
+                        describe_error, pip_config_path, restore_default_source)
+from pip_envs import (KIND_NAMES, current_environment, discover_environments, load_settings, marker_environment,
+                      save_settings)
+from pip_footprint import Footprint, total_footprint
+from pip_jobs import FAILED, RUNNING, STATUS_NAMES, SUCCEEDED
+from pip_output import OutputPipeline
+from pip_package_view import PackageListView
+from pip_phases import PHASE_NAMES, format_bytes, format_seconds
+from pip_preview import ACTION_DOWNGRADE, ACTION_NAMES
+from pip_search import PackageSearchIndex
+from pip_uninstall import FAILED as UNINSTALL_FAILED, REMOVED
+from pip_verify import VERIFY_DAMAGED, VERIFY_NAMES
+STARTUP.mark('import')
 
 
 # 新增Tooltip类
@@ -65,11 +57,81 @@ class Tooltip:
         self.tip_window = None
 
 
+class Autocomplete:
+    """输入框下方的补全列表：补全最后一个以空格分隔的词，上下键选择，回车或单击填入，Esc关闭"""
+
+    def __init__(self, entry, source, on_pick=None, rows=8):
+        self.entry = entry
+        self.source = source  # source(词) -> 候选名称列表
+        self.on_pick = on_pick
+        self.rows = rows
+        self.window = None
+        self.listbox = None
+        entry.bind('<Down>', lambda e: self.move(1), add='+')
+        entry.bind('<Up>', lambda e: self.move(-1), add='+')
+        entry.bind('<Return>', self.pick, add='+')
+        entry.bind('<Escape>', lambda e: self.hide(), add='+')
+        entry.bind('<FocusOut>', lambda e: entry.after(150, self.hide), add='+')
+
+    def token(self):
+        return self.entry.get().rsplit(' ', 1)[-1]
+
+    def update(self):
+        token = self.token()
+        names = self.source(token) if len(token) >= 2 else []
+        if not names or names == [token.lower()]:
+            self.hide()
+            return
+        if self.window is None:
+            self.window = tk.Toplevel(self.entry)
+            self.window.wm_overrideredirect(True)
+            self.listbox = tk.Listbox(self.window, height=self.rows, exportselection=False)
+            self.listbox.pack(fill=tk.BOTH, expand=True)
+            self.listbox.bind('<ButtonRelease-1>', self.pick)
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.window.wm_geometry(f"{max(self.entry.winfo_width(), 260)}x{min(len(names), self.rows) * 18 + 4}+{x}+{y}")
+        self.listbox.delete(0, tk.END)
+        for name in names:
+            self.listbox.insert(tk.END, name)
+
+    def move(self, step):
+        if self.window is None:
+            return
+        selection = self.listbox.curselection()
+        index = (selection[0] + step) if selection else (0 if step > 0 else self.listbox.size() - 1)
+        index = max(0, min(index, self.listbox.size() - 1))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return 'break'
+
+    def pick(self, event=None):
+        if self.window is None:
+            return
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        text = self.entry.get()
+        prefix = text[:len(text) - len(self.token())]
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, prefix + self.listbox.get(selection[0]))
+        self.hide()
+        if self.on_pick is not None:
+            self.on_pick()
+        return 'break'
+
+    def hide(self):
+        if self.window is not None:
+            self.window.destroy()
+        self.window = self.listbox = None
+
+
 class SourceSwitcher(tk.Toplevel):
     def __init__(self,parent):
         super().__init__(parent)
         self.title("PIP源切换")
-        self.geometry("500x400")
+        self.geometry("600x660")
         self.config_path = self.get_config_path()
         self.parent = parent
         self.grab_set()
@@ -87,34 +149,11 @@ class SourceSwitcher(tk.Toplevel):
 
     def get_config_path(self):
         """获取配置文件路径"""
-        if os.name == 'nt':
-            return os.path.join(os.getenv('APPDATA'), 'pip', 'pip.ini')
-        return os.path.expanduser('~/.pip/pip.conf')
-
-    def backup_config(self):
-        """创建配置备份"""
-        if os.path.exists(self.config_path):
-            backup_path = f"{self.config_path}.bak"
-            shutil.copyfile(self.config_path, backup_path)
-            return backup_path
-        return None
+        return pip_config_path()
 
     def get_current_source(self):
         """获取当前源配置"""
-        if not os.path.exists(self.config_path):
-            return 'default'
-
-        config = ConfigParser()
-        config.read(self.config_path)
-
-        try:
-            url = config.get('global', 'index-url')
-            for name, info in PIP_CONFIGS.items():
-                if info['url'] == url:
-                    return name
-            return 'custom'
-        except:
-            return 'default'
+        return current_source(self.config_path)
 
     def update_current_source(self):
         """更新当前源显示"""
@@ -122,46 +161,81 @@ class SourceSwitcher(tk.Toplevel):
         self.current_var.set(f"当前源: {current}")
         self.status_var.set("就绪")
 
-    def set_source(self):
-        """设置源"""
-        selected = self.source_var.get()
-        custom_url = self.custom_url.get() if selected == 'custom' else None
-
+    def start_benchmark(self):
+        """并发测速所有镜像源(包括已填写的自定义源)"""
         try:
-            backup_path = self.backup_config()
-
-            # 创建配置目录
-            config_dir = os.path.dirname(self.config_path)
-            os.makedirs(config_dir, exist_ok=True)
-
-            # 获取配置信息
-            if selected == 'custom':
-                if not custom_url:
-                    messagebox.showerror("错误", "必须提供自定义源URL")
-                    return
-                config = {'url': custom_url, 'trusted_host': ''}
-            else:
-                config = PIP_CONFIGS.get(selected)
-                if not config:
-                    raise ValueError("无效的镜像源")
+            timeout = float(self.timeout_var.get())
+            concurrency = int(self.concurrency_var.get())
+        except ValueError:
+            messagebox.showerror("错误", "超时和并发数必须是数字")
+            return
+
+        mirrors = {name: info['url'] for name, info in PIP_CONFIGS.items()}
+        if self.custom_url.get().strip():
+            mirrors['custom'] = self.custom_url.get().strip()
+
+        self.bench_btn.config(state=tk.DISABLED)
+        self.bench_tree.delete(*self.bench_tree.get_children())
+        self.status_var.set(f"正在测速 {len(mirrors)} 个镜像源...")
 
-            # 写入配置文件
-            cfg = ConfigParser()
-            if os.path.exists(self.config_path):
-                cfg.read(self.config_path)
+        def _run():
+            from pip_mirrors import benchmark_mirrors
+            try:
+                probes = benchmark_mirrors(
+                    mirrors, timeout=timeout, concurrency=concurrency,
+                    callback=lambda probe: self.after(0, self.show_probe, probe)
+                )
+                self.after(0, self.on_benchmark_done, probes)
+            except Exception as e:
+                self.after(0, messagebox.showerror, "错误", str(e))
+                self.after(0, self.bench_btn.config, {'state': tk.NORMAL})
 
-            if not cfg.has_section('global'):
-                cfg.add_section('global')
+        threading.Thread(target=_run, daemon=True).start()
 
-            cfg.set('global', 'index-url', config['url'])
-            if config['trusted_host']:
-                cfg.set('global', 'trusted-host', config['trusted_host'])
-            elif cfg.has_option('global', 'trusted-host'):
-                cfg.remove_option('global', 'trusted-host')
+    def show_probe(self, probe):
+        """显示单个镜像的测速结果"""
+        if not self.winfo_exists():
+            return
+        if probe.error:
+            values = ('-', DISPLAY_NAMES[probe.name], '-', '-', '-', probe.error)
+        else:
+            speed = f"{probe.throughput / 1024:.0f}" if probe.throughput else '-'
+            values = ('-', DISPLAY_NAMES[probe.name], f"{probe.connect_ms:.0f}",
+                      f"{probe.ttfb_ms:.0f}", speed, "完成")
+        self.bench_tree.insert('', tk.END, iid=probe.name, values=values)
+
+    def on_benchmark_done(self, probes):
+        """按综合耗时排名，并按需自动应用最快的源"""
+        for probe in probes:
+            self.parent.engine.health.record(probe.name, probe.error is None, probe.ttfb_ms, kind='probe')
+        if not self.winfo_exists():
+            return
+        from pip_mirrors import score
+        self.bench_btn.config(state=tk.NORMAL)
+        for rank, probe in enumerate(probes, 1):
+            if self.bench_tree.exists(probe.name):
+                self.bench_tree.move(probe.name, '', rank - 1)
+                if score(probe) != float('inf'):
+                    self.bench_tree.set(probe.name, 'rank', rank)
+
+        available = [p for p in probes if score(p) != float('inf')]
+        if not available:
+            self.status_var.set("所有镜像源均不可用")
+            return
+        winner = available[0]
+        self.status_var.set(f"最快的源: {DISPLAY_NAMES[winner.name]}")
+        if self.auto_apply_var.get():
+            self.source_var.set(winner.name)
+            self.toggle_custom_input()
+            self.set_source()
 
-            with open(self.config_path, 'w') as f:
-                cfg.write(f)
+    def set_source(self):
+        """设置源"""
+        selected = self.source_var.get()
+        custom_url = self.custom_url.get() if selected == 'custom' else None
 
+        try:
+            backup_path = apply_source(selected, custom_url, self.config_path)
             self.status_var.set(f"成功切换到 {selected.upper()}")
             if backup_path:
                 self.status_var.set(self.status_var.get() + f"\n备份文件: {backup_path}")
@@ -174,9 +248,8 @@ class SourceSwitcher(tk.Toplevel):
     def restore_default(self):
         """恢复默认源"""
         try:
-            if os.path.exists(self.config_path):
-                backup_path = self.backup_config()
-                os.remove(self.config_path)
+            backup_path = restore_default_source(self.config_path)
+            if backup_path:
                 self.status_var.set(f"已恢复默认源\n备份文件: {backup_path}")
             else:
                 self.status_var.set("已经是默认配置")
@@ -244,6 +317,43 @@ class SourceSwitcher(tk.Toplevel):
             command=self.restore_default
         ).pack(side='left', padx=5)
 
+        ttk.Button(
+            btn_frame,
+            text="健康状况",
+            command=lambda: MirrorHealthWindow(self, self.parent.engine.health)
+        ).pack(side='left', padx=5)
+
+        # 镜像测速
+        from pip_mirrors import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+        bench_frame = ttk.LabelFrame(self, text="镜像测速")
+        bench_frame.pack(pady=5, fill='both', expand=True, padx=20)
+
+        bench_opts = ttk.Frame(bench_frame)
+        bench_opts.pack(fill='x', pady=5)
+        ttk.Label(bench_opts, text="超时(秒):").pack(side='left', padx=5)
+        self.timeout_var = tk.StringVar(value=str(DEFAULT_TIMEOUT))
+        ttk.Spinbox(bench_opts, from_=1, to=60, width=5,
+                    textvariable=self.timeout_var).pack(side='left')
+        ttk.Label(bench_opts, text="并发数:").pack(side='left', padx=5)
+        self.concurrency_var = tk.StringVar(value=str(DEFAULT_CONCURRENCY))
+        ttk.Spinbox(bench_opts, from_=1, to=32, width=4,
+                    textvariable=self.concurrency_var).pack(side='left')
+        self.auto_apply_var = tk.BooleanVar()
+        ttk.Checkbutton(bench_opts, text="自动应用最快的源",
+                        variable=self.auto_apply_var).pack(side='left', padx=10)
+        self.bench_btn = ttk.Button(bench_opts, text="开始测速", command=self.start_benchmark)
+        self.bench_btn.pack(side='right', padx=5)
+
+        columns = ('rank', 'name', 'connect', 'ttfb', 'speed', 'status')
+        self.bench_tree = ttk.Treeview(bench_frame, columns=columns, show='headings', height=7)
+        for column, text, width in zip(
+                columns,
+                ('排名', '镜像源', '连接(ms)', '首字节(ms)', '速度(KB/s)', '状态'),
+                (40, 90, 70, 80, 80, 160)):
+            self.bench_tree.heading(column, text=text, anchor='w')
+            self.bench_tree.column(column, width=width)
+        self.bench_tree.pack(fill='both', expand=True, padx=5, pady=5)
+
         # 状态栏
         self.status_var = tk.StringVar()
         status_bar = ttk.Label(
@@ -267,15 +377,299 @@ class SourceSwitcher(tk.Toplevel):
         else:
             self.custom_frame.grid_remove()
 
+class MirrorHealthWindow(tk.Toplevel):
+    """各镜像的健康状况：最近的成功率和延迟，以及最近14天每天的成功率色块"""
+
+    DAYS = 14
+    CELL = 22
+
+    def __init__(self, parent, health):
+        super().__init__(parent)
+        self.title("镜像健康状况")
+        self.geometry("620x480")
+        self.health = health
+        self.transient(parent)
+
+        columns = ('name', 'rate', 'latency', 'attempts', 'failure')
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=len(PIP_CONFIGS))
+        for column, text, width in zip(columns, ('镜像源', '成功率', '延迟(ms)', '次数', '最近失败'),
+                                       (110, 70, 80, 60, 160)):
+            self.tree.heading(column, text=text, anchor='w')
+            self.tree.column(column, width=width)
+        self.tree.pack(fill='x', padx=10, pady=10)
+
+        ttk.Label(self, text=f"最近{self.DAYS}天每天的成功率(灰色为无记录，越绿越好)").pack(anchor='w', padx=10)
+        self.canvas = tk.Canvas(self, height=len(PIP_CONFIGS) * (self.CELL + 4) + 24, background='white')
+        self.canvas.pack(fill='both', expand=True, padx=10, pady=5)
+        ttk.Button(self, text="刷新", command=self.refresh).pack(pady=5)
+        self.refresh()
+
+    @staticmethod
+    def rate_color(successes, attempts):
+        if not attempts:
+            return '#dddddd'
+        rate = successes / attempts
+        return '#%02x%02x%02x' % (int(231 - rate * (231 - 46)), int(76 + rate * (204 - 76)), int(60 + rate * (113 - 60)))
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        self.canvas.delete('all')
+        for row, name in enumerate(self.health.rank(PIP_CONFIGS)):
+            stats = self.health.stats(name)
+            self.tree.insert('', tk.END, values=(
+                DISPLAY_NAMES[name],
+                '-' if stats.success_rate is None else f"{stats.success_rate:.0%}",
+                '-' if stats.latency_ms is None else f"{stats.latency_ms:.0f}",
+                stats.attempts,
+                time.strftime('%m-%d %H:%M', time.localtime(stats.last_failure)) if stats.last_failure else '-'
+            ))
+            y = 4 + row * (self.CELL + 4)
+            self.canvas.create_text(5, y + self.CELL / 2, text=DISPLAY_NAMES[name], anchor='w')
+            for column, (day, successes, attempts) in enumerate(self.health.history(name, self.DAYS)):
+                x = 100 + column * (self.CELL + 4)
+                self.canvas.create_rectangle(x, y, x + self.CELL, y + self.CELL,
+                                             fill=self.rate_color(successes, attempts), outline='')
+                if row == 0 and column % 7 == 0:
+                    self.canvas.create_text(x, len(PIP_CONFIGS) * (self.CELL + 4) + 12, anchor='w',
+                                            text=time.strftime('%m-%d', time.localtime(day)))
+
+
+class SnapshotWindow(tk.Toplevel):
+    """环境快照：查看快照时间线、比较两个快照，一键回滚(只使用本地仓库中的wheel)"""
+
+    def __init__(self, parent, env):
+        super().__init__(parent)
+        self.title(f"环境快照 - {env.name}")
+        self.geometry("700x520")
+        self.parent = parent
+        self.engine = parent.engine
+        self.python = env.python
+        self.transient(parent)
+
+        columns = ('id', 'time', 'count', 'label')
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=10, selectmode='extended')
+        for column, text, width in zip(columns, ('快照', '时间', '包数量', '说明'), (110, 140, 60, 360)):
+            self.tree.heading(column, text=text, anchor='w')
+            self.tree.column(column, width=width)
+        self.tree.pack(fill='x', padx=10, pady=10)
+        self.tree.bind('<<TreeviewSelect>>', lambda event: self.show_diff())
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(fill='x', padx=10)
+        ttk.Button(btn_frame, text="刷新", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        self.rollback_btn = ttk.Button(btn_frame, text="回滚到此快照", command=self.rollback,
+                                       style='Danger.TButton')
+        self.rollback_btn.pack(side=tk.RIGHT, padx=5)
+        ttk.Label(self, text="选中一个快照时显示它与当前状态的差异，选中两个时显示两者之间的差异",
+                  foreground='gray').pack(anchor='w', padx=10, pady=5)
+
+        self.diff_text = scrolledtext.ScrolledText(self, wrap=tk.WORD, height=12)
+        self.diff_text.pack(fill='both', expand=True, padx=10, pady=5)
+        self._diff_request = 0  # 只显示最近一次选择的比较结果
+        self.refresh()
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        # 同一快照可能出现多次(例如回滚后)，每行以序号区分
+        for row, snapshot in enumerate(reversed(self.engine.snapshots.history(self.python))):
+            self.tree.insert('', tk.END, iid=f"{row}:{snapshot.id}", values=(
+                snapshot.id[:12], time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.time)),
+                snapshot.count, snapshot.label))
+
+    def selected_ids(self):
+        return [iid.split(':', 1)[1] for iid in self.tree.selection()]
+
+    def show_diff(self):
+        ids = self.selected_ids()
+        if not ids:
+            return
+        if len(ids) == 1:
+            # 与当前状态比较，需要刷新清单，在引擎线程中进行
+            old, new = ids[0], None
+            title = f"{ids[0][:12]} -> 当前状态"
+        else:
+            new, old = ids[0], ids[-1]  # 列表中新的在上
+            title = f"{old[:12]} -> {new[:12]}"
+        self._diff_request += 1
+        request = self._diff_request
+        self.diff_text.delete('1.0', tk.END)
+        self.diff_text.insert(tk.END, f"{title}\n\n正在比较...\n")
+        future = self.engine.diff_snapshots(self.python, old, new)
+        future.add_done_callback(lambda f: self.parent.after(0, self.on_diff_done, request, title, f))
+
+    def on_diff_done(self, request, title, future):
+        if not self.winfo_exists() or request != self._diff_request:
+            return
+        try:
+            diff = future.result()
+        except Exception as e:
+            self.diff_text.delete('1.0', tk.END)
+            self.diff_text.insert(tk.END, f"{title}\n\n比较失败: {e}\n")
+            return
+        lines = [f"+ {name}=={version}\n" for name, version in diff.added]
+        lines += [f"- {name}=={version}\n" for name, version in diff.removed]
+        lines += [f"~ {name} {old_version} -> {new_version}\n" for name, old_version, new_version in diff.changed]
+        self.diff_text.delete('1.0', tk.END)
+        self.diff_text.insert(tk.END, f"{title}\n\n" + (''.join(lines) or "没有变化\n"))
+
+    def rollback(self):
+        ids = self.selected_ids()
+        if len(ids) != 1:
+            messagebox.showwarning("回滚", "请选择一个快照", parent=self)
+            return
+        self.show_diff()
+        if not messagebox.askyesno("确认回滚", f"把环境恢复到快照 {ids[0][:12]}？\n"
+                                   "将卸载之后新增的包，并从本地仓库重新安装原来的版本。", parent=self):
+            return
+        self.rollback_btn.config(state=tk.DISABLED)
+        self.parent.status_var.set(f"正在回滚到快照 {ids[0][:12]} ...")
+        future = self.engine.rollback(self.python, ids[0], on_line=self.parent.append_output)
+        future.add_done_callback(lambda f: self.parent.after(0, self.on_rollback_done, f))
+
+    def on_rollback_done(self, future):
+        if self.winfo_exists():
+            self.rollback_btn.config(state=tk.NORMAL)
+            self.refresh()
+        self.parent.load_installed_packages()
+        try:
+            result = future.result()
+        except Exception as e:
+            self.parent.show_error(f"回滚失败: {e}")
+            return
+        if result.missing:
+            self.parent.show_error("本地仓库中缺少以下wheel，无法离线回滚:\n" + "\n".join(result.missing))
+        elif result.status == FAILED:
+            self.parent.show_error("回滚未完全成功，请查看输出")
+        else:
+            self.parent.status_var.set(f"已回滚到快照 {result.snapshot.id[:12]}：安装 {len(result.installed)} 个，"
+                                       f"卸载 {len(result.removed)} 个")
+
+
+class UninstallDialog(tk.Toplevel):
+    """卸载确认窗口：列出依赖这些包的其它包，并可选择一并卸载孤立的依赖"""
+
+    def __init__(self, parent, packages, plan, environments=()):
+        super().__init__(parent)
+        self.title("确认卸载")
+        self.transient(parent)
+        self.packages = list(packages)
+        self.plan = plan
+        self.result = None  # 确认后为最终要卸载的包列表
+        self.remove_orphans = False
+        self.orphans_var = tk.BooleanVar(value=False)
+
+        report = scrolledtext.ScrolledText(self, wrap=tk.WORD, width=70, height=18)
+        report.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        report.insert(tk.END, f"确定要卸载以下 {len(self.packages)} 个包吗？\n")
+        report.insert(tk.END, "".join(f"    {name}\n" for name in self.packages))
+        if len(environments) > 1:
+            report.insert(tk.END, f"\n将在以下 {len(environments)} 个环境中卸载"
+                                  f"(依赖分析和孤立依赖只针对第一个环境)：\n")
+            report.insert(tk.END, "".join(f"    {name}\n" for name in environments))
+        if plan.dependents:
+            report.insert(tk.END, "\n以下已安装的包依赖它们，卸载后可能无法正常使用：\n")
+            for name, users in plan.dependents.items():
+                for user, dep in users:
+                    extra = f" [{dep.extra}]" if dep.extra else ""
+                    report.insert(tk.END, f"    {name} ← {user}{extra}  ({dep.requirement})\n")
+        if plan.orphans:
+            report.insert(tk.END, "\n卸载后以下依赖不再被任何包需要：\n")
+            report.insert(tk.END, "".join(f"    {name}\n" for name in plan.orphans))
+        report.config(state='disabled')
+
+        if plan.orphans:
+            ttk.Checkbutton(
+                self,
+                text=f"同时卸载 {len(plan.orphans)} 个孤立的依赖",
+                variable=self.orphans_var
+            ).pack(anchor=tk.W, padx=10)
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(btn_frame, text="取消", command=self.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="确认卸载", command=self.confirm,
+                   style='Danger.TButton').pack(side=tk.RIGHT, padx=5)
+
+        self.grab_set()
+        self.focus_set()
+
+    def confirm(self):
+        self.remove_orphans = self.orphans_var.get()
+        self.result = self.packages + (self.plan.orphans if self.remove_orphans else [])
+        self.destroy()
+
+
+class InstallPreviewDialog(tk.Toplevel):
+    """安装预览：列出各环境中将要安装、升级和降级的包，确认后按这些固定版本安装"""
+
+    def __init__(self, parent, plans, env_label):
+        super().__init__(parent)
+        self.title("安装预览")
+        self.geometry("640x400")
+        self.transient(parent)
+        self.result = False
+
+        columns = ('env', 'name', 'installed', 'version', 'action')
+        tree = ttk.Treeview(self, columns=columns, show='headings', height=14)
+        for column, text, width in zip(columns, ('环境', '包', '当前版本', '计划版本', '操作'),
+                                       (110, 180, 100, 100, 100)):
+            tree.heading(column, text=text, anchor='w')
+            tree.column(column, width=width)
+        tree.tag_configure('downgrade', foreground='#c0392b')
+        tree.tag_configure('dependency', foreground='gray')
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for plan in plans:
+            for change in plan.changes:
+                tags = ('downgrade',) if change.action == ACTION_DOWNGRADE else ()
+                tags += () if change.requested else ('dependency',)
+                tree.insert('', tk.END, tags=tags, values=(
+                    env_label(plan.python), change.name, change.installed or '-', change.version,
+                    ACTION_NAMES[change.action] + ('' if change.requested else '(依赖)')))
+
+        summary = "，".join(f"{env_label(plan.python)}: {len(plan.changes)} 个变化"
+                           f"({'缓存的解析结果' if plan.cached else f'解析 {plan.seconds:.1f}s'})"
+                           for plan in plans)
+        ttk.Label(self, text=summary, foreground='gray').pack(anchor=tk.W, padx=10)
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(btn_frame, text="取消", command=self.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="确认安装", command=self.confirm,
+                   style='Accent.TButton').pack(side=tk.RIGHT, padx=5)
+
+        self.grab_set()
+        self.focus_set()
+
+    def confirm(self):
+        self.result = True
+        self.destroy()
 
 
 class PipInstallerGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer  # 启动耗时测量模式
         self.title("pip 图形化管理工具 v1.0")
         self.geometry("800x600")
         self.create_main_widgets()
         self.installed_packages = []  # 新增包列表存储
+        # Python环境：列表显示active_env，安装/卸载作用于target_envs中的所有环境
+        self.environments = [current_environment()]
+        self.active_env = self.environments[0]
+        self.target_envs = [self.active_env]
+        # 核心引擎：清单、安装、卸载都通过它执行，界面只负责显示
+        self.engine = PipEngine(listener=self.on_job_event)
+        self.install_queue = self.engine.queue  # 选项相同的任务合并为一次pip调用
+        self.inventory = self.inventory_for(self.active_env)  # 已安装包清单引擎
+        self.dep_index = self.dep_index_for(self.active_env)  # 依赖关系索引，随清单增量更新
+        self.search_index = PackageSearchIndex([])  # 包名搜索索引
+        self.watcher = None  # 环境变化监视器
+        self.outdated = {}  # 规范化包名 -> OutdatedResult
+        self.checking_outdated = False
+        self._outdated_refresh_id = None
+        self.footprints = {}  # 规范化包名 -> Footprint(磁盘占用)
+        self.verify_results = {}  # 规范化包名 -> VerifyResult(文件校验)
+        self.sort_key = 'name'  # 列表按包名('name')或占用大小('size')排序
         self._after_id = None  # 用于延迟搜索
 
         # 进度条初始化
@@ -290,13 +684,157 @@ class PipInstallerGUI(tk.Tk):
 
         # 安装状态跟踪
         self.installing = False
-        self.current_process = None
+        self._progress_determinate = False  # 已知下载大小时进度条按字节显示
         self.selected_packages = []
 
         # 创建界面组件
         self.create_widgets()
-        self.load_installed_packages()
         self.create_source_button()
+        self.mark_startup('window')
+        # 先显示上次缓存的清单，再在后台核对
+        self.show_cached_packages()
+        self.load_installed_packages(rebuild_index=True)
+        self.after(100, self.refresh_environments)
+        self.after(5000, self.update_catalog)
+
+    def mark_startup(self, phase):
+        """记录启动阶段；测量模式下清单核对完成后输出报告并退出"""
+        timer = self.startup_timer
+        if timer is None or timer.has(phase):
+            return
+        timer.mark(phase)
+        if phase == 'reconciled':
+            if not timer.has('first_rows'):
+                timer.mark('first_rows')
+            timer.write()
+            self.after(0, self.on_closing)
+
+    def show_cached_packages(self):
+        """从磁盘缓存立即显示清单(搜索索引在后台核对时建立)"""
+        cached = self.inventory.load_cache()
+        if not cached:
+            self.installed_packages = []
+            self.package_view.set_rows([])
+            return
+        self.installed_packages = cached
+        self.package_view.set_rows(cached)
+        self.status_var.set(f"已显示缓存的 {len(cached)} 个安装包，正在核对...")
+        self.after_idle(self.mark_startup, 'first_rows')
+
+    def inventory_for(self, env):
+        return self.engine.inventory(env.python)
+
+    def dep_index_for(self, env):
+        return self.engine.dep_index(env.python)
+
+    def env_label(self, python):
+        for env in self.environments:
+            if env.python == python:
+                return env.name
+        return python
+
+    def refresh_environments(self):
+        """在后台查找所有环境，并用线程池同时扫描它们的清单"""
+        self.env_status_var.set("正在查找Python环境...")
+
+        def _discover():
+            try:
+                environments = discover_environments()
+            except Exception as e:
+                self.after(0, self.env_status_var.set, f"查找环境失败: {e}")
+                return
+            self.after(0, self._on_environments_found, environments)
+
+        threading.Thread(target=_discover, daemon=True).start()
+
+    def _on_environments_found(self, environments):
+        known = {env.python for env in environments}
+        if self.active_env.python not in known:
+            environments.insert(0, self.active_env)
+        self.environments = environments
+        self.env_tree.delete(*self.env_tree.get_children())
+        for env in environments:
+            engine = self.engine.inventories.get(env.python)
+            count = len(engine.records()) if engine is not None and engine.records() else ''
+            self.env_tree.insert('', tk.END, iid=env.python,
+                                 values=(env.name, KIND_NAMES[env.kind], count, env.python))
+        self.env_tree.selection_set([env.python for env in self.target_envs if env.python in known]
+                                    or [self.active_env.python])
+        self.env_tree.focus(self.active_env.python)
+        # 当前显示的环境由load_installed_packages负责刷新，其余环境并行扫描
+        self.scan_environments([env for env in environments if env.python != self.active_env.python])
+
+    def scan_environments(self, environments):
+        """并行刷新多个环境的清单，各自保存缓存"""
+        pythons = [env.python for env in environments]
+        if not pythons:
+            self.env_status_var.set(f"共 {len(self.environments)} 个环境")
+            return
+        self.env_status_var.set(f"正在扫描 {len(pythons)} 个环境...")
+
+        def on_scanned(python, result):
+            self.after(0, self.update_env_row, python, result)
+
+        def _scan():
+            start = time.perf_counter()
+            results = self.engine.scan(pythons, callback=on_scanned).result()
+            failed = sum(1 for result in results.values() if isinstance(result, Exception))
+            message = f"共 {len(self.environments)} 个环境，扫描 {len(results)} 个用时 {time.perf_counter() - start:.1f}s"
+            if failed:
+                message += f"，{failed} 个无法读取"
+            self.after(0, self.env_status_var.set, message)
+
+        threading.Thread(target=_scan, daemon=True).start()
+
+    def update_env_row(self, python, result):
+        if not self.env_tree.exists(python):
+            return
+        count = "无法读取" if isinstance(result, Exception) else len(result.records)
+        self.env_tree.set(python, 'packages', count)
+
+    def on_env_select(self, event=None):
+        """环境选择变化：选中的环境都是操作目标，焦点所在的环境显示在列表中"""
+        selection = self.env_tree.selection()
+        if not selection:
+            return
+        by_python = {env.python: env for env in self.environments}
+        self.target_envs = [by_python[python] for python in selection if python in by_python]
+        focus = self.env_tree.focus()
+        active = by_python.get(focus if focus in selection else selection[0])
+        if active is not None and active.python != self.active_env.python:
+            self.switch_environment(active)
+        self.update_target_hint()
+
+    def update_target_hint(self):
+        names = ", ".join(env.name for env in self.target_envs)
+        self.target_var.set(f"列表显示: {self.active_env.name}    操作目标({len(self.target_envs)}): {names}")
+
+    def switch_environment(self, env):
+        """切换列表显示的环境"""
+        self.active_env = env
+        self.inventory = self.inventory_for(env)
+        self.dep_index = self.dep_index_for(env)
+        self.search_index = PackageSearchIndex([])
+        self.outdated = {}
+        self.footprints = {}
+        self.verify_results = {}
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+            self.toggle_watcher()
+        self.show_cached_packages()
+        self.load_installed_packages(rebuild_index=True)
+
+    def add_interpreter(self):
+        """手动添加一个解释器"""
+        path = filedialog.askopenfilename(title="选择Python解释器")
+        if not path:
+            return
+        settings = load_settings()
+        if path not in settings['pythons']:
+            settings['pythons'].append(path)
+            save_settings(settings)
+        self.refresh_environments()
 
     def create_source_button(self):
         # 在工具栏添加按钮
@@ -311,6 +849,12 @@ class PipInstallerGUI(tk.Tk):
         )
         source_btn.pack(side=tk.LEFT, padx=5, pady=2)
 
+        ttk.Button(
+            toolbar,
+            text="环境快照",
+            command=lambda: SnapshotWindow(self, self.active_env)
+        ).pack(side=tk.LEFT, padx=5, pady=2)
+
     def open_source_switcher(self):
         """打开镜像源切换窗口"""
         if not hasattr(self, 'source_window') or not self.source_window.winfo_exists():
@@ -329,6 +873,34 @@ class PipInstallerGUI(tk.Tk):
         main_frame = ttk.Frame(self)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
+        # Python环境选择(可多选，安装和卸载作用于所有选中的环境)
+        env_frame = ttk.LabelFrame(main_frame, text="Python环境")
+        env_frame.pack(fill=tk.X, pady=5)
+        env_columns = ('name', 'kind', 'packages', 'python')
+        self.env_tree = ttk.Treeview(env_frame, columns=env_columns, show='headings',
+                                     height=3, selectmode='extended')
+        for column, text, width in zip(env_columns, ('环境', '类型', '包数量', '解释器'),
+                                       (150, 70, 60, 380)):
+            self.env_tree.heading(column, text=text, anchor=tk.W)
+            self.env_tree.column(column, width=width)
+        self.env_tree.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=5)
+        self.env_tree.insert('', tk.END, iid=self.active_env.python,
+                             values=(self.active_env.name, KIND_NAMES[self.active_env.kind], '',
+                                     self.active_env.python))
+        self.env_tree.selection_set(self.active_env.python)
+        self.env_tree.bind('<<TreeviewSelect>>', self.on_env_select)
+
+        env_btn_frame = ttk.Frame(env_frame)
+        env_btn_frame.pack(side=tk.RIGHT, padx=5)
+        ttk.Button(env_btn_frame, text="刷新环境", command=self.refresh_environments).pack(pady=2)
+        ttk.Button(env_btn_frame, text="添加解释器", command=self.add_interpreter).pack(pady=2)
+
+        self.target_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.target_var).pack(fill=tk.X)
+        self.env_status_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.env_status_var, foreground='gray').pack(fill=tk.X)
+        self.update_target_hint()
+
         # 包安装模块
         install_frame = ttk.LabelFrame(main_frame, text="包安装管理")
         install_frame.pack(fill=tk.X, pady=5)
@@ -351,8 +923,25 @@ class PipInstallerGUI(tk.Tk):
 
         self.user_var = tk.BooleanVar()
         self.upgrade_var = tk.BooleanVar()
+        self.wheelhouse_var = tk.BooleanVar()
+        self.preview_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame, text="用户模式(--user)", variable=self.user_var).pack(side=tk.LEFT, padx=5)
         ttk.Checkbutton(options_frame, text="强制升级(--upgrade)", variable=self.upgrade_var).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options_frame, text="从本地仓库安装(离线)",
+                        variable=self.wheelhouse_var).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options_frame, text="安装前预览变更",
+                        variable=self.preview_var).pack(side=tk.LEFT, padx=5)
+
+        # 并行编译：pip加 --no-compile，装完后用多个进程编译新安装的 .py 文件
+        compile_frame = ttk.Frame(install_frame)
+        compile_frame.pack(fill=tk.X, pady=5)
+        self.compile_var = tk.BooleanVar()
+        self.optimize_var = tk.StringVar(value=OPTIMIZE_NAMES[0])
+        ttk.Checkbutton(compile_frame, text=f"并行编译字节码({self.engine.compile_workers} 个进程)",
+                        variable=self.compile_var).pack(side=tk.LEFT, padx=5)
+        ttk.Label(compile_frame, text="优化级别：").pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(compile_frame, textvariable=self.optimize_var, values=list(OPTIMIZE_NAMES.values()),
+                     state='readonly', width=22).pack(side=tk.LEFT, padx=5)
 
         # 操作按钮
         btn_frame = ttk.Frame(install_frame)
@@ -366,23 +955,69 @@ class PipInstallerGUI(tk.Tk):
         )
         self.install_btn.pack(side=tk.LEFT, padx=5)
 
+        ttk.Button(
+            btn_frame,
+            text="清除已完成",
+            command=self.clear_finished_jobs
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.prefetch_btn = ttk.Button(
+            btn_frame,
+            text="预下载到本地仓库",
+            command=self.start_prefetch
+        )
+        self.prefetch_btn.pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            btn_frame,
+            text="导入需求文件",
+            command=self.import_requirements
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            btn_frame,
+            text="导出需求文件",
+            command=self.export_requirements
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 安装队列
+        job_columns = ('id', 'requirement', 'env', 'status', 'detail')
+        self.job_tree = ttk.Treeview(install_frame, columns=job_columns, show='headings', height=4)
+        for column, text, width in zip(job_columns, ('#', '需求', '环境', '状态', '说明'),
+                                       (40, 220, 120, 80, 220)):
+            self.job_tree.heading(column, text=text, anchor=tk.W)
+            self.job_tree.column(column, width=width)
+        self.job_tree.pack(fill=tk.X, padx=5, pady=5)
+        self.job_tree.bind('<Double-1>', self.show_job_output)
+
 
         # 已安装包列表
         list_frame = ttk.LabelFrame(main_frame, text="已安装包列表")
         list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
 
         # 列表控件
-        self.tree = ttk.Treeview(list_frame, columns=('name', 'version'), show='headings')
-        self.tree.heading('name', text='包名称', anchor=tk.W)
+        self.tree = ttk.Treeview(list_frame, columns=('name', 'version', 'size', 'files', 'verify', 'outdated'),
+                                 show='headings')
+        self.tree.heading('name', text='包名称 ▲', anchor=tk.W, command=lambda: self.sort_packages('name'))
         self.tree.heading('version', text='版本', anchor=tk.W)
-        self.tree.column('name', width=300)
-        self.tree.column('version', width=150)
+        self.tree.heading('size', text='大小', anchor=tk.E, command=lambda: self.sort_packages('size'))
+        self.tree.heading('files', text='文件数', anchor=tk.E)
+        self.tree.heading('verify', text='校验', anchor=tk.W)
+        self.tree.heading('outdated', text='最新版本', anchor=tk.W)
+        self.tree.column('name', width=260)
+        self.tree.column('version', width=120)
+        self.tree.column('size', width=90, anchor=tk.E)
+        self.tree.column('files', width=60, anchor=tk.E)
+        self.tree.column('verify', width=110)
+        self.tree.column('outdated', width=150)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # 滚动条
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.configure(yscrollcommand=scrollbar.set)
+        # 大量包时自动切换为虚拟化列表
+        self.package_view = PackageListView(self.tree, scrollbar, row_values=self.package_row_values)
 
         # 列表操作按钮
         list_btn_frame = ttk.Frame(list_frame)
@@ -403,9 +1038,39 @@ class PipInstallerGUI(tk.Tk):
         )
         self.uninstall_btn.pack(pady=5)
 
+        self.outdated_btn = ttk.Button(
+            list_btn_frame,
+            text="检查更新",
+            command=self.start_outdated_check
+        )
+        self.outdated_btn.pack(pady=5)
+
+        self.verify_btn = ttk.Button(
+            list_btn_frame,
+            text="校验文件",
+            command=self.start_verify
+        )
+        self.verify_btn.pack(pady=5)
+
+        self.watch_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            list_btn_frame,
+            text="自动监视变化",
+            variable=self.watch_var,
+            command=self.toggle_watcher
+        ).pack(pady=5)
+
+        # 当前环境的总占用
+        self.footprint_var = tk.StringVar()
+        ttk.Label(list_btn_frame, textvariable=self.footprint_var, foreground='gray',
+                  justify=tk.CENTER).pack(pady=5)
+
         # 绑定选择事件
-        self.tree.bind('<<TreeviewSelect>>', self.on_package_select)
+        self.tree.bind('<<TreeviewSelect>>', self.on_package_select, add='+')
         self.pkg_entry.bind('<KeyRelease>', self.on_pkg_entry_change)
+        # 补全候选来自镜像全部项目名的本地索引
+        self.autocomplete = Autocomplete(self.pkg_entry, lambda token: self.engine.catalog().search(token, 20),
+                                         on_pick=self.filter_packages)
 
         # 输出显示区域
         self.output_area = scrolledtext.ScrolledText(
@@ -415,6 +1080,9 @@ class PipInstallerGUI(tk.Tk):
             height=15
         )
         self.output_area.pack(fill=tk.BOTH, expand=True, pady=5)
+        # 输出管道：工作线程写队列，主线程分批刷新，完整日志写入文件
+        self.output = OutputPipeline(self.output_area)
+        self.output.start()
 
         # 状态栏
         self.status_var = tk.StringVar()
@@ -454,143 +1122,319 @@ class PipInstallerGUI(tk.Tk):
         source_btn.pack(side=tk.LEFT, padx=5, pady=2)
     def on_package_select(self, event):
         """处理包选择事件"""
-        self.selected_packages = []
-        for item in self.tree.selection():
-            values = self.tree.item(item, 'values')
-            if values:
-                self.selected_packages.append(values[0])
+        self.selected_packages = self.package_view.selected_names()
 
-    def build_install_command(self, pkg_name):
-        """构建安装命令"""
-        cmd = [sys.executable, "-m", "pip", "install"]
-
-        # 添加版本
-        if self.version_entry.get().strip():
-            pkg_name += "==" + self.version_entry.get().strip()
-
-        # 添加选项
+    def install_options(self):
+        """根据界面上的安装选项生成pip参数(并行编译的级别作为伪选项随任务进入队列)"""
+        options = []
         if self.user_var.get():
-            cmd.append("--user")
+            options.append("--user")
         if self.upgrade_var.get():
-            cmd.append("--upgrade")
+            options.append("--upgrade")
+        if self.wheelhouse_var.get():
+            options += self.engine.get_wheelhouse().install_options()
+        if self.compile_var.get():
+            levels = {name: level for level, name in OPTIMIZE_NAMES.items()}
+            options.append(compile_option(levels[self.optimize_var.get()]))
+        return options
+
+    def import_requirements(self):
+        """导入requirements.txt或pyproject.toml，只把未满足的需求作为一批交给pip"""
+        path = filedialog.askopenfilename(
+            title="选择需求文件",
+            filetypes=[("需求文件", "*.txt *.in *.toml"), ("所有文件", "*.*")]
+        )
+        if not path:
+            return
+        from pip_requirements import load_requirements
+        try:
+            parsed = load_requirements(path)
+        except Exception as e:
+            self.show_error(f"读取需求文件失败: {str(e)}")
+            return
+        if not parsed.requirements:
+            messagebox.showinfo("导入需求文件", "文件中没有需求")
+            return
+        self.status_var.set(f"正在比较 {len(parsed.requirements)} 条需求...")
+        targets = list(self.target_envs)
+
+        def _check():
+            results = []
+            for env in targets:
+                try:
+                    check = self.engine.check_requirements(parsed.requirements, env.python)
+                except Exception as e:
+                    self.after(0, self.show_error, f"检查 {env.name} 失败: {str(e)}")
+                    continue
+                results.append((env, check))
+            self.after(0, self.on_requirements_checked, os.path.basename(path), parsed.options, results)
+
+        threading.Thread(target=_check, daemon=True).start()
+
+    def on_requirements_checked(self, filename, options, results):
+        pending = [(env, check) for env, check in results if check.unsatisfied]
+        for env, check in results:
+            self.append_output(
+                f"\n{filename} @ {env.name}: 已满足 {len(check.satisfied)}，需要安装 "
+                f"{len(check.unsatisfied)}，不适用于该环境 {len(check.skipped)}\n"
+            )
+        if not pending:
+            self.status_var.set(f"{filename} 中的需求已全部满足")
+            messagebox.showinfo("导入需求文件", "所有需求都已满足，无需安装")
+            return
+        lines = [f"{env.name}: {', '.join(check.unsatisfied[:10])}"
+                 + (f" 等 {len(check.unsatisfied)} 个" if len(check.unsatisfied) > 10 else "")
+                 for env, check in pending]
+        if not messagebox.askyesno("导入需求文件", "以下需求尚未满足，是否安装？\n" + "\n".join(lines)):
+            return
+        install_options = self.install_options()
+        install_options += [option for option in options if option not in install_options]
+        for env, check in pending:
+            # 一次入队，合并为一次pip调用
+            self.install_queue.enqueue_many(check.unsatisfied, install_options, python=env.python)
+        self.status_var.set(f"已加入 {sum(len(check.unsatisfied) for _, check in pending)} 个安装任务")
+
+    def export_requirements(self):
+        """把当前显示环境的清单导出为固定版本的需求文件"""
+        path = filedialog.asksaveasfilename(
+            title="导出需求文件",
+            defaultextension=".txt",
+            initialfile="requirements.txt",
+            filetypes=[("需求文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if not path:
+            return
+        from pip_requirements import export_requirements
+        try:
+            export_requirements(self.installed_packages, path, self.active_env.python)
+        except OSError as e:
+            self.show_error(f"导出失败: {str(e)}")
+            return
+        self.status_var.set(f"已导出 {len(self.installed_packages)} 个包到 {path}")
+
+    def entered_requirements(self):
+        """输入框中的需求(可一次输入多个，以空格分隔)；没有输入时提示并返回空列表"""
+        requirements = self.pkg_entry.get().split()
+        if not requirements:
+            messagebox.showwarning("输入错误", "请输入要安装的包名称！")
+            return []
 
-        cmd.append(pkg_name)
-        return cmd
+        # 添加版本(只输入一个包时有效)
+        if self.version_entry.get().strip() and len(requirements) == 1:
+            requirements[0] += "==" + self.version_entry.get().strip()
+        return requirements
 
     def start_install_thread(self):
-        """启动安装线程"""
-        if self.installing:
-            messagebox.showwarning("警告", "当前正在执行安装操作，请稍候！")
+        """把输入的包加入安装队列"""
+        requirements = self.entered_requirements()
+        if not requirements:
             return
-        self.progress.pack(before=self.status_bar, fill=tk.X, padx=10, pady=5)
-        self.progress.start(10)
 
-        pkg_name = self.pkg_entry.get().strip()
-        if not pkg_name:
-            messagebox.showwarning("输入错误", "请输入要安装的包名称！")
+        options = self.install_options()
+        if self.preview_var.get():
+            self.start_preview(requirements, options)
             return
-
-        self.installing = True
+        for env in self.target_envs:
+            # 一次入队，保证整批合并为一次pip调用
+            for job in self.install_queue.enqueue_many(requirements, options, python=env.python):
+                self.append_output(f"加入安装队列: {job.requirement} ({env.name})\n")
+        self.status_var.set(f"已加入 {len(requirements) * len(self.target_envs)} 个安装任务"
+                            f"({len(self.target_envs)} 个环境)")
+
+    def start_preview(self, requirements, options):
+        """在后台解析需求(不安装)，完成后显示预览窗口"""
         self.install_btn.config(state=tk.DISABLED)
-        self.status_var.set("正在安装 {}...".format(pkg_name))
-        self.append_output(f"开始安装 {pkg_name}\n")
+        self.status_var.set(f"正在解析 {len(requirements)} 个需求...")
+        future = self.engine.preview(requirements, options, [env.python for env in self.target_envs])
+        future.add_done_callback(lambda f: self.after(0, self.on_preview_done, f))
 
-        install_thread = threading.Thread(
-            target=self.install_package,
-            args=(pkg_name,),
-            daemon=True
-        )
-        install_thread.start()
-
-    def install_package(self, pkg_name):
-        """执行安装操作"""
+    def on_preview_done(self, future):
+        self.install_btn.config(state=tk.NORMAL)
         try:
-            # 检查pip可用性
-            if not self.check_pip_available():
-                self.show_error("未找到有效的pip环境", critical=True)
-                return
-
-            # 执行安装命令
-            cmd = [sys.executable, "-m", "pip", "install", pkg_name]
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            self.current_process = process
-            # 在安装/卸载时显示进度条
-            self.progress = ttk.Progressbar(self, mode='indeterminate')
-            self.progress.start()
-
-            # 实时读取输出
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.append_output(output)
-
-            # 处理结果
-            return_code = process.poll()
-            if return_code == 0:
-                self.append_output("\n安装成功！\n")
-                self.status_var.set(f"{pkg_name} 安装成功")
-            else:
-                error_msg = self.parse_error(process.stdout.read())
-                self.show_error(f"安装失败: {error_msg}")
-
+            plans = future.result()
         except Exception as e:
-            self.show_error(f"发生意外错误: {str(e)}")
-        finally:
-            self.installing = False
-            self.current_process = None
-            self.after(0, self.install_btn.config, {'state': tk.NORMAL})
-            self.after(0, self.progress.pack_forget)
-            self.installing = False
-            self.after(0, self.progress.stop)
-
+            self.status_var.set("解析需求失败")
+            self.show_error(f"解析需求失败:\n{e}")
+            return
+        if not any(plan.changes for plan in plans):
+            self.status_var.set("所有需求都已满足，无需安装")
+            return
+        self.status_var.set("请确认安装计划")
+        dialog = InstallPreviewDialog(self, plans, self.env_label)
+        self.wait_window(dialog)
+        if not dialog.result:
+            self.status_var.set("已取消安装")
+            return
+        self.engine.install_plans(plans)
+        count = sum(len(plan.changes) for plan in plans)
+        self.append_output(f"按预览的计划安装 {count} 个包(--no-deps)\n")
+        self.status_var.set(f"已加入 {count} 个安装任务({len(plans)} 个环境)")
+
+    def start_prefetch(self):
+        """把输入的包(含依赖)并行下载到本地仓库，下载分布在当前源和官方源上"""
+        requirements = self.entered_requirements()
+        if not requirements:
+            return
+        mirrors = [name for name in dict.fromkeys((self.engine.current_source(), 'default'))
+                   if name in PIP_CONFIGS]
+        self.prefetch_btn.config(state=tk.DISABLED)
+        self.status_var.set(f"正在预下载 {' '.join(requirements)} ...")
+        future = self.engine.prefetch(requirements, [env.python for env in self.target_envs], mirrors)
+        future.add_done_callback(lambda f: self.after(0, self.on_prefetch_done, f))
+
+    def on_prefetch_done(self, future):
+        self.prefetch_btn.config(state=tk.NORMAL)
+        try:
+            results = future.result()
+        except Exception as e:
+            self.show_error(f"预下载失败: {e}")
+            return
+        failed = [result for result in results if result.status == PREFETCH_FAILED]
+        downloaded = sum(result.size for result in results if result.source)
+        wheelhouse = self.engine.get_wheelhouse()
+        self.status_var.set(f"预下载完成: {len(results)} 个文件，下载 {format_bytes(downloaded)}，"
+                            f"本地仓库 {format_bytes(wheelhouse.total_size())}")
+        if failed:
+            self.show_error("以下文件下载失败:\n" + "\n".join(
+                f"{result.filename}: {result.error}" for result in failed))
+
+    def on_job_event(self, job, event, data):
+        """安装队列事件(在调度线程中调用)"""
+        if event == 'output':
+            self.append_output(data)
+        elif event == 'failover':
+            self.after(0, self.status_var.set,
+                       f"网络错误，已改用 {DISPLAY_NAMES[data[1]]} 重试(未修改pip配置)")
+        elif event == 'snapshot':
+            self.append_output(f"已保存环境快照 {data.id[:12]}({data.label})\n")
+        elif event == 'prefetch':
+            source = f" ({format_bytes(data.size)}, {data.source})" if data.source else ''
+            self.append_output(f"{data.filename}: {PREFETCH_NAMES[data.status]}{source}\n")
+        elif event == 'command':
+            self.append_output(f"\n执行({self.env_label(data[0])}): {' '.join(data[3:])}\n")
+        elif event == 'trace':
+            self.save_trace(data)
+        elif event == 'idle':
+            self.after(0, self.on_queue_idle)
+        else:
+            self.after(0, self.update_job_row, job)
+
+    def update_job_row(self, job):
+        """更新任务列表中的一行"""
+        detail = ''
+        if job.status == FAILED:
+            detail = self.parse_error(job.error)
+            self.append_output(f"\n{job.requirement} 安装失败: {detail}\n")
+        elif job.status == SUCCEEDED:
+            self.append_output(f"\n{job.requirement} 安装成功！\n")
+            if '--find-links' in job.options:
+                self.engine.get_wheelhouse().mark_used_from_output(''.join(job.output))
+        elif job.status == RUNNING and not self.installing:
+            self.installing = True
+            self._progress_determinate = False
+            self.progress.config(mode='indeterminate', value=0)
+            self.progress.pack(before=self.status_bar, fill=tk.X, padx=10, pady=5)
+            self.progress.start(10)
+            self.status_var.set("正在安装...")
+            self.after(200, self.update_install_progress)
+
+        values = (job.id, job.requirement, self.env_label(job.python), STATUS_NAMES[job.status], detail)
+        if self.job_tree.exists(str(job.id)):
+            self.job_tree.item(str(job.id), values=values)
+        else:
+            self.job_tree.insert('', tk.END, iid=str(job.id), values=values)
+        self.job_tree.see(str(job.id))
 
-    def check_pip_available(self):
-        """验证pip是否可用"""
+    def update_install_progress(self):
+        """安装期间定时汇总各环境正在执行的pip调用的阶段和下载进度"""
+        if not self.installing:
+            return
+        traces = {job.trace.id: job.trace for job in self.install_queue.jobs
+                  if job.status == RUNNING and job.trace is not None}
+        snapshots = [trace.progress() for trace in traces.values()]
+        done = sum(p.done for p in snapshots)
+        total = sum(p.total for p in snapshots)
+        if total:
+            if not self._progress_determinate:
+                self._progress_determinate = True
+                self.progress.stop()
+                self.progress.config(mode='determinate')
+            self.progress.config(maximum=total, value=done)
+            rate = sum(p.rate for p in snapshots)
+            text = f"下载 {format_bytes(done)} / {format_bytes(total)}"
+            if rate:
+                text += f"  {format_bytes(int(rate))}/s"
+                eta = (total - done) / rate
+                if eta > 0:
+                    text += f"  剩余 {format_seconds(eta)}"
+        else:
+            text = "正在安装..."
+        if snapshots:
+            phases = [f"{PHASE_NAMES[p.phase]}{' ' + p.package if p.package else ''}" for p in snapshots]
+            self.status_var.set(f"{text}  ({'; '.join(phases)})")
+        self.after(200, self.update_install_progress)
+
+    def save_trace(self, trace):
+        """保存一次pip调用的阶段耗时(JSON和Chrome trace)，并在输出框显示摘要(在调度线程中调用)"""
+        self.append_output(f"{self.env_label(trace.python)} {trace.summary()}\n")
         try:
-            subprocess.check_output(
-                [sys.executable, "-m", "pip", "--version"],
-                stderr=subprocess.STDOUT,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            return True
-        except subprocess.CalledProcessError:
-            return False
-        except Exception:
-            return False
+            report_path, _ = trace.save()
+        except OSError as e:
+            self.append_output(f"保存耗时记录失败: {e}\n")
+            return
+        self.append_output(f"耗时记录: {report_path}\n")
+
+    def on_queue_idle(self):
+        """队列中的任务全部完成"""
+        if self.install_queue.busy:
+            return
+        self.installing = False
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.progress.config(mode='indeterminate', value=0)
+        failed = [job for job in self.install_queue.jobs if job.status == FAILED and not job.reported]
+        for job in failed:
+            job.reported = True
+        if failed:
+            self.show_error("以下任务安装失败:\n" + "\n".join(
+                f"{job.requirement}: {self.parse_error(job.error)}" for job in failed
+            ))
+        else:
+            self.status_var.set("安装队列已完成")
+        self.load_installed_packages()
+        self.scan_environments([env for env in self.target_envs if env.python != self.active_env.python])
+
+    def show_job_output(self, event=None):
+        """双击任务查看该任务的输出"""
+        selection = self.job_tree.selection()
+        if not selection:
+            return
+        job = next((j for j in self.install_queue.jobs if str(j.id) == selection[0]), None)
+        if job is None:
+            return
+        window = tk.Toplevel(self)
+        window.title(f"任务 {job.id}: {job.requirement}")
+        window.geometry("700x400")
+        text = scrolledtext.ScrolledText(window, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(tk.END, ''.join(job.output) or "(暂无输出)")
+        text.config(state=tk.DISABLED)
+
+    def clear_finished_jobs(self):
+        """从任务列表中移除已完成的任务"""
+        for job in list(self.install_queue.jobs):
+            if job.status in (SUCCEEDED, FAILED):
+                self.install_queue.jobs.remove(job)
+                if self.job_tree.exists(str(job.id)):
+                    self.job_tree.delete(str(job.id))
 
     def parse_error(self, output):
         """解析常见错误信息"""
-        patterns = {
-            "not_found": r"ERROR: Could not find a version that satisfies the requirement (\w+)",
-            "network": r"ERROR: Could not install packages due to an OSError",
-            "permission": r"ERROR: Could not install packages due to an EnvironmentError: \[Errno 13\]",
-            "dependency": r"ERROR: Cannot uninstall '.*'"
-        }
-
-        for error_type, pattern in patterns.items():
-            if re.search(pattern, output, re.IGNORECASE):
-                return {
-                    "not_found": "包不存在或名称错误",
-                    "network": "网络连接失败，请检查镜像源",
-                    "permission": "权限不足，请尝试管理员权限运行",
-                    "dependency": "依赖冲突，请使用--user参数"
-                }[error_type]
-        return "未知错误"
+        return describe_error(output)
 
     def append_output(self, text):
-        """追加输出信息"""
-        self.output_area.config(state=tk.NORMAL)
-        self.output_area.insert(tk.END, text)
-        self.output_area.see(tk.END)
-        self.output_area.config(state=tk.DISABLED)
+        """追加输出信息(可在工作线程中调用)"""
+        self.output.write(text)
 
     def show_error(self, message, critical=False):
         """显示错误信息"""
@@ -603,143 +1447,324 @@ class PipInstallerGUI(tk.Tk):
 
     def on_closing(self):
         """关闭窗口时的处理"""
-        if self.installing and self.current_process:
-            self.current_process.terminate()
-            self.after(0, self.progress.stop)
-            self.after(0, self.progress.pack_forget)
+        if self.watcher:
+            self.watcher.stop()
+        self.output.stop()
+        self.engine.close()
         self.destroy()
 
-    def load_installed_packages(self):
-        """加载已安装包列表"""
+    def load_installed_packages(self, rebuild_index=False):
+        """加载已安装包列表(增量刷新，只处理有变化的包)"""
+
+        inventory = self.inventory
+        self.status_var.set(f"正在获取 {self.active_env.name} 的已安装包列表...")
 
         def _load():
             try:
-                self.status_var.set("正在获取已安装包列表...")
-                output = subprocess.check_output(
-                    [sys.executable, "-m", "pip", "list", "--format=freeze"],
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                )
-                packages = []
-                for line in output.split('\n'):
-                    if '==' in line:
-                        name, ver = line.split('==', 1)
-                        packages.append((name.strip(), ver.strip()))
-
-                self.tree.delete(*self.tree.get_children())
-                for name, ver in sorted(packages, key=lambda x: x[0].lower()):
-                    self.tree.insert('', tk.END, values=(name, ver))
-
-                self.status_var.set(f"已加载 {len(packages)} 个安装包")
-                self.installed_packages = packages
-                self.update_package_list(packages)
+                # 引擎负责保存缓存和更新依赖索引
+                delta = self.engine.refresh_inventory(inventory.python, update_deps=rebuild_index)
+                index = None
+                if rebuild_index or delta.added or delta.removed or delta.changed:
+                    # 索引在后台线程中重建，主线程只负责替换
+                    index = PackageSearchIndex(delta.records)
+                self.after(0, self._on_inventory_refreshed, delta, index, inventory)
             except Exception as e:
-                self.show_error(f"获取已安装列表失败: {str(e)}", critical=False)
+                self.after(0, self.show_error, f"获取已安装列表失败: {str(e)}")
 
         threading.Thread(target=_load, daemon=True).start()
 
+    def _on_inventory_refreshed(self, delta, index=None, inventory=None):
+        """在主线程中按差异更新清单显示"""
+        self.update_env_row(inventory.python if inventory else self.active_env.python, delta)
+        if inventory is not None and inventory is not self.inventory:
+            return  # 刷新期间已经切换到其它环境
+        self.installed_packages = delta.records
+        if index is not None:
+            self.search_index = index
+        self.patch_package_list(delta)
+        self.start_footprint_scan()
+        self.status_var.set(
+            f"已加载 {len(delta.records)} 个安装包 "
+            f"(新增 {len(delta.added)}，移除 {len(delta.removed)}，变更 {len(delta.changed)})"
+        )
+        self.mark_startup('reconciled')
+
     def update_package_list(self, packages):
-        """更新Treeview显示"""
-        self.tree.delete(*self.tree.get_children())
-        for name, ver in sorted(packages, key=lambda x: x[0].lower()):
-            self.tree.insert('', tk.END, values=(name, ver))
+        """更新Treeview显示(packages已按名称排序，按大小排序时在这里重新排序)"""
+        self.package_view.set_rows(self.sort_rows(packages))
         self.status_var.set(f"显示 {len(packages)} 个匹配包")
 
+    def patch_package_list(self, delta):
+        """只修改有变化的行，而不是重建整个列表"""
+        query = self.pkg_entry.get()
+        if self.sort_key != 'name' or self.search_index.has_fuzzy(query):
+            self.filter_packages()  # 增量插入依赖按名称排序，模糊匹配按相似度排在后面
+            return
+        self.package_view.patch(delta, lambda pkg: self.search_index.matches(pkg, query))
+
+    def sort_rows(self, packages):
+        if self.sort_key == 'size':
+            empty = Footprint(0, 0)
+            return sorted(packages, key=lambda r: -self.footprints.get(normalize_name(r.name), empty).size)
+        return packages
+
+    def sort_packages(self, key):
+        """点击列标题：按包名或占用大小排序"""
+        self.sort_key = key
+        self.tree.heading('name', text='包名称 ▲' if key == 'name' else '包名称')
+        self.tree.heading('size', text='大小 ▼' if key == 'size' else '大小')
+        self.filter_packages()
+
+    def start_footprint_scan(self):
+        """在后台统计各包的磁盘占用(只重新统计 .dist-info 有变化的包)"""
+        inventory = self.inventory
+        future = self.engine.footprint(inventory.python)
+        future.add_done_callback(lambda f: self.after(0, self.on_footprints_done, f, inventory))
+
+    def on_footprints_done(self, future, inventory):
+        if inventory is not self.inventory:
+            return  # 统计期间已经切换到其它环境
+        try:
+            self.footprints = future.result()
+        except Exception as e:
+            self.append_output(f"统计磁盘占用失败: {e}\n")
+            return
+        if self.sort_key == 'size':
+            self.filter_packages()
+        else:
+            self.package_view.refresh_values()
+        total = total_footprint(self.footprints)
+        self.footprint_var.set(f"共 {format_bytes(total.size)}\n{total.files} 个文件")
+
+    def toggle_watcher(self):
+        """开启或关闭对site-packages的监视"""
+        if self.watch_var.get():
+            from pip_watcher import SiteWatcher
+            self.watcher = SiteWatcher(
+                self.inventory.site_paths(),
+                lambda: self.after(0, self.load_installed_packages)
+            )
+            self.watcher.start()
+            self.status_var.set(f"已开启环境监视 ({self.watcher.backend})")
+        elif self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+            self.status_var.set("已关闭环境监视")
+
+    def package_row_values(self, record):
+        """列表中一行的显示内容(包名、版本、大小、文件数、校验结果、最新版本)"""
+        footprint = self.footprints.get(normalize_name(record.name))
+        size, files = (format_bytes(footprint.size), footprint.files) if footprint else ('', '')
+        verified = self.verify_results.get(normalize_name(record.name))
+        if verified is None or verified.version != record.version:
+            integrity = ''  # 未校验，或校验后版本已经变化
+        elif verified.status == VERIFY_DAMAGED:
+            integrity = f"⚠ {len(verified.modified) + len(verified.missing)} 个文件异常"
+        else:
+            integrity = VERIFY_NAMES[verified.status]
+        result = self.outdated.get(normalize_name(record.name))
+        if result is None or result.installed != record.version:
+            status = ''  # 未检查，或检查后版本已经变化
+        elif result.outdated:
+            status = f"可更新 → {result.latest}"
+        elif result.error:
+            status = "检查失败"
+        elif result.latest is None:
+            status = "索引中没有"
+        else:
+            status = "已是最新"
+        return record.name, record.version, size, files, integrity, status
+
+    def start_outdated_check(self):
+        """并发查询镜像源，找出可更新的包"""
+        if self.checking_outdated or not self.installed_packages:
+            return
+        self.checking_outdated = True
+        self.outdated_btn.config(state=tk.DISABLED)
+        records = list(self.installed_packages)
+        python, prefix = self.active_env.python, self.active_env.prefix
+        self.status_var.set(f"正在检查 {len(records)} 个包的更新...")
+
+        def _check():
+            from pip_outdated import OutdatedChecker, configured_index_url
+            # 按当前环境的Python版本过滤Requires-Python(当前解释器时为None，用界面的版本)
+            try:
+                environment = marker_environment(python)
+            except (OSError, subprocess.SubprocessError, ValueError):
+                environment = None
+            # 使用该环境的pip实际安装时的索引(包括环境自己的pip.conf)
+            checker = OutdatedChecker(configured_index_url(prefix),
+                                      python_version=environment and environment['python_full_version'])
+            try:
+                results = checker.check(records, callback=self.on_outdated_result)
+                self.after(0, self.on_outdated_done, results, checker.index_url)
+            except Exception as e:
+                self.after(0, self.show_error, f"检查更新失败: {str(e)}")
+                self.after(0, self.on_outdated_done, None, checker.index_url)
+            finally:
+                checker.close()
+
+        threading.Thread(target=_check, daemon=True).start()
+
+    def on_outdated_result(self, result):
+        """单个包检查完成(在工作线程中调用)，合并后再刷新列表"""
+        self.outdated[normalize_name(result.name)] = result
+        if self._outdated_refresh_id is None:
+            self._outdated_refresh_id = self.after(100, self._refresh_outdated_column)
+
+    def _refresh_outdated_column(self):
+        self._outdated_refresh_id = None
+        self.package_view.refresh_values()
+
+    def on_outdated_done(self, results, index_url):
+        self.checking_outdated = False
+        self.outdated_btn.config(state=tk.NORMAL)
+        self.package_view.refresh_values()
+        if results is None:
+            return
+        outdated = sum(1 for result in results.values() if result.outdated)
+        failed = sum(1 for result in results.values() if result.error)
+        message = f"发现 {outdated} 个可更新的包 (索引: {index_url})"
+        if failed:
+            message += f"，{failed} 个检查失败"
+        self.status_var.set(message)
+
+    def start_verify(self):
+        """按RECORD中的哈希校验当前环境所有已安装的文件(多进程计算，未变化的文件使用缓存)"""
+        self.verify_btn.config(state=tk.DISABLED)
+        self.status_var.set(f"正在校验 {self.active_env.name} 的已安装文件...")
+        inventory = self.inventory
+
+        def on_progress(done, total):
+            self.after(0, self.status_var.set, f"正在校验: {format_bytes(done)} / {format_bytes(total)}")
+
+        future = self.engine.verify(inventory.python, progress=on_progress)
+        future.add_done_callback(lambda f: self.after(0, self.on_verify_done, f, inventory))
+
+    def on_verify_done(self, future, inventory):
+        self.verify_btn.config(state=tk.NORMAL)
+        try:
+            results = future.result()
+        except Exception as e:
+            self.show_error(f"校验失败: {e}")
+            return
+        if inventory is not self.inventory:
+            return  # 校验期间已经切换到其它环境
+        self.verify_results = results
+        self.package_view.refresh_values()
+        damaged = [result for result in results.values() if result.status == VERIFY_DAMAGED]
+        for result in damaged:
+            self.append_output(f"\n{result.name}=={result.version} 的文件与RECORD不符:\n")
+            self.append_output(''.join(f"    修改 {path}\n" for path in result.modified[:20]))
+            self.append_output(''.join(f"    缺失 {path}\n" for path in result.missing[:20]))
+        files = sum(result.checked for result in results.values())
+        self.status_var.set(f"校验完成: {len(results)} 个包，{files} 个文件，{len(damaged)} 个包有文件被修改或缺失")
+
     def filter_packages(self):
-        """执行实际的包过滤"""
-        query = self.pkg_entry.get().strip().lower()
-        if not query:
-            self.update_package_list(self.installed_packages)
+        """执行实际的包过滤(基于索引，支持模糊匹配)"""
+        self.update_package_list(self.search_index.search(self.pkg_entry.get()))
+
+    def update_catalog(self, force=False):
+        """在后台增量更新镜像项目名索引(超过一天未检查时)"""
+        if not force and not self.engine.catalog().stale():
             return
+        future = self.engine.update_catalog()
+        future.add_done_callback(lambda f: self.after(0, self.on_catalog_updated, f))
 
-        filtered = [
-            (name, ver) for name, ver in self.installed_packages
-            if query in name.lower()
-        ]
-        self.update_package_list(filtered)
+    def on_catalog_updated(self, future):
+        try:
+            update = future.result()
+        except Exception as e:
+            self.append_output(f"更新项目名索引失败: {e}\n")
+            return
+        self.append_output(f"项目名索引已更新: {update.count:,} 个项目 "
+                           f"(+{update.added} -{update.removed}, {update.seconds:.1f}s)\n")
 
     def on_pkg_entry_change(self, event):
         """输入内容变化时的处理"""
+        if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape'):
+            return
         # 取消之前的延迟任务
         if self._after_id:
             self.after_cancel(self._after_id)
 
-        # 设置新的延迟任务（300毫秒后执行）
-        self._after_id = self.after(300, self.filter_packages)
+        # 设置新的延迟任务(索引查询很快，只需合并连续按键)
+        self._after_id = self.after(50, self.filter_packages)
+        self.autocomplete.update()
     def start_uninstall_thread(self):
         """启动卸载线程"""
-        self.progress.pack(before=self.status_bar, fill=tk.X, padx=10, pady=5)
-        self.progress.start(10)
         if not self.selected_packages:
             messagebox.showwarning("警告", "请先选择要卸载的包！")
             return
 
-        if self.installing:
+        if self.installing or self.install_queue.busy:
             messagebox.showwarning("警告", "当前正在执行其他操作，请稍候！")
             return
 
-        confirm = messagebox.askyesno("确认卸载",
-                                      f"确定要卸载以下 {len(self.selected_packages)} 个包吗？\n" +
-                                      "\n".join(self.selected_packages))
-        if not confirm:
+        # 列出依赖这些包的其它包，以及卸载后不再需要的依赖
+        targets = [self.active_env] + [env for env in self.target_envs if env != self.active_env]
+        dialog = UninstallDialog(self, self.selected_packages,
+                                 self.dep_index.removal_plan(self.selected_packages),
+                                 [env.name for env in targets])
+        self.wait_window(dialog)
+        if not dialog.result:
             return
+        # 孤立依赖只针对当前显示的环境分析，其它环境只卸载选中的包
+        plan = {env.python: dialog.result if env == self.active_env else list(self.selected_packages)
+                for env in targets}
+        total = sum(len(names) for names in plan.values())
 
         self.installing = True
         self.uninstall_btn.config(state=tk.DISABLED)
-        self.status_var.set(f"正在卸载 {len(self.selected_packages)} 个包...")
+        self.progress.config(mode='determinate', maximum=total, value=0)
+        self.progress.pack(before=self.status_bar, fill=tk.X, padx=10, pady=5)
+        self.status_var.set(f"正在卸载 {total} 个包({len(plan)} 个环境)...")
         self.append_output(f"开始卸载操作\n")
 
         uninstall_thread = threading.Thread(
             target=self.uninstall_packages,
+            args=(plan,),
             daemon=True
         )
         uninstall_thread.start()
 
-    def uninstall_packages(self):
-        """执行卸载操作"""
+    def on_uninstall_progress(self, done, total, name, status):
+        """单个包卸载完成(在工作线程中调用)"""
+        label = {REMOVED: "已卸载", UNINSTALL_FAILED: "卸载失败"}.get(status, "未安装，已跳过")
+        self.after(0, self.progress.config, {'value': done})
+        self.after(0, self.status_var.set, f"卸载进度 {done}/{total}: {name} {label}")
+
+    def uninstall_packages(self, plan):
+        """plan为 {解释器: 包名列表}，由引擎在各环境同时卸载(在工作线程中调用)"""
+        def on_progress(done, total, result):
+            self.on_uninstall_progress(done, total, result.name, result.status)
+
         try:
-            for pkg in self.selected_packages:
-                cmd = [sys.executable, "-m", "pip", "uninstall", "-y", pkg]
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                )
-                self.current_process = process
-                # 在安装/卸载时显示进度条
-                self.progress = ttk.Progressbar(self, mode='indeterminate')
-                self.progress.start()
-                while True:
-                    output = process.stdout.readline()
-                    if output == '' and process.poll() is not None:
-                        break
-                    if output:
-                        self.append_output(output)
-
-                return_code = process.poll()
-                if return_code != 0:
-                    raise Exception(f"卸载 {pkg} 失败")
-
-            self.append_output("\n卸载完成！\n")
-            self.status_var.set("卸载操作完成")
-            self.load_installed_packages()  # 刷新列表
+            results = self.engine.uninstall(plan, on_progress=on_progress).result()
+            failed = [f"{result.name}({self.env_label(result.python)})"
+                      for result in results if result.status == UNINSTALL_FAILED]
+            removed = sum(1 for result in results if result.status == REMOVED)
+            self.append_output(f"\n卸载完成！共卸载 {removed} 个包\n")
+            self.after(0, self.status_var.set, "卸载操作完成")
+            if failed:
+                self.after(0, self.show_error, f"卸载 {', '.join(failed)} 失败")
+            self.after(0, self.load_installed_packages)  # 增量刷新，只移除已卸载的行
+            others = [env for env in self.environments
+                      if env.python in plan and env.python != self.active_env.python]
+            self.after(0, self.scan_environments, others)
 
         except Exception as e:
-            self.show_error(f"卸载过程中发生错误: {str(e)}")
+            self.after(0, self.show_error, f"卸载过程中发生错误: {str(e)}")
         finally:
             self.installing = False
             self.after(0, self.uninstall_btn.config, {'state': tk.NORMAL})
             self.after(0, self.progress.pack_forget)
-            self.installing = False
-            self.after(0, self.progress.stop)
+            self.after(0, self.progress.config, {'mode': 'indeterminate', 'value': 0})
 
 
 if __name__ == "__main__":
 
     multiprocessing.freeze_support()
-    app = PipInstallerGUI()
+    app = PipInstallerGUI(STARTUP if pip_startup.enabled() else None)
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""镜像源测速：并发探测连接时间、首字节时间和下载速度；记录各镜像的健康状况"""
+import collections
+import concurrent.futures
+import http.client
+import json
+import os
+import re
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from pip_common import get_data_dir
+
+
+# 单个镜像的测速结果，时间单位为毫秒，速度单位为字节/秒
+MirrorProbe = collections.namedtuple(
+    'MirrorProbe',
+    ['name', 'url', 'connect_ms', 'ttfb_ms', 'throughput', 'error']
+)
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CONCURRENCY = 8
+# 用于测量首字节时间的项目页，以及下载测速最多读取的字节数
+SAMPLE_PROJECT = 'pip'
+SAMPLE_BYTES = 256 * 1024
+
+_HREF_RE = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+HEALTH_FILE = 'mirror_health.json'
+HEALTH_WINDOW = 50  # 排序时只看每个镜像最近的事件数
+MAX_EVENTS = 1000  # 每个镜像最多保留的事件数
+DEFAULT_LATENCY_MS = 1000.0  # 没有延迟数据的镜像按此估算
+DAY = 24 * 3600
+
+# 一个镜像最近HEALTH_WINDOW次事件的统计：成功率、延迟中位数(毫秒，无数据时为None)、最近失败时间
+MirrorStats = collections.namedtuple(
+    'MirrorStats',
+    ['name', 'attempts', 'successes', 'success_rate', 'latency_ms', 'last_failure']
+)
+
+
+def _connection(url, timeout):
+    parts = urlsplit(url)
+    if parts.scheme == 'https':
+        conn = http.client.HTTPSConnection(
+            parts.hostname, parts.port, timeout=timeout, context=ssl.create_default_context()
+        )
+    else:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    return conn, parts
+
+
+def _request_path(parts):
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return path
+
+
+def probe_mirror(name, url, timeout=DEFAULT_TIMEOUT, sample_project=SAMPLE_PROJECT,
+                 sample_bytes=SAMPLE_BYTES):
+    """探测单个镜像：TCP/TLS连接时间、简单索引项目页首字节时间、样本文件下载速度"""
+    page_url = url.rstrip('/') + f'/{sample_project}/'
+    conn, parts = _connection(page_url, timeout)
+    try:
+        start = time.perf_counter()
+        conn.connect()
+        connect_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        conn.request('GET', _request_path(parts), headers={'Accept': 'text/html'})
+        response = conn.getresponse()
+        ttfb_ms = (time.perf_counter() - start) * 1000
+        body = response.read().decode('utf-8', 'replace')
+        if response.status != 200:
+            raise OSError(f"HTTP {response.status}")
+    except Exception as e:
+        return MirrorProbe(name, url, None, None, None, str(e) or type(e).__name__)
+    finally:
+        conn.close()
+
+    links = _HREF_RE.findall(body)
+    if not links:
+        return MirrorProbe(name, url, connect_ms, ttfb_ms, None, "索引页中没有文件链接")
+    # 简单索引页按版本升序排列，最后一个链接通常是最新的发行文件
+    file_url = urljoin(page_url, links[-1].split('#', 1)[0])
+    try:
+        throughput = measure_throughput(file_url, timeout, sample_bytes)
+    except Exception as e:
+        return MirrorProbe(name, url, connect_ms, ttfb_ms, None, str(e) or type(e).__name__)
+    return MirrorProbe(name, url, connect_ms, ttfb_ms, throughput, None)
+
+
+def measure_throughput(file_url, timeout=DEFAULT_TIMEOUT, sample_bytes=SAMPLE_BYTES):
+    """下载样本文件(最多sample_bytes字节)，返回字节/秒，不计入连接时间"""
+    for _ in range(3):  # 跟随少量重定向(部分镜像把文件放在CDN上)
+        conn, parts = _connection(file_url, timeout)
+        try:
+            conn.connect()
+            start = time.perf_counter()
+            conn.request('GET', _request_path(parts))
+            response = conn.getresponse()
+            if response.status in (301, 302, 303, 307, 308):
+                file_url = urljoin(file_url, response.getheader('Location', ''))
+                continue
+            if response.status != 200:
+                raise OSError(f"HTTP {response.status}")
+            received = 0
+            while received < sample_bytes:
+                chunk = response.read(min(65536, sample_bytes - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+            elapsed = time.perf_counter() - start
+            return received / elapsed if elapsed > 0 else float(received)
+        finally:
+            conn.close()
+    raise OSError("重定向次数过多")
+
+
+def score(probe, sample_bytes=SAMPLE_BYTES):
+    """估算获取一个索引页加一个样本文件的总耗时(毫秒)，失败的镜像排在最后"""
+    if probe.error is not None or not probe.throughput:
+        return float('inf')
+    return probe.connect_ms + probe.ttfb_ms + sample_bytes / probe.throughput * 1000
+
+
+def benchmark_mirrors(mirrors, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY,
+                      callback=None, **probe_options):
+    """并发探测 mirrors({名称: URL})，返回按score排序的MirrorProbe列表
+
+    callback(probe) 会在每个镜像完成时从工作线程中调用。
+    """
+    probes = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            pool.submit(probe_mirror, name, url, timeout, **probe_options)
+            for name, url in mirrors.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            probe = future.result()
+            probes.append(probe)
+            if callback is not None:
+                callback(probe)
+    probes.sort(key=score)
+    return probes
+
+
+class MirrorHealth:
+    """各镜像的成功/失败和延迟记录，持久保存在数据目录中(线程安全)
+
+    事件来自安装(网络类失败记为失败)和测速，按时间保存为 [时间戳, 成功, 延迟毫秒, 来源]。
+    rank()按预期耗时排序：延迟中位数除以成功率(成功率带先验，新镜像按50%计)。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_data_dir(), HEALTH_FILE)
+        self._lock = threading.Lock()
+        self._events = {}  # 镜像名称 -> 事件列表(按时间升序)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._events = json.load(f).get('mirrors', {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({'mirrors': self._events})
+        directory = os.path.dirname(self.path)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def record(self, name, ok, latency_ms=None, kind='install', when=None):
+        """记录一次事件并保存"""
+        event = [when or time.time(), bool(ok), None if latency_ms is None else round(latency_ms, 1), kind]
+        with self._lock:
+            events = self._events.setdefault(name, [])
+            events.append(event)
+            del events[:-MAX_EVENTS]
+        try:
+            self.save()
+        except OSError:
+            pass
+
+    def events(self, name):
+        with self._lock:
+            return list(self._events.get(name, ()))
+
+    def stats(self, name, window=HEALTH_WINDOW):
+        events = self.events(name)[-window:]
+        successes = sum(1 for event in events if event[1])
+        latencies = [event[2] for event in events if event[1] and event[2] is not None]
+        failures = [event[0] for event in events if not event[1]]
+        return MirrorStats(
+            name, len(events), successes,
+            successes / len(events) if events else None,
+            statistics.median(latencies) if latencies else None,
+            failures[-1] if failures else None
+        )
+
+    def score(self, name):
+        """预期耗时(毫秒)，越小越好"""
+        stats = self.stats(name)
+        rate = (stats.successes + 1) / (stats.attempts + 2)
+        latency = DEFAULT_LATENCY_MS if stats.latency_ms is None else stats.latency_ms
+        return latency / rate
+
+    def rank(self, names):
+        """按健康状况从好到差排序"""
+        return sorted(names, key=self.score)
+
+    def history(self, name, days=14, now=None):
+        """最近days天每天的 (当天0点时间戳, 成功次数, 总次数)，最早的在前"""
+        now = now or time.time()
+        today = time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1))
+        start = today - (days - 1) * DAY
+        buckets = [[start + i * DAY, 0, 0] for i in range(days)]
+        for when, ok, _latency, _kind in self.events(name):
+            if when < start:
+                continue
+            index = min(int((when - start) // DAY), days - 1)
+            buckets[index][2] += 1
+            if ok:
+                buckets[index][1] += 1
+        return [tuple(bucket) for bucket in buckets]
@@ -0,0 +1,406 @@
+"""检查可更新的包：并发查询镜像源的简单索引，带条件请求的磁盘缓存
+
+每个项目请求一次 {index}/{项目名}/ (优先PEP 691 JSON，不支持时解析HTML)，
+连接按主机复用；响应中只提取 (版本, Requires-Python) 写入缓存。缓存在
+Cache-Control的max-age内直接使用，过期后带上ETag/Last-Modified重新验证，
+服务器返回304即继续使用缓存。版本比较用packaging.version，
+每个版本字符串只解析一次。
+"""
+import collections
+import concurrent.futures
+import hashlib
+import html
+import http.client
+import json
+import os
+import queue
+import re
+import ssl
+import sys
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from pip_common import get_data_dir, normalize_name
+
+
+DEFAULT_INDEX_URL = 'https://pypi.org/simple'
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_CONCURRENCY = 16
+
+ACCEPT = ('application/vnd.pypi.simple.v1+json, '
+          'application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01')
+
+# 单个包的检查结果；latest为None表示索引中没有该项目或没有可用版本
+OutdatedResult = collections.namedtuple(
+    'OutdatedResult',
+    ['name', 'installed', 'latest', 'outdated', 'error']
+)
+
+_ANCHOR_RE = re.compile(r'<a\s([^>]*)>([^<]*)</a>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w-]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'))?')
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+_RETRYABLE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+              ConnectionResetError, BrokenPipeError)
+
+
+def pip_config_files(prefix=None):
+    """pip读取的配置文件，按pip的加载顺序(后面的覆盖前面的)：全局、用户(旧位置、新位置)、
+    环境(prefix，默认为当前解释器的sys.prefix)、PIP_CONFIG_FILE
+
+    PIP_CONFIG_FILE指向存在的文件时pip不读取用户级配置。
+    """
+    name = 'pip.ini' if os.name == 'nt' else 'pip.conf'
+    home = os.path.expanduser('~')
+    if os.name == 'nt':
+        global_files = [os.path.join(os.getenv('ProgramData') or r'C:\ProgramData', 'pip', name)]
+        user_files = [os.path.join(home, 'pip', name), os.path.join(os.getenv('APPDATA', ''), 'pip', name)]
+    else:
+        xdg_config = os.path.join(os.getenv('XDG_CONFIG_HOME') or os.path.join(home, '.config'), 'pip')
+        if sys.platform == 'darwin':
+            global_files = ['/Library/Application Support/pip/pip.conf']
+            support = os.path.join(home, 'Library', 'Application Support', 'pip')
+            user_dir = support if os.path.isdir(support) else xdg_config
+        else:
+            dirs = [d for d in (os.getenv('XDG_CONFIG_DIRS') or '/etc/xdg').split(os.pathsep) if d]
+            global_files = [os.path.join(d, 'pip', name) for d in dirs] + ['/etc/pip.conf']
+            user_dir = xdg_config
+        user_files = [os.path.join(home, '.pip', name), os.path.join(user_dir, name)]
+    env_file = os.environ.get('PIP_CONFIG_FILE')
+    if env_file and os.path.exists(env_file):
+        user_files = []
+    return global_files + user_files + [os.path.join(prefix or sys.prefix, name)] + ([env_file] if env_file else [])
+
+
+def configured_index_url(prefix=None):
+    """返回pip install使用的index-url，没有配置时返回官方源
+
+    与pip一致：按pip_config_files的顺序读取，后读取的文件覆盖先读取的，[install]中的设置
+    优先于[global]，环境变量PIP_INDEX_URL优先于所有配置文件。
+    """
+    url = os.environ.get('PIP_INDEX_URL')
+    if url:
+        return url
+    from configparser import RawConfigParser
+    found = {}
+    for path in pip_config_files(prefix):
+        config = RawConfigParser()
+        try:
+            config.read(path, encoding='utf-8')
+        except Exception:
+            continue
+        for section in ('global', 'install'):
+            for key in ('index-url', 'index_url'):
+                value = config.get(section, key, fallback='')
+                if value:
+                    found[section] = value
+    return found.get('install') or found.get('global') or DEFAULT_INDEX_URL
+
+
+class ConnectionPool:
+    """按主机复用的HTTP(S)长连接池"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, size=DEFAULT_CONCURRENCY):
+        self.timeout = timeout
+        self.size = size
+        self._idle = {}  # (scheme, host, port) -> LifoQueue
+        self._lock = threading.Lock()
+        self._context = None
+
+    def _queue(self, key):
+        with self._lock:
+            q = self._idle.get(key)
+            if q is None:
+                q = self._idle[key] = queue.LifoQueue()
+            return q
+
+    def _connect(self, scheme, host, port):
+        if scheme == 'https':
+            if self._context is None:
+                self._context = ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self._context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def request(self, url, headers):
+        """发送GET请求，返回 (状态码, 响应头, 响应体)，复用的连接失效时重试一次"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        idle = self._queue(key)
+        for attempt in range(2):
+            try:
+                conn = idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._connect(*key)
+                reused = False
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except _RETRYABLE:
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # 服务器关闭了空闲连接
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close or idle.qsize() >= self.size:
+                conn.close()
+            else:
+                idle.put(conn)
+            return response.status, response.headers, body
+
+    def close(self):
+        with self._lock:
+            queues, self._idle = list(self._idle.values()), {}
+        for q in queues:
+            while not q.empty():
+                q.get_nowait().close()
+
+
+class ResponseCache:
+    """磁盘上的项目页缓存：每个URL一个小JSON文件，保存校验头和提取出的版本"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_data_dir('index-cache')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def put(self, url, etag, last_modified, releases, expires=0):
+        path = self._path(url)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        entry = {'url': url, 'etag': etag, 'last_modified': last_modified,
+                 'expires': expires, 'releases': releases}
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+_SDIST_EXT_RE = re.compile(r'(\.tar\.gz|\.zip|\.tar\.bz2|\.tar\.xz|\.tgz|\.tar)$', re.IGNORECASE)
+
+
+def _expires(headers):
+    """根据Cache-Control计算缓存的过期时间，不允许缓存时返回0"""
+    cache_control = (headers.get('Cache-Control') or '').lower()
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    return time.time() + int(match.group(1)) if match else 0
+
+
+def _file_version(filename, project):
+    """从发行文件名中解析版本字符串，无法识别时返回None
+
+    不构造完整的文件名对象，只按规则切分；版本字符串在比较时才解析。
+    """
+    if filename.endswith('.whl'):
+        parts = filename.split('-')
+        return parts[1] if len(parts) >= 5 else None
+    if filename.endswith('.egg'):
+        parts = filename[:-4].split('-')
+        return parts[1] if len(parts) >= 2 else None
+    match = _SDIST_EXT_RE.search(filename)
+    if not match:
+        return None  # .exe/.msi等安装程序
+    stem = filename[:match.start()]
+    prefix = stem[:len(project)]
+    if stem[len(project):len(project) + 1] == '-' and normalize_name(prefix) == normalize_name(project):
+        return stem[len(project) + 1:] or None
+    name, sep, version = stem.rpartition('-')
+    return version if sep else None
+
+
+def parse_project_page(body, content_type, project):
+    """解析项目页，返回去重后的 [版本, Requires-Python] 列表(不含已撤回的文件)"""
+    releases = {}
+    if 'json' in content_type:
+        for item in json.loads(body).get('files', []):
+            if item.get('yanked'):
+                continue
+            version = _file_version(item.get('filename', ''), project)
+            if version is not None:
+                releases.setdefault((version, item.get('requires-python') or ''), None)
+    else:
+        text = body.decode('utf-8', 'replace')
+        for attrs, filename in _ANCHOR_RE.findall(text):
+            attributes = {m.group(1).lower(): html.unescape(m.group(2) or m.group(3) or '')
+                          for m in _ATTR_RE.finditer(attrs)}
+            if 'data-yanked' in attributes:
+                continue
+            version = _file_version(html.unescape(filename).strip(), project)
+            if version is not None:
+                releases.setdefault((version, attributes.get('data-requires-python', '')), None)
+    return [list(key) for key in releases]
+
+
+class VersionComparer:
+    """批量比较版本：每个版本字符串和Requires-Python只解析一次"""
+
+    def __init__(self, python_version=None):
+        if python_version is None:
+            python_version = '.'.join(map(str, sys.version_info[:3]))
+        self.python_version = Version(python_version)
+        self._versions = {}
+        self._specifiers = {}
+
+    def parse(self, text):
+        try:
+            return self._versions[text]
+        except KeyError:
+            try:
+                version = Version(text)
+            except InvalidVersion:
+                version = None
+            self._versions[text] = version
+            return version
+
+    def python_compatible(self, requires_python):
+        if not requires_python:
+            return True
+        try:
+            return self._specifiers[requires_python]
+        except KeyError:
+            try:
+                ok = SpecifierSet(requires_python).contains(self.python_version, prereleases=True)
+            except InvalidSpecifier:
+                ok = True
+            self._specifiers[requires_python] = ok
+            return ok
+
+    def latest(self, releases, installed=None):
+        """返回可安装的最新版本；已安装预发布版本时才考虑预发布版本"""
+        current = self.parse(installed) if installed else None
+        allow_pre = current is not None and current.is_prerelease
+        best = None
+        best_text = None
+        for text, requires_python in releases:
+            version = self.parse(text)
+            if version is None or (version.is_prerelease and not allow_pre):
+                continue
+            if (best is None or version > best) and self.python_compatible(requires_python):
+                best, best_text = version, text
+        return best_text
+
+    def is_newer(self, latest, installed):
+        new, current = self.parse(latest), self.parse(installed)
+        return new is not None and current is not None and new > current
+
+
+class OutdatedChecker:
+    """并发检查已安装包在镜像源上的最新版本"""
+
+    def __init__(self, index_url=None, cache_dir=None, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, python_version=None, use_cache=True):
+        self.index_url = (index_url or configured_index_url()).rstrip('/') + '/'
+        self.concurrency = max(1, concurrency)
+        self.pool = ConnectionPool(timeout, self.concurrency)
+        self.cache = ResponseCache(cache_dir) if use_cache else None
+        self.comparer = VersionComparer(python_version)
+        self.stats = collections.Counter()  # 'fresh'、'fetched'、'not_modified'、'missing'、'error'
+        self._stats_lock = threading.Lock()  # check_one在线程池中并发调用
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def project_url(self, name):
+        return urljoin(self.index_url, normalize_name(name) + '/')
+
+    def fetch_releases(self, name):
+        """返回项目的 [版本, Requires-Python] 列表，索引中没有该项目时返回None"""
+        url = self.project_url(name)
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached and cached.get('expires', 0) > time.time():
+            self._count('fresh')  # 仍在max-age内，不发请求
+            return cached['releases']
+        headers = {'Accept': ACCEPT}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        for _ in range(3):  # 跟随少量重定向
+            status, response_headers, body = self.pool.request(url, headers)
+            if status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response_headers.get('Location', ''))
+                continue
+            break
+        if status == 304 and cached:
+            self._count('not_modified')
+            expires = _expires(response_headers)
+            if expires:
+                self.cache.put(self.project_url(name), cached.get('etag'),
+                               cached.get('last_modified'), cached['releases'], expires)
+            return cached['releases']
+        if status == 404:
+            self._count('missing')
+            return None
+        if status != 200:
+            raise OSError(f"HTTP {status}")
+        self._count('fetched')
+        releases = parse_project_page(body, response_headers.get('Content-Type', ''), name)
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        expires = _expires(response_headers)
+        if self.cache is not None and (etag or last_modified or expires):
+            self.cache.put(self.project_url(name), etag, last_modified, releases, expires)
+        return releases
+
+    def check_one(self, record):
+        try:
+            releases = self.fetch_releases(record.name)
+        except Exception as e:
+            self._count('error')
+            return OutdatedResult(record.name, record.version, None, False, str(e) or type(e).__name__)
+        if not releases:
+            return OutdatedResult(record.name, record.version, None, False, None)
+        latest = self.comparer.latest(releases, record.version)
+        outdated = latest is not None and self.comparer.is_newer(latest, record.version)
+        return OutdatedResult(record.name, record.version, latest, outdated, None)
+
+    def check(self, records, callback=None, cancel=None):
+        """检查records中的所有包，返回 {规范化包名: OutdatedResult}
+
+        callback(result) 在每个包完成时从工作线程中调用；cancel为threading.Event，
+        置位后不再发出新的请求。
+        """
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = []
+            for record in records:
+                futures.append(pool.submit(self._check_unless_cancelled, record, cancel))
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                results[normalize_name(result.name)] = result
+                if callback is not None:
+                    callback(result)
+        return results
+
+    def _check_unless_cancelled(self, record, cancel):
+        if cancel is not None and cancel.is_set():
+            return None
+        return self.check_one(record)
+
+    def close(self):
+        self.pool.close()
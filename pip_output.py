@@ -0,0 +1,89 @@
+"""输出管道：工作线程只向队列写入，主线程通过after()分批刷新到文本框"""
+import os
+import queue
+import time
+import tkinter as tk
+
+from pip_common import get_data_dir
+
+
+class OutputPipeline:
+    """线程安全的批量输出
+
+    - write() 可在任意线程调用，只做一次队列写入，不接触Tk
+    - 主线程每隔interval毫秒取出队列中的内容，在budget秒内尽量多取，
+      合并成一次insert，并且只切换一次文本框状态、只滚动一次
+    - 文本框最多保留max_lines行(环形缓冲，超出时删除最早的行)，
+      完整日志写入磁盘上的日志文件
+    """
+
+    def __init__(self, widget, max_lines=5000, log_path=None, interval=50, budget=0.008):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval = interval
+        self.budget = budget
+        self.log_path = log_path or os.path.join(
+            get_data_dir('logs'), time.strftime('output-%Y%m%d-%H%M%S.log')
+        )
+        self._queue = queue.SimpleQueue()
+        self._lines = 1  # Text控件总是以一个空行开头
+        self._log = None
+        self._after_id = None
+
+    def write(self, text):
+        """追加输出(线程安全)"""
+        self._queue.put(text)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self.drain(budget=None)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _tick(self):
+        self.drain()
+        self._after_id = self.widget.after(self.interval, self._tick)
+
+    def drain(self, budget=-1):
+        """把队列中的内容刷新到文本框，返回本次处理的条数(只能在主线程调用)"""
+        if budget == -1:
+            budget = self.budget
+        deadline = None if budget is None else time.perf_counter() + budget
+        chunks = []
+        while deadline is None or time.perf_counter() < deadline:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not chunks:
+            return 0
+        text = ''.join(chunks)
+        self._spill(text)
+
+        widget = self.widget
+        widget.config(state=tk.NORMAL)
+        widget.insert(tk.END, text)
+        self._lines += text.count('\n')
+        excess = self._lines - self.max_lines
+        if excess > 0:
+            widget.delete('1.0', f'{excess + 1}.0')
+            self._lines -= excess
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)
+        return len(chunks)
+
+    def _spill(self, text):
+        try:
+            if self._log is None:
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            self._log.write(text)
+            self._log.flush()
+        except OSError:
+            pass
@@ -0,0 +1,242 @@
+"""已安装包列表视图：少量包时直接插入全部行，大量包时切换为虚拟化列表"""
+import bisect
+import tkinter as tk
+
+from pip_common import normalize_name
+
+
+MODE_FULL = 'full'
+MODE_VIRTUAL = 'virtual'
+
+# 超过该行数时自动切换为虚拟化列表
+VIRTUAL_THRESHOLD = 2000
+DEFAULT_ROW_HEIGHT = 20
+
+
+def default_row_values(record):
+    return record.name, record.version
+
+
+class PackageListView:
+    """包装Treeview和滚动条
+
+    rows 必须已经排好序(InventoryEngine每次刷新只排序一次)，过滤结果保持原有顺序，
+    因此每次按键过滤都不需要重新排序。虚拟化模式下Treeview中只保留可见窗口
+    的若干行，滚动时复用这些行并替换内容。
+    """
+
+    def __init__(self, tree, scrollbar, row_values=default_row_values,
+                 virtual_threshold=VIRTUAL_THRESHOLD, row_height=DEFAULT_ROW_HEIGHT):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.virtual_threshold = virtual_threshold
+        self.row_height = row_height
+        self.mode = None
+        self.rows = []
+        self._row_keys = []  # 全量模式下各行的排序键
+        self._ordered = True  # _row_keys是否按名称排序(否则不能用二分查找增量插入)
+        self.offset = 0
+        self.page_size = 30
+        self._slots = []  # 虚拟化模式下复用的行
+        self._attached = set()  # 当前挂在Treeview中的复用行
+        self._selected = set()  # 虚拟化模式下选中的规范化包名
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        self.tree.bind('<Configure>', self._on_configure, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self._on_mousewheel, add='+')
+        self.tree.bind('<Up>', self._on_key, add='+')
+        self.tree.bind('<Down>', self._on_key, add='+')
+        self.tree.bind('<Prior>', self._on_key, add='+')
+        self.tree.bind('<Next>', self._on_key, add='+')
+
+    # ---- 数据更新 ----
+
+    def set_rows(self, rows):
+        """用新的(已排序)行集合替换当前显示"""
+        self.rows = list(rows)
+        mode = MODE_VIRTUAL if len(self.rows) > self.virtual_threshold else MODE_FULL
+        if mode != self.mode:
+            self._switch_mode(mode)
+        if self.mode == MODE_FULL:
+            self.tree.delete(*self.tree.get_children())
+            self._row_keys = []
+            for record in self.rows:
+                key = normalize_name(record.name)
+                self.tree.insert('', tk.END, iid=key, values=self.row_values(record))
+                self._row_keys.append((record.name.lower(), key))
+            self._ordered = all(a <= b for a, b in zip(self._row_keys, self._row_keys[1:]))
+        else:
+            self.offset = min(self.offset, self._max_offset())
+            self.render()
+
+    def patch(self, delta, predicate=None):
+        """根据InventoryDelta只更新有变化的行(当前显示不是按名称排序时整体重建)"""
+        if self.mode == MODE_VIRTUAL or self.mode is None or not self._ordered:
+            self.set_rows([r for r in delta.records if predicate is None or predicate(r)])
+            return
+        removed = set()
+        for record in delta.removed:
+            removed.add(self._delete_row(normalize_name(record.name)))
+        for record in delta.changed + delta.added:
+            key = normalize_name(record.name)
+            if predicate is not None and not predicate(record):
+                removed.add(self._delete_row(key))
+            elif self.tree.exists(key):
+                self.tree.item(key, values=self.row_values(record))
+            else:
+                index = bisect.bisect(self._row_keys, (record.name.lower(), key))
+                self._row_keys.insert(index, (record.name.lower(), key))
+                self.tree.insert('', index, iid=key, values=self.row_values(record))
+        if removed:
+            self._row_keys = [row for row in self._row_keys if row[1] not in removed]
+        self.rows = [r for r in delta.records if predicate is None or predicate(r)]
+        if len(self.rows) > self.virtual_threshold:
+            self.set_rows(self.rows)
+
+    def refresh_values(self):
+        """行内容(例如附加列)变化后重新显示"""
+        if self.mode == MODE_VIRTUAL:
+            self.render()
+        else:
+            for record in self.rows:
+                key = normalize_name(record.name)
+                if self.tree.exists(key):
+                    self.tree.item(key, values=self.row_values(record))
+
+    def _delete_row(self, key):
+        if self.tree.exists(key):
+            self.tree.delete(key)
+        return key
+
+    def selected_names(self):
+        """返回选中的包名"""
+        if self.mode == MODE_VIRTUAL:
+            return [r.name for r in self.rows if normalize_name(r.name) in self._selected]
+        names = []
+        for item in self.tree.selection():
+            values = self.tree.item(item, 'values')
+            if values:
+                names.append(values[0])
+        return names
+
+    # ---- 虚拟化 ----
+
+    def _switch_mode(self, mode):
+        self.tree.delete(*self.tree.get_children())
+        self._slots = []
+        self._attached = set()
+        self._row_keys = []
+        self._selected.clear()
+        self.offset = 0
+        self.mode = mode
+        if mode == MODE_VIRTUAL:
+            self.tree.configure(yscrollcommand='')
+            self.scrollbar.configure(command=self.yview)
+        else:
+            self.tree.configure(yscrollcommand=self.scrollbar.set)
+            self.scrollbar.configure(command=self.tree.yview)
+
+    def _max_offset(self):
+        return max(0, len(self.rows) - self.page_size)
+
+    def render(self):
+        """把rows[offset:offset+page_size]填入复用的行"""
+        while len(self._slots) < self.page_size:
+            slot = f"slot{len(self._slots)}"
+            self.tree.insert('', tk.END, iid=slot)
+            self._slots.append(slot)
+            self._attached.add(slot)
+        window = self._window()
+        selection = []
+        for index, slot in enumerate(self._slots):
+            if index < len(window):
+                record = window[index]
+                if slot not in self._attached:
+                    self.tree.move(slot, '', index)
+                    self._attached.add(slot)
+                self.tree.item(slot, values=self.row_values(record))
+                if normalize_name(record.name) in self._selected:
+                    selection.append(slot)
+            elif slot in self._attached:
+                self.tree.detach(slot)
+                self._attached.discard(slot)
+        self.tree.selection_set(selection)
+        self._update_scrollbar()
+
+    def _window(self):
+        return self.rows[self.offset:self.offset + self.page_size]
+
+    def _update_scrollbar(self):
+        total = len(self.rows)
+        if not total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.page_size) / total))
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self._max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def yview(self, *args):
+        """滚动条回调，参数与Treeview.yview相同"""
+        if self.mode != MODE_VIRTUAL:
+            return self.tree.yview(*args)
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(1, self.page_size - 1)
+            self.scroll_to(self.offset + step)
+
+    def _on_mousewheel(self, event):
+        if self.mode != MODE_VIRTUAL:
+            return None
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+        return 'break'
+
+    def _on_key(self, event):
+        if self.mode != MODE_VIRTUAL:
+            return None
+        if event.keysym in ('Prior', 'Next'):
+            self.yview('scroll', -1 if event.keysym == 'Prior' else 1, 'pages')
+            return 'break'
+        focus = self.tree.focus()
+        if focus not in self._slots:
+            return None
+        index = self._slots.index(focus)
+        if event.keysym == 'Down' and index >= len(self._window()) - 1:
+            self.yview('scroll', 1, 'units')
+            return 'break'
+        if event.keysym == 'Up' and index == 0:
+            self.yview('scroll', -1, 'units')
+            return 'break'
+        return None
+
+    def _on_configure(self, event):
+        page_size = max(1, event.height // self.row_height)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            if self.mode == MODE_VIRTUAL:
+                self.offset = min(self.offset, self._max_offset())
+                self.render()
+
+    def _on_select(self, event=None):
+        if self.mode != MODE_VIRTUAL:
+            return
+        selection = set(self.tree.selection())
+        for slot, record in zip(self._slots, self._window()):
+            key = normalize_name(record.name)
+            if slot in selection:
+                self._selected.add(key)
+            else:
+                self._selected.discard(key)
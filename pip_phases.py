@@ -0,0 +1,340 @@
+"""pip输出的阶段解析：记录每个包在启动、解析、下载、构建、安装各阶段的耗时
+
+PhaseTracker逐行读取一次pip调用的输出(在调度线程中调用)，记录
+(包, 阶段, 开始, 结束) 区间，并统计下载字节数，用于确定进度条、下载速度和剩余时间。
+pip 24.1起支持 `--progress-bar raw`，下载时输出 "Progress 已下载 of 总数" 行，
+进度可以精确到数据块；旧版本只能在每个文件下载完成时按文件大小累计。
+操作结束后保存为JSON耗时报告和Chrome trace格式(可用chrome://tracing或Perfetto打开)。
+"""
+import collections
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+from pip_common import get_data_dir, normalize_name
+
+
+PHASE_STARTUP = 'startup'
+PHASE_RESOLVE = 'resolve'
+PHASE_DOWNLOAD = 'download'
+PHASE_BUILD = 'build'
+PHASE_INSTALL = 'install'
+PHASE_COMPILE = 'compile'
+
+PHASE_NAMES = {
+    PHASE_STARTUP: '启动',
+    PHASE_RESOLVE: '解析',
+    PHASE_DOWNLOAD: '下载',
+    PHASE_BUILD: '构建',
+    PHASE_INSTALL: '安装',
+    PHASE_COMPILE: '编译',
+}
+
+# 支持 `--progress-bar raw` 的最低pip版本
+RAW_PROGRESS_VERSION = (24, 1)
+
+# 一个阶段区间：包名(None表示整个操作)、阶段、开始和结束(相对操作开始的秒数)、附加信息
+Span = collections.namedtuple('Span', ['package', 'phase', 'start', 'end', 'detail'])
+
+# 进度快照：当前阶段和包、已下载/已知总字节数、下载速度(字节/秒)、预计剩余秒数
+Progress = collections.namedtuple('Progress', ['phase', 'package', 'done', 'total', 'rate', 'eta'])
+
+_NAME = r"([A-Za-z0-9][A-Za-z0-9._-]*)"
+_SIZE = r"(?: \(([\d.]+) (bytes|kB|MB|GB)\))?"
+_COLLECTING_RE = re.compile(r"^\s*Collecting " + _NAME)
+_PROCESSING_RE = re.compile(r"^\s*Processing (\S+)")
+_DOWNLOADING_RE = re.compile(r"^\s*(Downloading|Using cached) (\S+)" + _SIZE)
+_PROGRESS_RE = re.compile(r"^Progress (\d+) of (\d+)")
+_PREPARE_RE = re.compile(r"^\s*(Installing build dependencies|Getting requirements to build|"
+                         r"Preparing (?:editable )?metadata)")
+_BUILD_RE = re.compile(r"^\s*(?:Building wheel|Building editable|Running setup\.py install) for " + _NAME)
+_FINISHED_RE = re.compile(r": finished with status '")
+_SATISFIED_RE = re.compile(r"^\s*Requirement already satisfied: " + _NAME)
+_INSTALLING_RE = re.compile(r"^Installing collected packages: (.+)")
+_DONE_RE = re.compile(r"^(?:Successfully (?:installed|downloaded)|ERROR:)")
+
+_UNITS = {'bytes': 1, 'kB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3}
+_trace_ids = itertools.count(1)
+
+
+def supports_raw_progress(version):
+    """pip版本字符串是否支持 `--progress-bar raw`"""
+    try:
+        parts = tuple(int(part) for part in re.findall(r"\d+", version or '')[:2])
+    except ValueError:
+        return False
+    return len(parts) == 2 and parts >= RAW_PROGRESS_VERSION
+
+
+def with_progress(args, version):
+    """支持时在install/download/wheel命令后加入 `--progress-bar raw`(args不含 `python -m pip`)"""
+    if not args or args[0] not in ('install', 'download', 'wheel') or not supports_raw_progress(version):
+        return list(args)
+    if any(arg.startswith('--progress-bar') for arg in args):
+        return list(args)
+    return [args[0], '--progress-bar', 'raw', *args[1:]]
+
+
+def _file_project(filename):
+    """从分发文件名(wheel或sdist)取出项目名"""
+    stem = filename.split('#', 1)[0].rstrip('/\\')
+    for suffix in ('.whl', '.tar.gz', '.zip', '.tar.bz2', '.tgz'):
+        if stem.endswith(suffix):
+            return normalize_name(stem[:-len(suffix)].rsplit('/', 1)[-1].split('-', 1)[0])
+    return normalize_name(os.path.basename(stem))
+
+
+def format_bytes(count):
+    for unit, size in (('GB', 1000 ** 3), ('MB', 1000 ** 2), ('kB', 1000)):
+        if count >= size:
+            return f"{count / size:.1f} {unit}"
+    return f"{count} B"
+
+
+def format_seconds(seconds):
+    seconds = int(seconds + 0.5)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class PhaseTracker:
+    """一次pip调用的阶段解析器(线程安全：调度线程写入，界面线程读取进度)"""
+
+    def __init__(self, command=(), python=None):
+        self.id = next(_trace_ids)
+        self.command = list(command)
+        self.python = python
+        self.started = time.time()
+        self.exit_code = None
+        self.duration = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._open = None  # 尚未结束的区间 (包, 阶段, 开始, 附加信息)
+        self._package = None  # 最近一次 Collecting 的包
+        self._install_open = None
+        self._first_line = False
+        # 下载统计
+        self._bytes_total = 0
+        self._bytes_done = 0
+        self._current_size = 0
+        self._current_done = 0
+        self._download_time = 0.0
+        self._download_start = None
+
+    def _now(self):
+        return time.perf_counter() - self._t0
+
+    def feed(self, line):
+        """处理一行pip输出；返回True表示这是 `--progress-bar raw` 的进度行，不需要显示"""
+        with self._lock:
+            now = self._now()
+            if not self._first_line:
+                self._first_line = True
+                self.spans.append(Span(None, PHASE_STARTUP, 0.0, now, ''))
+
+            match = _PROGRESS_RE.match(line)
+            if match:
+                done, total = int(match.group(1)), int(match.group(2))
+                if self._download_start is not None:
+                    if total and total != self._current_size:
+                        self._bytes_total += total - self._current_size
+                        self._current_size = total
+                    self._current_done = min(done, self._current_size) if self._current_size else 0
+                return True
+
+            match = _DOWNLOADING_RE.match(line)
+            if match:
+                cached = match.group(1) == 'Using cached'
+                package = _file_project(match.group(2)) or self._package
+                size = int(float(match.group(3)) * _UNITS[match.group(4)]) if match.group(3) else 0
+                self._begin(now, package, PHASE_DOWNLOAD, 'cached' if cached else format_bytes(size))
+                if not cached:
+                    self._download_start = now
+                    self._current_size = size
+                    self._current_done = 0
+                    self._bytes_total += size
+                return False
+
+            match = _COLLECTING_RE.match(line)
+            if match:
+                self._package = normalize_name(match.group(1))
+                self._begin(now, self._package, PHASE_RESOLVE, '')
+                return False
+
+            match = _PROCESSING_RE.match(line)
+            if match:
+                self._package = _file_project(match.group(1))
+                self._begin(now, self._package, PHASE_RESOLVE, 'local')
+                return False
+
+            match = _PREPARE_RE.match(line)
+            if match:
+                if _FINISHED_RE.search(line):
+                    self._close(now)
+                elif self._open is None or self._open[3] != match.group(1):
+                    self._begin(now, self._package, PHASE_BUILD, match.group(1))
+                return False
+
+            match = _BUILD_RE.match(line)
+            if match:
+                if _FINISHED_RE.search(line):
+                    self._close(now)
+                else:
+                    self._begin(now, normalize_name(match.group(1)), PHASE_BUILD, 'wheel')
+                return False
+
+            if _SATISFIED_RE.match(line):
+                self._close(now)
+                return False
+
+            match = _INSTALLING_RE.match(line)
+            if match:
+                self._close(now)
+                self._install_open = (now, match.group(1).strip())
+                return False
+
+            if _DONE_RE.match(line):
+                self._close(now)
+                self._close_install(now)
+        return False
+
+    def _begin(self, now, package, phase, detail):
+        self._close(now)
+        self._open = (package, phase, now, detail)
+
+    def _close(self, now):
+        if self._open is None:
+            return
+        package, phase, start, detail = self._open
+        self._open = None
+        self.spans.append(Span(package, phase, start, now, detail))
+        if phase == PHASE_DOWNLOAD and self._download_start is not None:
+            self._download_time += now - self._download_start
+            self._bytes_done += self._current_size
+            self._download_start = None
+            self._current_size = self._current_done = 0
+
+    def _close_install(self, now):
+        if self._install_open is not None:
+            start, packages = self._install_open
+            self._install_open = None
+            self.spans.append(Span(None, PHASE_INSTALL, start, now, packages))
+
+    def begin_compile(self, files):
+        """pip结束后开始并行编译字节码"""
+        with self._lock:
+            self._begin(self._now(), None, PHASE_COMPILE, f"{files} 个文件")
+
+    def end_compile(self):
+        with self._lock:
+            self._close(self._now())
+
+    def finish(self, exit_code):
+        """pip调用结束，关闭所有未结束的区间"""
+        with self._lock:
+            now = self._now()
+            self._close(now)
+            self._close_install(now)
+            self.exit_code = exit_code
+            self.duration = now
+
+    def progress(self):
+        """当前进度快照(可在任意线程调用)"""
+        with self._lock:
+            now = self._now()
+            download_time = self._download_time
+            done = self._bytes_done + self._current_done
+            if self._download_start is not None:
+                download_time += now - self._download_start
+            rate = done / download_time if download_time > 0 and done else 0.0
+            eta = (self._bytes_total - done) / rate if rate else None
+            if self._open is not None:
+                phase, package = self._open[1], self._open[0]
+            elif self._install_open is not None:
+                phase, package = PHASE_INSTALL, self._install_open[1]
+            else:
+                phase, package = (PHASE_RESOLVE if self._first_line else PHASE_STARTUP), None
+            return Progress(phase, package, done, self._bytes_total, rate, eta)
+
+    def totals(self):
+        """各阶段总耗时；整个操作减去各阶段后的剩余时间计入 'other'"""
+        totals = collections.OrderedDict((phase, 0.0) for phase in PHASE_NAMES)
+        for span in self.spans:
+            totals[span.phase] += span.end - span.start
+        if self.duration is not None:
+            totals['other'] = max(0.0, self.duration - sum(totals.values()))
+        return totals
+
+    def summary(self):
+        """一行耗时摘要，用于输出框"""
+        parts = [f"{PHASE_NAMES.get(phase, '其它')} {seconds:.1f}s"
+                 for phase, seconds in self.totals().items() if seconds >= 0.05]
+        text = f"耗时 {self.duration or 0:.1f}s: " + (', '.join(parts) or '-')
+        if self._bytes_done:
+            text += f"；下载 {format_bytes(self._bytes_done)}"
+            if self._download_time > 0:
+                text += f" ({format_bytes(int(self._bytes_done / self._download_time))}/s)"
+        return text
+
+    def report(self):
+        """JSON耗时报告"""
+        with self._lock:
+            spans = list(self.spans)
+        packages = {}
+        for span in spans:
+            if span.package:
+                phases = packages.setdefault(span.package, {})
+                phases[span.phase] = round(phases.get(span.phase, 0.0) + span.end - span.start, 6)
+        return {
+            'id': self.id,
+            'python': self.python,
+            'command': self.command,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'duration': round(self.duration or 0.0, 6),
+            'exit_code': self.exit_code,
+            'phases': {phase: round(seconds, 6) for phase, seconds in self.totals().items()},
+            'packages': packages,
+            'downloaded_bytes': self._bytes_done,
+            'download_seconds': round(self._download_time, 6),
+            'spans': [[span.package, span.phase, round(span.start, 6), round(span.end, 6), span.detail]
+                      for span in spans],
+        }
+
+    def chrome_trace(self):
+        """Chrome trace-event格式：每个包一行(tid)，阶段为完整事件(ph=X)，时间单位微秒"""
+        with self._lock:
+            spans = list(self.spans)
+        lanes = {None: 0}
+        events = [{'ph': 'M', 'name': 'process_name', 'pid': self.id, 'tid': 0,
+                   'args': {'name': ' '.join(self.command[3:]) or 'pip'}},
+                  {'ph': 'M', 'name': 'thread_name', 'pid': self.id, 'tid': 0, 'args': {'name': '(操作)'}}]
+        for span in spans:
+            if span.package not in lanes:
+                lanes[span.package] = len(lanes)
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': self.id,
+                               'tid': lanes[span.package], 'args': {'name': span.package}})
+            events.append({
+                'name': PHASE_NAMES.get(span.phase, span.phase),
+                'cat': span.phase,
+                'ph': 'X',
+                'ts': int(span.start * 1e6),
+                'dur': max(1, int((span.end - span.start) * 1e6)),
+                'pid': self.id,
+                'tid': lanes[span.package],
+                'args': {'detail': span.detail} if span.detail else {},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, directory=None):
+        """保存JSON报告和Chrome trace，返回 (报告路径, trace路径)"""
+        directory = directory or get_data_dir('traces')
+        stem = os.path.join(directory, time.strftime('install-%Y%m%d-%H%M%S', time.localtime(self.started))
+                            + f"-{self.id}")
+        paths = (stem + '.json', stem + '.trace.json')
+        for path, data in zip(paths, (self.report(), self.chrome_trace())):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+        return paths
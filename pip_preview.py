@@ -0,0 +1,187 @@
+"""安装预览：先用 `pip install --dry-run --report` 解析，列出将要安装、升级和降级的包
+
+解析结果按 (解释器、需求集合、选项、索引URL、清单指纹) 缓存，同样的预览再次打开时
+不需要再运行pip；清单变化(指纹不同)或超过PLAN_MAX_AGE后重新解析。确认后按解析得到的
+固定版本集合加 --no-deps 安装，pip不会再做一次依赖解析。
+"""
+import collections
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from pip_common import get_data_dir, normalize_name
+from pip_snapshots import snapshot_text
+
+
+PLAN_VERSION = 2
+PLAN_MAX_AGE = 3600  # 缓存的解析结果有效期(秒)，之后索引中可能有新版本
+MAX_PLANS = 200
+
+ACTION_INSTALL = 'install'
+ACTION_UPGRADE = 'upgrade'
+ACTION_DOWNGRADE = 'downgrade'
+ACTION_REINSTALL = 'reinstall'
+
+ACTION_NAMES = {
+    ACTION_INSTALL: '新安装',
+    ACTION_UPGRADE: '升级',
+    ACTION_DOWNGRADE: '降级',
+    ACTION_REINSTALL: '重新安装',
+}
+
+# 计划中的一个包：名称、计划版本、当前版本(未安装为None)、操作、是否为直接请求的包、固定后的需求
+PlannedChange = collections.namedtuple('PlannedChange',
+                                       ['name', 'version', 'installed', 'action', 'requested', 'pinned'])
+
+# 一次预览：解释器、需求、选项、计划中的变化、是否来自缓存、解析耗时(秒)
+InstallPlan = collections.namedtuple('InstallPlan',
+                                     ['python', 'requirements', 'options', 'changes', 'cached', 'seconds'])
+
+
+def inventory_fingerprint(records):
+    """已安装版本集合的指纹"""
+    return hashlib.sha256(snapshot_text(records).encode('utf-8')).hexdigest()
+
+
+def index_url_of(options):
+    """选项中的 -i/--index-url，没有时为pip配置的index-url"""
+    options = list(options)
+    for i, option in enumerate(options):
+        if option in ('-i', '--index-url') and i + 1 < len(options):
+            return options[i + 1]
+        if option.startswith('--index-url='):
+            return option.split('=', 1)[1]
+    from pip_outdated import configured_index_url  # pip_outdated导入http.client和packaging，不放在启动路径上
+    return configured_index_url()
+
+
+def plan_key(python, requirements, options, index_url, fingerprint):
+    data = json.dumps([os.path.normcase(os.path.abspath(python)), sorted(requirements), list(options),
+                       index_url, fingerprint])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _pinned(entry, name, version):
+    """固定版本的需求：来自索引的包用 名称==版本，直接URL(本地目录、文件和VCS)用解析得到的URL"""
+    info = entry.get('download_info') or {}
+    url = info.get('url', '')
+    if not entry.get('is_direct'):
+        return f"{name}=={version}"
+    if 'vcs_info' in info:
+        vcs = info['vcs_info']
+        return f"{name} @ {vcs.get('vcs', 'git')}+{url}@{vcs.get('commit_id', '')}"
+    if 'dir_info' in info and info['dir_info'].get('editable'):
+        return f"-e {url}"
+    return f"{name} @ {url}"
+
+
+def _action(version, installed):
+    if installed is None:
+        return ACTION_INSTALL
+    from packaging.version import InvalidVersion, Version
+    try:
+        new, old = Version(version), Version(installed)
+    except InvalidVersion:
+        return ACTION_REINSTALL if version == installed else ACTION_UPGRADE
+    if new > old:
+        return ACTION_UPGRADE
+    if new < old:
+        return ACTION_DOWNGRADE
+    return ACTION_REINSTALL
+
+
+def parse_report(report, records):
+    """pip安装报告 -> PlannedChange列表(直接请求的包在前)"""
+    installed = {normalize_name(r.name): r.version for r in records}
+    changes = []
+    for entry in report.get('install', []):
+        metadata = entry.get('metadata') or {}
+        name, version = metadata.get('name', ''), metadata.get('version', '')
+        current = installed.get(normalize_name(name))
+        changes.append(PlannedChange(name, version, current, _action(version, current),
+                                     bool(entry.get('requested')), _pinned(entry, name, version)))
+    changes.sort(key=lambda c: (not c.requested, c.name.lower()))
+    return changes
+
+
+def resolve_plan(requirements, options, run_command, python, records):
+    """运行 `pip install --dry-run --report`，返回PlannedChange列表；解析失败时抛出RuntimeError"""
+    import tempfile
+    fd, report_path = tempfile.mkstemp(prefix='pipmgr-plan-', suffix='.json')
+    os.close(fd)
+    args = []
+    for requirement in requirements:
+        args.extend(requirement.split(None, 1) if requirement.startswith('-e ') else [requirement])
+    cmd = [python or sys.executable, '-m', 'pip', 'install', '--dry-run', '--quiet', '--report', report_path,
+           *options, *args]
+    lines = []
+    try:
+        code = run_command(cmd, lines.append)
+        if code != 0:
+            raise RuntimeError(''.join(lines[-20:]).strip() or "pip解析需求失败")
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+    finally:
+        try:
+            os.remove(report_path)
+        except OSError:
+            pass
+    return parse_report(report, records)
+
+
+def pinned_requirements(plan):
+    """按计划安装时的需求(固定版本)"""
+    return [change.pinned for change in plan.changes]
+
+
+class PlanCache:
+    """解析结果的磁盘缓存，每个键一个JSON文件，超过MAX_PLANS个时删除最旧的"""
+
+    def __init__(self, directory=None, max_age=PLAN_MAX_AGE):
+        self.directory = directory or get_data_dir('plans')
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """缓存的PlannedChange列表；没有或已过期时返回None"""
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != PLAN_VERSION or time.time() - data['time'] > self.max_age:
+                return None
+            return [PlannedChange(*row) for row in data['changes']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key, changes):
+        data = {'version': PLAN_VERSION, 'time': time.time(), 'changes': [list(c) for c in changes]}
+        with self._lock:
+            try:
+                tmp = f'{self._path(key)}.{os.getpid()}.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                return  # 缓存写入失败不影响预览
+            self._prune()
+
+    def _prune(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        except OSError:
+            return
+        if len(entries) <= MAX_PLANS:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - MAX_PLANS]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,208 @@
+"""需求文件导入导出：解析requirements.txt/pyproject.toml，在进程内判断哪些需求已经满足
+
+只有未满足的需求才交给pip，这样大部分已安装的需求文件不需要pip再做一次依赖解析。
+判断使用packaging的版本范围和环境标记；带extra的需求还会检查该extra的依赖是否已安装。
+"""
+import collections
+import datetime
+import os
+import shlex
+import sys
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.version import InvalidVersion, Version
+
+from pip_common import normalize_name
+from pip_deps import read_requires
+
+
+# 解析结果：需求字符串列表，以及需要原样传给pip的选项(例如 --index-url)
+RequirementsFile = collections.namedtuple('RequirementsFile', ['requirements', 'options'])
+
+# 比较结果：已满足的需求、需要安装的需求、环境标记不适用于当前环境的需求
+RequirementCheck = collections.namedtuple('RequirementCheck', ['satisfied', 'unsatisfied', 'skipped'])
+
+# 需要原样传给pip的选项(带一个参数)
+_PASSTHROUGH_OPTIONS = ('-i', '--index-url', '--extra-index-url', '-f', '--find-links', '--trusted-host')
+# 忽略的选项：约束文件、哈希校验等
+_IGNORED_OPTIONS = ('-c', '--constraint', '--hash', '--prefer-binary', '--require-hashes',
+                    '--only-binary', '--no-binary', '--use-feature')
+
+
+def _logical_lines(path):
+    """读取需求文件，合并反斜杠续行并去掉注释"""
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+    pending = ''
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith('#'):
+            line = ''
+        elif ' #' in line or '\t#' in line:
+            line = line.split(' #', 1)[0].split('\t#', 1)[0].rstrip()
+        if line.endswith('\\'):
+            pending += line[:-1] + ' '
+            continue
+        line = (pending + line).strip()
+        pending = ''
+        if line:
+            yield line
+    if pending.strip():
+        yield pending.strip()
+
+
+def parse_requirements_txt(path, _seen=None):
+    """解析requirements.txt，支持 -r 引用其它文件以及 -e/--index-url 等常用选项"""
+    seen = _seen if _seen is not None else set()
+    path = os.path.abspath(path)
+    if path in seen:
+        return RequirementsFile([], [])
+    seen.add(path)
+
+    requirements = []
+    options = []
+    base = os.path.dirname(path)
+    for line in _logical_lines(path):
+        if not line.startswith('-'):
+            requirements.append(line.split(' --hash', 1)[0].strip())
+            continue
+        parts = shlex.split(line, posix=os.name != 'nt')
+        option, value = parts[0], ' '.join(parts[1:])
+        if '=' in option and option.startswith('--'):
+            option, value = option.split('=', 1)
+        if option in ('-r', '--requirement'):
+            nested = parse_requirements_txt(os.path.join(base, value), seen)
+            requirements.extend(nested.requirements)
+            options.extend(o for o in nested.options if o not in options)
+        elif option in ('-e', '--editable'):
+            requirements.append(f"-e {value}")
+        elif option == '--pre':
+            if '--pre' not in options:
+                options.append('--pre')
+        elif option in _PASSTHROUGH_OPTIONS:
+            options.extend([option, value])
+        elif option in _IGNORED_OPTIONS:
+            continue
+    return RequirementsFile(requirements, options)
+
+
+def parse_pyproject(path, extras=()):
+    """读取pyproject.toml中 [project] 的dependencies，以及指定的optional-dependencies分组"""
+    try:
+        import tomllib
+    except ImportError:  # Python 3.10及以下
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("读取pyproject.toml需要Python 3.11或安装tomli")
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    project = data.get('project', {})
+    requirements = list(project.get('dependencies', []))
+    optional = project.get('optional-dependencies', {})
+    for extra in extras:
+        requirements.extend(optional.get(extra, []))
+    if not requirements and 'poetry' in data.get('tool', {}):
+        raise ValueError("暂不支持Poetry格式的依赖声明，请先导出为requirements.txt")
+    return RequirementsFile(requirements, [])
+
+
+def load_requirements(path, extras=()):
+    """根据文件名选择解析方式"""
+    if os.path.basename(path).lower().endswith('.toml'):
+        return parse_pyproject(path, extras)
+    return parse_requirements_txt(path)
+
+
+def _parse_version(text):
+    try:
+        return Version(text)
+    except InvalidVersion:
+        return None
+
+
+def check_requirements(requirements, records, environment=None):
+    """把需求与已安装清单比较，返回RequirementCheck
+
+    无法在进程内判断的需求(可编辑安装、URL、无法解析的行)一律视为未满足，交给pip处理。
+    """
+    installed = {normalize_name(r.name): r for r in records}
+    marker_cache = {}
+    satisfied, unsatisfied, skipped = [], [], []
+
+    def marker_ok(marker, extra=''):
+        key = (str(marker), extra)
+        if key not in marker_cache:
+            env = dict(environment or {})
+            env['extra'] = extra
+            try:
+                marker_cache[key] = marker.evaluate(env)
+            except Exception:
+                marker_cache[key] = True
+        return marker_cache[key]
+
+    def is_satisfied(req, visiting):
+        record = installed.get(normalize_name(req.name))
+        if record is None or req.url:
+            return False
+        if req.specifier:
+            version = _parse_version(record.version)
+            if version is None or not req.specifier.contains(version, prereleases=True):
+                return False
+        if not req.extras or not record.path:
+            return not req.extras
+        # 带extra的需求：该extra引入的依赖也必须已安装并满足
+        key = normalize_name(req.name)
+        for extra in req.extras:
+            if (key, extra) in visiting:
+                continue
+            visiting.add((key, extra))
+            for text, marker in read_requires(record.path):
+                if not marker:
+                    continue
+                try:
+                    dep = Requirement(f"{text}; {marker}")
+                except InvalidRequirement:
+                    continue
+                if not marker_ok(dep.marker, normalize_name(extra)) or marker_ok(dep.marker, ''):
+                    continue  # 不属于这个extra(基础依赖已随包安装)
+                dep.marker = None
+                if not is_satisfied(dep, visiting):
+                    return False
+        return True
+
+    for line in requirements:
+        if line.startswith('-e '):
+            unsatisfied.append(line)
+            continue
+        try:
+            req = Requirement(line)
+        except InvalidRequirement:
+            unsatisfied.append(line)
+            continue
+        if req.marker is not None and not marker_ok(req.marker):
+            skipped.append(line)
+        elif is_satisfied(req, set()):
+            satisfied.append(line)
+        else:
+            unsatisfied.append(line)
+    return RequirementCheck(satisfied, unsatisfied, skipped)
+
+
+def format_requirements(records, python=None):
+    """把清单导出为固定版本的需求文件内容(可编辑安装导出为 -e 路径)"""
+    lines = [
+        f"# 由 PipManagerGUI 导出于 {datetime.datetime.now():%Y-%m-%d %H:%M}",
+        f"# 解释器: {python or sys.executable}",
+    ]
+    for record in sorted(records, key=lambda r: r.name.lower()):
+        if record.editable:
+            lines.append(f"-e {record.editable}")
+        else:
+            lines.append(f"{record.name}=={record.version}")
+    return '\n'.join(lines) + '\n'
+
+
+def export_requirements(records, path, python=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(format_requirements(records, python))
@@ -0,0 +1,165 @@
+"""已安装包的搜索索引：规范化包名 + 三元组倒排表 + 模糊匹配"""
+import collections
+from array import array
+
+from pip_common import normalize_name
+
+
+# 边界标记，使首尾字符也能组成三元组，提高模糊匹配的召回
+_BOUNDARY = '\x00'
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _index_grams(name):
+    """建立索引用的n元组：名称中所有长度1~3的子串，以及带边界标记的三元组"""
+    padded = _BOUNDARY + name + _BOUNDARY
+    grams = set(name)
+    grams.update(name[i:i + 2] for i in range(len(name) - 1))
+    grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(a, b, limit):
+    """带相邻字符换位的编辑距离(OSA)，超过limit时提前返回limit+1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class PackageSearchIndex:
+    """对一份(已排序的)清单建立搜索索引
+
+    - 包名预先按PEP 503规范化，查询时不再逐个lower()
+    - 长度1~3的n元组倒排表保存为array('I')：短查询直接取倒排表，
+      更长的查询对三元组倒排表求交集得到候选
+    - 查询在上一次查询的基础上延长时，只在上一次的结果中继续筛选
+    - 精确(子串)匹配太少时，用三元组重合度+编辑距离做模糊匹配并排序
+    """
+
+    def __init__(self, records, fuzzy_limit=20, min_results_for_fuzzy=5):
+        self.records = list(records)
+        self.names = [normalize_name(r.name) for r in self.records]
+        self.fuzzy_limit = fuzzy_limit
+        self.min_results_for_fuzzy = min_results_for_fuzzy
+        postings = collections.defaultdict(list)
+        for index, name in enumerate(self.names):
+            for gram in _index_grams(name):
+                postings[gram].append(index)
+        self._postings = {gram: array('I', ids) for gram, ids in postings.items()}
+        self._last_query = None
+        self._last_ids = None
+        self._match_query = None
+        self._match_names = None  # 上一次matches()查询的结果(规范化包名)，None表示全部匹配
+        self._match_fuzzy = False
+
+    def __len__(self):
+        return len(self.records)
+
+    def search(self, query):
+        """返回匹配的记录：子串匹配按清单顺序在前，模糊匹配按相似度排在其后"""
+        query = normalize_name(query.strip())
+        if not query:
+            self._last_query = self._last_ids = None
+            return self.records
+        return [self.records[i] for i in self._search_ids(query)[0]]
+
+    def _search_ids(self, query):
+        """返回(记录序号列表, 是否包含模糊匹配)"""
+        ids = list(self.substring_ids(query))
+        if len(ids) < self.min_results_for_fuzzy and len(query) >= 3:
+            exact = set(ids)
+            fuzzy = [i for i in self.fuzzy_ids(query) if i not in exact]
+            return ids + fuzzy, bool(fuzzy)
+        return ids, False
+
+    def matches(self, record, query):
+        """判断单条记录是否在search(query)的结果中(用于增量更新时判断行是否可见)"""
+        self._prepare_matches(query)
+        return self._match_names is None or normalize_name(record.name) in self._match_names
+
+    def has_fuzzy(self, query):
+        """search(query)的结果是否包含模糊匹配(此时结果不再按名称排序，不能按名称增量插入)"""
+        self._prepare_matches(query)
+        return self._match_fuzzy
+
+    def _prepare_matches(self, query):
+        query = normalize_name(query.strip())
+        if query == self._match_query:
+            return
+        self._match_query = query
+        if query:
+            ids, self._match_fuzzy = self._search_ids(query)
+            self._match_names = {self.names[i] for i in ids}
+        else:
+            self._match_names, self._match_fuzzy = None, False
+
+    def substring_ids(self, query):
+        """子串匹配，结果保持清单顺序"""
+        names = self.names
+        if len(query) <= 3:
+            # 倒排表本身就是精确结果
+            ids = self._postings.get(query, array('I'))
+        else:
+            if self._last_query is not None and self._last_query in query:
+                # 查询是上一次的延长：只需在上一次的结果中筛选
+                candidates = self._last_ids
+            else:
+                candidates = self._intersect(_trigrams(query))
+            ids = array('I', (i for i in candidates if query in names[i]))
+        self._last_query = query
+        self._last_ids = ids
+        return ids
+
+    def fuzzy_ids(self, query, max_distance=None):
+        """模糊匹配，按(编辑距离, 长度差, 名称)排序"""
+        if max_distance is None:
+            max_distance = max(1, len(query) // 4)
+        grams = _trigrams(_BOUNDARY + query + _BOUNDARY)
+        counts = collections.Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            # 过于常见的三元组区分度低，跳过以控制候选数量
+            if posting is not None and len(posting) <= max(1000, len(self.names) // 10):
+                counts.update(posting)
+        ranked = []
+        for index, _ in counts.most_common(self.fuzzy_limit * 10):
+            name = self.names[index]
+            distance = edit_distance(query, name, max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, abs(len(name) - len(query)), name, index))
+        ranked.sort()
+        return [index for _, _, _, index in ranked[:self.fuzzy_limit]]
+
+    def _intersect(self, grams):
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return array('I')
+            postings.append(posting)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return sorted(result)
@@ -0,0 +1,233 @@
+"""环境快照：每次安装/卸载前记录已安装的版本集合，可快速比较并从本地wheel离线回滚
+
+快照内容是按规范化包名排序的 "名称==版本" 文本，以其sha256为ID保存在 objects/ 中
+(相同的安装集合只保存一份)；每个环境的快照时间线保存在 history-<环境>.jsonl 中。
+
+回滚需要旧版本的wheel：操作前把可能被改变的包(请求的包及其已安装依赖的闭包)按RECORD
+重新打包成wheel存入本地wheel仓库(已有同名文件时跳过)，回滚时用
+`pip install --no-index --find-links 仓库 --no-deps 名称==版本` 安装，不访问网络。
+重新打包只包含site目录内的文件，console_scripts由pip按entry_points.txt重新生成。
+"""
+import base64
+import collections
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from pip_common import get_data_dir, normalize_name, wheel_version
+
+
+# 一个快照：ID(sha256)、解释器、时间戳、说明、包数量
+Snapshot = collections.namedtuple('Snapshot', ['id', 'python', 'time', 'label', 'count'])
+
+# 从旧快照到新快照的变化：added/removed 为 [(名称, 版本)]，changed 为 [(名称, 旧版本, 新版本)]
+SnapshotDiff = collections.namedtuple('SnapshotDiff', ['added', 'removed', 'changed'])
+
+# 重新打包时跳过的安装期文件(由pip在安装时生成)
+_INSTALL_FILES = {'INSTALLER', 'REQUESTED', 'RECORD', 'direct_url.json'}
+_WHEEL_NAME_RE = re.compile(r'[^\w\d.]+', re.UNICODE)
+
+
+def snapshot_text(records):
+    """清单 -> 规范的快照文本"""
+    lines = sorted((normalize_name(r.name), f"{r.name}=={r.version}") for r in records)
+    return ''.join(line + '\n' for _, line in lines)
+
+
+class SnapshotStore:
+    """快照的保存、查询和比较(线程安全)"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_data_dir('snapshots')
+        self.objects = os.path.join(self.directory, 'objects')
+        os.makedirs(self.objects, exist_ok=True)
+        self._lock = threading.Lock()
+        self._packages = {}  # 快照ID -> {规范化包名: (名称, 版本)}
+
+    def _history_path(self, python):
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(python)).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f'history-{digest}.jsonl')
+
+    def take(self, python, records, label=''):
+        """保存当前清单的快照；与该环境最近一次快照相同时直接返回那一次"""
+        text = snapshot_text(records)
+        snapshot_id = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        history = self.history(python)
+        if history and history[-1].id == snapshot_id:
+            return history[-1]
+        path = os.path.join(self.objects, snapshot_id + '.txt')
+        with self._lock:
+            if not os.path.exists(path):
+                tmp = f'{path}.{os.getpid()}.tmp'
+                with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+                    f.write(text)
+                os.replace(tmp, path)
+            snapshot = Snapshot(snapshot_id, python, time.time(), label, len(records))
+            with open(self._history_path(python), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot._asdict(), ensure_ascii=False) + '\n')
+        return snapshot
+
+    def history(self, python):
+        """该环境的快照(最早的在前)"""
+        snapshots = []
+        try:
+            with open(self._history_path(python), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        snapshots.append(Snapshot(**json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return snapshots
+
+    def resolve(self, python, prefix):
+        """按ID前缀查找该环境的快照；找不到或不唯一时抛出ValueError"""
+        matches = {s.id: s for s in self.history(python) if s.id.startswith(prefix)}
+        if len(matches) != 1:
+            raise ValueError(f"{'没有' if not matches else '有多个'}快照匹配: {prefix}")
+        return next(iter(matches.values()))
+
+    def packages(self, snapshot_id):
+        """{规范化包名: (名称, 版本)}"""
+        with self._lock:
+            packages = self._packages.get(snapshot_id)
+        if packages is not None:
+            return packages
+        packages = {}
+        with open(os.path.join(self.objects, snapshot_id + '.txt'), encoding='utf-8') as f:
+            for line in f:
+                name, _, version = line.rstrip('\n').partition('==')
+                packages[normalize_name(name)] = (name, version)
+        with self._lock:
+            self._packages[snapshot_id] = packages
+        return packages
+
+    def diff(self, old_id, new_id):
+        """从old到new的变化"""
+        if old_id == new_id:
+            return SnapshotDiff([], [], [])
+        old, new = self.packages(old_id), self.packages(new_id)
+        added = [new[key] for key in sorted(new.keys() - old.keys())]
+        removed = [old[key] for key in sorted(old.keys() - new.keys())]
+        changed = [(new[key][0], old[key][1], new[key][1]) for key in sorted(old.keys() & new.keys())
+                   if old[key][1] != new[key][1]]
+        return SnapshotDiff(added, removed, changed)
+
+
+def dependency_closure(dep_index, names):
+    """names及其所有已安装依赖的规范化包名"""
+    pending = [normalize_name(name) for name in names]
+    seen = set()
+    while pending:
+        key = pending.pop()
+        if key in seen:
+            continue
+        seen.add(key)
+        pending.extend(dep.name for dep in dep_index.requires(key))
+    return seen
+
+
+def _wheel_tags(dist_info):
+    """dist-info/WHEEL中的标签压缩为文件名中的 python-abi-platform 形式"""
+    pythons, abis, platforms = [], [], []
+    try:
+        with open(os.path.join(dist_info, 'WHEEL'), encoding='utf-8') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key.strip() == 'Tag':
+                    python, abi, platform = value.strip().split('-', 2)
+                    for values, item in ((pythons, python), (abis, abi), (platforms, platform)):
+                        if item not in values:
+                            values.append(item)
+    except (OSError, ValueError):
+        return None
+    if not pythons:
+        return None
+    return '-'.join('.'.join(values) for values in (pythons, abis, platforms))
+
+
+def wheel_filename(record):
+    """已安装分发包对应的wheel文件名；不是wheel安装的包返回None"""
+    if not record.path or not record.path.endswith('.dist-info') or record.editable:
+        return None
+    tags = _wheel_tags(record.path)
+    if tags is None:
+        return None
+    name = _WHEEL_NAME_RE.sub('_', record.name)
+    return f"{name}-{wheel_version(record.version)}-{tags}.whl"
+
+
+def repack_wheel(record, directory):
+    """按RECORD把已安装的分发包重新打包成wheel，返回wheel路径；无法打包时返回None"""
+    filename = wheel_filename(record)
+    if filename is None:
+        return None
+    site_dir = record.location
+    dist_info_name = os.path.basename(record.path)
+    with open(os.path.join(record.path, 'RECORD'), encoding='utf-8', newline='') as f:
+        entries = [row[0] for row in csv.reader(f) if row]
+    target = os.path.join(directory, filename)
+    rows = []
+    import zipfile  # zipfile导入shutil，只在保留wheel时用到
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_STORED) as archive:
+        for entry in entries:
+            arcname = entry.replace('\\', '/')
+            parts = arcname.split('/')
+            if '..' in parts or os.path.isabs(entry) or '__pycache__' in parts:
+                continue  # 脚本等site目录外的文件，以及字节码
+            if parts[0] == dist_info_name and parts[-1] in _INSTALL_FILES:
+                continue
+            path = os.path.join(site_dir, *parts)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with open(path, 'rb') as source, archive.open(arcname, 'w') as out:
+                    while True:
+                        chunk = source.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            except FileNotFoundError:
+                continue
+            encoded = base64.urlsafe_b64encode(digest.digest()).rstrip(b'=').decode('ascii')
+            rows.append(f"{arcname},sha256={encoded},{size}")
+        rows.append(f"{dist_info_name}/RECORD,,")
+        archive.writestr(f"{dist_info_name}/RECORD", '\n'.join(rows) + '\n')
+    return target
+
+
+def retain_wheels(records, wheelhouse):
+    """把records重新打包存入wheel仓库(已有同名wheel的跳过)，返回 (保留的文件名列表, 无法保留的包名列表)"""
+    retained, skipped = [], []
+    for record in records:
+        filename = wheel_filename(record)
+        if filename is None:
+            skipped.append(record.name)
+            continue
+        if wheelhouse.lookup(filename):
+            retained.append(filename)
+            continue
+        try:
+            path = repack_wheel(record, wheelhouse.tmp_dir)
+        except OSError:
+            path = None
+        if path is None:
+            skipped.append(record.name)
+            continue
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        wheelhouse.add(path, filename, digest.hexdigest())
+        retained.append(filename)
+    if retained:
+        wheelhouse.touch(retained)
+        wheelhouse.evict(keep=retained)
+    return retained, skipped
@@ -0,0 +1,98 @@
+"""启动耗时测量：记录导入、窗口构建、首屏显示等阶段的时间点
+
+以 `--startup-timing` 参数(或设置环境变量 PIPMANAGER_STARTUP_TIMING=1)启动程序时，
+清单后台核对完成后输出一行JSON报告并退出。源码运行和PyInstaller打包后的程序
+都支持；打包的窗口程序没有标准输出，报告同时追加到日志目录的 startup.jsonl。
+"""
+import json
+import os
+import sys
+import time
+
+
+FLAG = '--startup-timing'
+ENV_VAR = 'PIPMANAGER_STARTUP_TIMING'
+REPORT_FILE = 'startup.jsonl'
+
+
+def enabled(argv=None):
+    argv = sys.argv if argv is None else argv
+    return FLAG in argv or bool(os.environ.get(ENV_VAR))
+
+
+def process_age():
+    """进程从创建到现在的秒数(包括解释器启动和打包程序解压的时间)，无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            creation, exit_time, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation),
+                                            ctypes.byref(exit_time), ctypes.byref(kernel),
+                                            ctypes.byref(user)):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+
+            def ticks(ft):
+                return (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+
+            return (ticks(now) - ticks(creation)) / 1e7  # 单位100纳秒
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except Exception:
+        return None
+
+
+class StartupTimer:
+    """按顺序记录启动阶段，各阶段耗时为与上一个时间点的差值"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.before_start = process_age()  # 第一行代码执行之前已经花费的时间
+        self.marks = []
+
+    def mark(self, phase):
+        """记录一个阶段的结束时间，同一阶段只记录第一次"""
+        if all(name != phase for name, _ in self.marks):
+            self.marks.append((phase, time.perf_counter()))
+
+    def has(self, phase):
+        return any(name == phase for name, _ in self.marks)
+
+    def report(self):
+        phases = {}
+        if self.before_start is not None:
+            phases['interpreter'] = round(self.before_start * 1000, 1)
+        previous = self.start
+        for name, at in self.marks:
+            phases[name] = round((at - previous) * 1000, 1)
+            previous = at
+        total = previous - self.start + (self.before_start or 0)
+        return {
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'python': sys.version.split()[0],
+            'executable': sys.executable,
+            'phases_ms': phases,
+            'total_ms': round(total * 1000, 1),
+            'time': time.time(),
+        }
+
+    def write(self):
+        """输出报告(标准输出和日志目录)，返回报告"""
+        from pip_common import get_data_dir
+
+        report = self.report()
+        line = json.dumps(report, ensure_ascii=False)
+        if sys.stdout is not None:
+            print(line, flush=True)
+        try:
+            with open(os.path.join(get_data_dir('logs'), REPORT_FILE), 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError:
+            pass
+        return report
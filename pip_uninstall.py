@@ -0,0 +1,72 @@
+"""批量卸载：一次pip调用卸载所有选中的包，并逐个报告进度"""
+import re
+import sys
+
+from pip_common import normalize_name
+
+
+REMOVED = 'removed'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+_FOUND_RE = re.compile(r"^\s*Found existing installation: (\S+) (\S+)")
+_DONE_RE = re.compile(r"^\s*Successfully uninstalled (\S+)")
+_SKIP_RE = re.compile(r"WARNING: Skipping (\S+) as it is not installed")
+
+
+def build_uninstall_command(python, names):
+    return [python or sys.executable, "-m", "pip", "uninstall", "-y", *names]
+
+
+def bulk_uninstall(names, run_command, python=None, on_progress=None):
+    """卸载names中的所有包，返回 {包名: REMOVED/SKIPPED/FAILED}
+
+    run_command(cmd, on_line) 执行命令并逐行回调输出，返回退出码。
+    所有包通过一次 `pip uninstall -y a b c ...` 卸载；pip遇到无法卸载的包
+    会中止，此时把该包记为失败，剩余的包再合并为一次调用继续卸载。
+    on_progress(done, total, name, status) 在每个包处理完时调用。
+    """
+    total = len(names)
+    remaining = {normalize_name(name): name for name in names}
+    results = {}
+
+    def finish(key, status):
+        name = remaining.pop(key, None)
+        if name is not None:
+            results[name] = status
+            if on_progress is not None:
+                on_progress(len(results), total, name, status)
+
+    while remaining:
+        current = None
+        progressed = False
+
+        def on_line(line):
+            nonlocal current, progressed
+            match = _FOUND_RE.match(line)
+            if match:
+                current = normalize_name(match.group(1))
+                return
+            match = _DONE_RE.match(line)
+            if match and current is not None:
+                finish(current, REMOVED)
+                progressed = True
+                current = None
+                return
+            match = _SKIP_RE.search(line)
+            if match:
+                finish(normalize_name(match.group(1)), SKIPPED)
+                progressed = True
+
+        return_code = run_command(build_uninstall_command(python, list(remaining.values())), on_line)
+        if return_code == 0:
+            for key in list(remaining):
+                finish(key, SKIPPED)
+            break
+        if current is not None:
+            # pip在卸载current时出错并中止，其余的包继续卸载
+            finish(current, FAILED)
+        elif not progressed:
+            for key in list(remaining):
+                finish(key, FAILED)
+    return results
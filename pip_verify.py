@@ -0,0 +1,194 @@
+"""已安装文件的完整性校验：按RECORD中的哈希检查每个文件是否被修改或缺失
+
+需要计算哈希的文件按大小分批交给进程池(哈希是CPU密集的，多进程不受GIL限制)，
+每个文件以内存映射分块读取。计算过的哈希按文件路径缓存，键为文件的大小和mtime，
+再次校验时未变化的文件直接使用缓存；总量很小时在当前进程中计算，省去启动进程池的开销。
+"""
+import base64
+import collections
+import concurrent.futures
+import csv
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+from pip_common import get_data_dir, normalize_name
+
+
+CACHE_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+BATCH_BYTES = 16 * 1024 * 1024  # 每批交给工作进程的数据量
+BATCH_FILES = 256
+INLINE_BYTES = 8 * 1024 * 1024  # 需要计算的总量低于该值时不启动进程池
+
+VERIFY_OK = 'ok'
+VERIFY_DAMAGED = 'damaged'
+VERIFY_NO_RECORD = 'no-record'
+
+VERIFY_NAMES = {
+    VERIFY_OK: '完好',
+    VERIFY_DAMAGED: '文件被修改',
+    VERIFY_NO_RECORD: '无法校验',
+}
+
+# 一个包的校验结果：状态、校验的文件数、哈希不符的文件、缺失的文件(路径均为RECORD中的写法)
+VerifyResult = collections.namedtuple('VerifyResult',
+                                      ['name', 'version', 'status', 'checked', 'modified', 'missing'])
+
+
+def verify_cache_path():
+    return os.path.join(get_data_dir(), 'verify_cache.json')
+
+
+def file_digest(path, algorithm='sha256'):
+    """文件内容的RECORD格式哈希(urlsafe base64，去掉填充)"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, len(mapped), CHUNK_SIZE):
+                        digest.update(view[offset:offset + CHUNK_SIZE])
+                finally:
+                    view.release()
+    return base64.urlsafe_b64encode(digest.digest()).rstrip(b'=').decode('ascii')
+
+
+def hash_batch(items):
+    """[(路径, 算法)] -> [哈希或None(无法读取)]，在工作进程中执行"""
+    digests = []
+    for path, algorithm in items:
+        try:
+            digests.append(file_digest(path, algorithm))
+        except (OSError, ValueError):
+            digests.append(None)
+    return digests
+
+
+def read_record(record):
+    """[(RECORD中的路径, 绝对路径, 算法, 期望的哈希)]，只包含带哈希的条目；没有RECORD时返回None"""
+    if not record.path or not record.path.endswith('.dist-info'):
+        return None
+    try:
+        with open(os.path.join(record.path, 'RECORD'), encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+    entries = []
+    for row in rows:
+        if len(row) < 2 or '=' not in row[1]:
+            continue  # RECORD本身和.pyc等没有哈希
+        algorithm, _, expected = row[1].partition('=')
+        entries.append((row[0], os.path.normpath(os.path.join(record.location, row[0])), algorithm, expected))
+    return entries
+
+
+class Verifier:
+    """校验多个包，计算过的文件哈希按大小和mtime缓存(同一时间只运行一次校验)"""
+
+    def __init__(self, cache_path=None, workers=None):
+        self.cache_path = cache_path or verify_cache_path()
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                return data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _save(self, files):
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'files': files}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def verify(self, records, progress=None):
+        """返回 {规范化包名: VerifyResult}；progress(已完成字节, 需要计算的总字节) 在每批完成时调用"""
+        with self._lock:
+            return self._verify(records, progress)
+
+    def _verify(self, records, progress):
+        cache = self._load()
+        fresh = {}  # 本次校验涉及的文件 -> [size, mtime_ns, 算法, 哈希]
+        plans = []  # (record, entries)
+        todo = []  # (绝对路径, 算法, size)
+        for record in records:
+            entries = read_record(record)
+            plans.append((record, entries))
+            for _relative, path, algorithm, _expected in entries or ():
+                if path in fresh:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # 缺失
+                cached = cache.get(path)
+                if cached is not None and cached[:3] == [st.st_size, st.st_mtime_ns, algorithm]:
+                    fresh[path] = cached
+                else:
+                    fresh[path] = [st.st_size, st.st_mtime_ns, algorithm, None]
+                    todo.append((path, algorithm, st.st_size))
+
+        total = sum(item[2] for item in todo)
+        done = 0
+        for batch, digests in self._hash(todo, total):
+            for (path, _algorithm, size), digest in zip(batch, digests):
+                fresh[path][3] = digest
+                done += size
+            if progress is not None:
+                progress(done, total)
+
+        results = {}
+        for record, entries in plans:
+            key = normalize_name(record.name)
+            if entries is None:
+                results[key] = VerifyResult(record.name, record.version, VERIFY_NO_RECORD, 0, [], [])
+                continue
+            modified, missing = [], []
+            for relative, path, _algorithm, expected in entries:
+                entry = fresh.get(path)
+                if entry is None:
+                    missing.append(relative)
+                elif entry[3] != expected:
+                    modified.append(relative)
+            status = VERIFY_DAMAGED if modified or missing else VERIFY_OK
+            results[key] = VerifyResult(record.name, record.version, status, len(entries), modified, missing)
+
+        # 本次涉及的site目录中的旧条目以本次结果为准，其它环境的条目保留
+        locations = tuple({os.path.join(os.path.normpath(r.location), '') for r in records if r.location})
+        cache = {path: entry for path, entry in cache.items() if not path.startswith(locations)}
+        cache.update((path, entry) for path, entry in fresh.items() if entry[3] is not None)
+        self._save(cache)
+        return results
+
+    def _hash(self, todo, total):
+        """按批计算哈希，逐批产出 (批, 哈希列表)"""
+        batches, batch, size = [], [], 0
+        for item in todo:
+            batch.append(item)
+            size += item[2]
+            if size >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+                batches.append(batch)
+                batch, size = [], 0
+        if batch:
+            batches.append(batch)
+        if total < INLINE_BYTES or self.workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                yield batch, hash_batch([(path, algorithm) for path, algorithm, _size in batch])
+            return
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+            futures = {pool.submit(hash_batch, [(path, algorithm) for path, algorithm, _size in batch]): batch
+                       for batch in batches}
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future.result()
@@ -0,0 +1,144 @@
+"""监视site-packages目录变化(例如在终端中执行的pip install)
+
+Linux下通过ctypes调用inotify，其它平台退化为每秒轮询目录mtime。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from pip_inventory import METADATA_SUFFIXES
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_ATTRIB | IN_DELETE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """加载libc中的inotify接口，不支持时返回None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class SiteWatcher:
+    """在后台线程中监视目录，元数据条目变化时回调callback()
+
+    事件经过去抖：安静debounce秒后触发，持续写入时最迟max_delay秒触发一次，
+    保证终端中的安装在一秒内被发现，同时不会为pip写入的每个文件各刷新一次。
+    """
+
+    def __init__(self, paths, callback, debounce=0.25, max_delay=0.8, poll_interval=1.0):
+        self.paths = list(paths)
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._libc = _load_inotify()
+
+    @property
+    def backend(self):
+        return 'inotify' if self._libc else 'polling'
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        if self._libc:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                try:
+                    self._run_inotify(fd)
+                finally:
+                    os.close(fd)
+                return
+        self._run_polling()
+
+    def _run_inotify(self, fd):
+        for path in self.paths:
+            self._libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+
+        first_event = last_event = None
+        while not self._stop.is_set():
+            if first_event is None:
+                timeout = 0.5
+            else:
+                timeout = max(0.0, min(last_event + self.debounce,
+                                       first_event + self.max_delay) - time.monotonic())
+            readable, _, _ = select.select([fd], [], [], timeout)
+            now = time.monotonic()
+            # 先检查截止时间：pip写入其它条目时fd一直可读，不能等到select超时才通知
+            if first_event is not None and now >= min(last_event + self.debounce, first_event + self.max_delay):
+                first_event = last_event = None
+                self._notify()
+            if readable and self._has_metadata_event(os.read(fd, 65536)):
+                first_event = first_event or now
+                last_event = now
+
+    def _has_metadata_event(self, data):
+        """只关心元数据条目的变化，忽略pip写入包目录时产生的大量事件"""
+        offset = 0
+        found = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if mask & IN_DELETE_SELF or name.endswith(METADATA_SUFFIXES):
+                found = True
+        return found
+
+    def _run_polling(self):
+        def snapshot():
+            keys = []
+            for path in self.paths:
+                try:
+                    keys.append(os.stat(path).st_mtime_ns)
+                except OSError:
+                    keys.append(None)
+            return keys
+
+        previous = snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = snapshot()
+            if current != previous:
+                previous = current
+                self._notify()
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception:
+            pass
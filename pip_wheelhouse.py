@@ -0,0 +1,456 @@
+"""本地wheel仓库：并行预下载需求的分发文件，之后可以离线安装(--no-index --find-links)
+
+1. 解析：用目标解释器的pip执行 `install --dry-run --ignore-installed --report`，得到包含
+   依赖的固定版本集合，以及每个文件的URL和sha256；
+2. 下载：每个镜像开若干个下载线程，从共享队列中取文件(快的镜像自然下载得多)，在该镜像的
+   项目页中查找同名文件；镜像上没有该文件或校验失败时回退到解析得到的URL；
+3. 存储：文件按sha256保存在 blobs/ 中(相同内容只保存一份)，wheels/ 中以文件名硬链接到
+   blob，供 --find-links 使用；index.json 记录大小和最近使用时间，超出容量时按LRU淘汰。
+"""
+import collections
+import hashlib
+import html
+import http.client
+import json
+import os
+import queue
+import re
+import shutil
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import url2pathname
+
+from pip_common import (PREFETCH_CACHED as STATUS_CACHED, PREFETCH_CONNECTIONS as DEFAULT_CONNECTIONS,
+                        PREFETCH_DOWNLOADED as STATUS_DOWNLOADED, PREFETCH_FAILED as STATUS_FAILED,
+                        get_data_dir, normalize_name, wheel_version)
+from pip_outdated import ACCEPT
+
+
+INDEX_VERSION = 1
+DEFAULT_LIMIT = 2 * 1024 ** 3  # 默认容量2GB
+DEFAULT_TIMEOUT = 30.0
+CHUNK_SIZE = 256 * 1024
+
+# 需要下载的一个分发文件
+PrefetchItem = collections.namedtuple('PrefetchItem', ['name', 'version', 'filename', 'url', 'sha256'])
+
+# 一个文件的预下载结果：来源为镜像地址或解析时的URL所在主机
+PrefetchResult = collections.namedtuple('PrefetchResult',
+                                        ['filename', 'status', 'source', 'size', 'seconds', 'error'])
+
+_HREF_RE = re.compile(r'<a\s[^>]*href=["\']([^"\']+)["\']', re.IGNORECASE)
+_PROCESSING_RE = re.compile(r"^\s*Processing (\S+)", re.MULTILINE)
+_RETRYABLE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+              ConnectionResetError, BrokenPipeError)
+
+
+def resolve_requirements(requirements, run_command, python=None, index_url=None, options=()):
+    """让目标解释器的pip解析需求(不安装)，返回PrefetchItem列表
+
+    run_command(cmd, on_line) 执行命令并返回退出码(例如PipEngine.run_command)。
+    可编辑安装、本地目录和VCS需求无法预下载，会被跳过。
+    """
+    fd, report_path = tempfile.mkstemp(prefix='pipmgr-report-', suffix='.json')
+    os.close(fd)
+    cmd = [python or sys.executable, '-m', 'pip', 'install', '--dry-run', '--ignore-installed',
+           '--prefer-binary', '--quiet', '--report', report_path]
+    if index_url:
+        cmd += ['--index-url', index_url]
+    cmd += list(options) + [r for r in requirements if not r.startswith('-e ')]
+    lines = []
+    try:
+        code = run_command(cmd, lines.append)
+        if code != 0:
+            raise RuntimeError(''.join(lines[-20:]).strip() or "pip解析需求失败")
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+    finally:
+        try:
+            os.remove(report_path)
+        except OSError:
+            pass
+
+    items = []
+    for entry in report.get('install', []):
+        info = entry.get('download_info') or {}
+        archive = info.get('archive_info')
+        if archive is None:
+            continue  # 本地目录或VCS
+        url = info.get('url', '')
+        sha256 = (archive.get('hashes') or {}).get('sha256')
+        if not sha256 and archive.get('hash', '').startswith('sha256='):
+            sha256 = archive['hash'][len('sha256='):]
+        metadata = entry.get('metadata') or {}
+        filename = unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+        items.append(PrefetchItem(metadata.get('name', ''), metadata.get('version', ''), filename, url, sha256))
+    return items
+
+
+class Wheelhouse:
+    """按内容寻址的本地分发文件仓库(线程安全)"""
+
+    def __init__(self, root=None, limit=DEFAULT_LIMIT):
+        self.root = root or get_data_dir('wheelhouse')
+        self.limit = limit
+        self.blob_dir = os.path.join(self.root, 'blobs')
+        self.wheel_dir = os.path.join(self.root, 'wheels')
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        for path in (self.blob_dir, self.wheel_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+        self.index_path = os.path.join(self.root, 'index.json')
+        self._lock = threading.Lock()
+        self._blobs = {}  # sha256 -> {'size': 字节数, 'used': 最近使用时间, 'files': [文件名]}
+        self._files = {}  # 文件名 -> sha256
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if data.get('version') != INDEX_VERSION:
+            return
+        for sha256, entry in data.get('blobs', {}).items():
+            if not os.path.exists(self.blob_path(sha256)):
+                continue
+            files = [name for name in entry.get('files', [])
+                     if os.path.exists(os.path.join(self.wheel_dir, name))]
+            self._blobs[sha256] = {'size': entry['size'], 'used': entry['used'], 'files': files}
+            for name in files:
+                self._files[name] = sha256
+
+    def save(self):
+        with self._lock:
+            data = {'version': INDEX_VERSION, 'blobs': self._blobs}
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_path)
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def lookup(self, filename, sha256=None):
+        """仓库中该文件的sha256；不存在或与期望的哈希不同时返回None"""
+        with self._lock:
+            digest = self._files.get(filename)
+        if digest is None or (sha256 and digest != sha256):
+            return None
+        return digest
+
+    def find(self, name, version):
+        """仓库中 name==version 的wheel文件名(任意标签)，没有时返回None"""
+        key = normalize_name(name)
+        version = wheel_version(version).lower()
+        with self._lock:
+            for filename in self._files:
+                parts = filename[:-len('.whl')].split('-') if filename.endswith('.whl') else ()
+                if len(parts) >= 5 and parts[1].lower() == version and normalize_name(parts[0]) == key:
+                    return filename
+        return None
+
+    def has_blob(self, sha256):
+        with self._lock:
+            return sha256 in self._blobs
+
+    def link(self, filename, sha256):
+        """让 wheels/文件名 指向已有的blob(内容相同的文件只保存一份)"""
+        target = os.path.join(self.wheel_dir, filename)
+        with self._lock:
+            entry = self._blobs[sha256]
+            old = self._files.get(filename)
+            if old == sha256 and os.path.exists(target):
+                entry['used'] = time.time()
+                return
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(self.blob_path(sha256), target)
+            except OSError:
+                shutil.copyfile(self.blob_path(sha256), target)  # 文件系统不支持硬链接
+            if old is not None and old != sha256 and old in self._blobs:
+                self._blobs[old]['files'].remove(filename)
+            self._files[filename] = sha256
+            if filename not in entry['files']:
+                entry['files'].append(filename)
+            entry['used'] = time.time()
+
+    def add(self, temp_path, filename, sha256):
+        """把下载好的临时文件存入仓库"""
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if sha256 in self._blobs:
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(temp_path, blob)
+                os.chmod(blob, 0o644)
+                self._blobs[sha256] = {'size': os.path.getsize(blob), 'used': time.time(), 'files': []}
+        self.link(filename, sha256)
+
+    def touch(self, filenames):
+        now = time.time()
+        with self._lock:
+            for name in filenames:
+                digest = self._files.get(name)
+                if digest is not None:
+                    self._blobs[digest]['used'] = now
+
+    def mark_used_from_output(self, output):
+        """根据pip输出中的 "Processing 仓库路径" 行更新最近使用时间"""
+        prefix = os.path.normcase(os.path.abspath(self.wheel_dir))
+        names = [os.path.basename(path) for path in _PROCESSING_RE.findall(output)
+                 if os.path.normcase(os.path.abspath(os.path.dirname(path))) == prefix]
+        if names:
+            self.touch(names)
+            self.save()
+        return names
+
+    def total_size(self):
+        with self._lock:
+            return sum(entry['size'] for entry in self._blobs.values())
+
+    def entries(self):
+        """[(文件名列表, 大小, 最近使用时间)]，最近使用的在前"""
+        with self._lock:
+            rows = [(list(entry['files']), entry['size'], entry['used']) for entry in self._blobs.values()]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def evict(self, limit=None, keep=()):
+        """按最近使用时间淘汰，直到总大小不超过limit；keep中的文件尽量保留。返回被删除的文件名"""
+        limit = self.limit if limit is None else limit
+        keep = set(keep)
+        removed = []
+        with self._lock:
+            total = sum(entry['size'] for entry in self._blobs.values())
+            if total <= limit:
+                return removed
+            # 先淘汰不在keep中的，再按需要淘汰keep中的
+            order = sorted(self._blobs.items(),
+                           key=lambda item: (bool(keep.intersection(item[1]['files'])), item[1]['used']))
+            for sha256, entry in order:
+                if total <= limit:
+                    break
+                for name in entry['files']:
+                    try:
+                        os.remove(os.path.join(self.wheel_dir, name))
+                    except OSError:
+                        pass
+                    self._files.pop(name, None)
+                    removed.append(name)
+                try:
+                    os.remove(self.blob_path(sha256))
+                except OSError:
+                    pass
+                del self._blobs[sha256]
+                total -= entry['size']
+        self.save()
+        return removed
+
+    def install_options(self):
+        """从仓库离线安装时的pip选项"""
+        return ['--no-index', '--find-links', self.wheel_dir]
+
+
+class _Session:
+    """一个下载线程使用的连接(按主机复用，跟随重定向)"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._connections = {}
+        self._context = None
+
+    def _connect(self, scheme, host, port):
+        if scheme == 'https':
+            if self._context is None:
+                self._context = ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def open(self, url, accept='*/*', redirects=5):
+        """发送GET请求，返回 (响应, 最终URL)；调用方读完响应体后才能发下一个请求"""
+        for _ in range(redirects + 1):
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port)
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            for attempt in range(2):
+                conn = self._connections.get(key)
+                reused = conn is not None
+                if conn is None:
+                    conn = self._connections[key] = self._connect(*key)
+                try:
+                    conn.request('GET', path, headers={'Accept': accept, 'User-Agent': 'PipManagerGUI'})
+                    response = conn.getresponse()
+                    break
+                except _RETRYABLE:
+                    conn.close()
+                    del self._connections[key]
+                    if not reused or attempt:
+                        raise
+                except Exception:
+                    conn.close()
+                    del self._connections[key]
+                    raise
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                url = urljoin(url, response.getheader('Location', ''))
+                continue
+            if response.status != 200:
+                response.read()
+                raise OSError(f"HTTP {response.status}: {url}")
+            return response, url
+        raise OSError(f"重定向次数过多: {url}")
+
+    def close(self):
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+
+def parse_file_links(body, content_type, page_url):
+    """解析项目页，返回 {文件名: (URL, sha256或None)}"""
+    links = {}
+    if 'json' in (content_type or ''):
+        for entry in json.loads(body).get('files', []):
+            url = urljoin(page_url, entry['url'])
+            links[entry['filename']] = (url, (entry.get('hashes') or {}).get('sha256'))
+        return links
+    for href in _HREF_RE.findall(body.decode('utf-8', 'replace')):
+        url = urljoin(page_url, html.unescape(href))
+        path, _, fragment = url.partition('#')
+        sha256 = fragment[len('sha256='):] if fragment.startswith('sha256=') else None
+        links[unquote(urlsplit(path).path.rsplit('/', 1)[-1])] = (path, sha256)
+    return links
+
+
+class Prefetcher:
+    """把PrefetchItem并行下载到Wheelhouse，下载线程分布在多个镜像上"""
+
+    def __init__(self, wheelhouse, mirrors=(), connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT):
+        self.wheelhouse = wheelhouse
+        self.mirrors = [mirror.rstrip('/') + '/' for mirror in mirrors]
+        self.connections = connections
+        self.timeout = timeout
+        self._pages = {}  # (镜像, 项目) -> {文件名: (URL, sha256)}
+        self._lock = threading.Lock()
+
+    def fetch(self, items, callback=None, cancel=None):
+        """下载仓库中还没有的文件，返回PrefetchResult列表；callback(result)在每个文件完成时调用"""
+        results = []
+        lock = threading.Lock()
+
+        def finish(result):
+            with lock:
+                results.append(result)
+            if callback is not None:
+                callback(result)
+
+        todo = queue.Queue()
+        for item in items:
+            if self.wheelhouse.lookup(item.filename, item.sha256):
+                self.wheelhouse.touch([item.filename])
+                finish(PrefetchResult(item.filename, STATUS_CACHED, None, 0, 0.0, None))
+            elif item.sha256 and self.wheelhouse.has_blob(item.sha256):
+                self.wheelhouse.link(item.filename, item.sha256)  # 其它文件名下已有相同内容
+                finish(PrefetchResult(item.filename, STATUS_CACHED, None, 0, 0.0, None))
+            else:
+                todo.put(item)
+
+        sources = self.mirrors or [None]  # None表示直接使用解析得到的URL
+        threads = [threading.Thread(target=self._worker, args=(mirror, todo, finish, cancel), daemon=True)
+                   for mirror in sources for _ in range(min(self.connections, max(1, todo.qsize())))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wheelhouse.save()
+        self.wheelhouse.evict(keep=[item.filename for item in items])
+        return results
+
+    def _worker(self, mirror, todo, finish, cancel):
+        session = _Session(self.timeout)
+        try:
+            while cancel is None or not cancel.is_set():
+                try:
+                    item = todo.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                error = None
+                for url, source in self._candidates(session, mirror, item):
+                    try:
+                        size = self._download(session, url, item)
+                    except Exception as e:
+                        error = f"{source}: {e}"
+                        continue
+                    finish(PrefetchResult(item.filename, STATUS_DOWNLOADED, source, size,
+                                          time.perf_counter() - start, None))
+                    break
+                else:
+                    finish(PrefetchResult(item.filename, STATUS_FAILED, None, 0,
+                                          time.perf_counter() - start, error))
+        finally:
+            session.close()
+
+    def _candidates(self, session, mirror, item):
+        """依次尝试的 (URL, 来源)：分配到的镜像上的同名文件，然后是解析得到的URL"""
+        primary = urlsplit(item.url).netloc
+        if mirror is not None and item.name and urlsplit(mirror).netloc != primary:
+            try:
+                links = self._project_links(session, mirror, item.name)
+            except Exception:
+                links = {}
+            link = links.get(item.filename)
+            if link is not None:
+                yield link[0], urlsplit(mirror).netloc
+        yield item.url, primary or item.url
+
+    def _project_links(self, session, mirror, project):
+        key = (mirror, normalize_name(project))
+        with self._lock:
+            if key in self._pages:
+                return self._pages[key]
+        page_url = urljoin(mirror, normalize_name(project) + '/')
+        response, final_url = session.open(page_url, accept=ACCEPT)
+        body = response.read()
+        links = parse_file_links(body, response.getheader('Content-Type', ''), final_url)
+        with self._lock:
+            self._pages[key] = links
+        return links
+
+    def _download(self, session, url, item):
+        """下载到临时文件并校验sha256，存入仓库，返回字节数"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.wheelhouse.tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if url.startswith('file:'):
+                    source = open(url2pathname(urlsplit(url).path), 'rb')
+                else:
+                    source, _ = session.open(url)
+                try:
+                    while True:
+                        chunk = source.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+                finally:
+                    if url.startswith('file:'):
+                        source.close()
+            sha256 = digest.hexdigest()
+            if item.sha256 and sha256 != item.sha256:
+                raise ValueError("sha256不匹配")
+            self.wheelhouse.add(temp_path, item.filename, sha256)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return size
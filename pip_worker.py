@@ -0,0 +1,257 @@
+"""常驻pip工作进程：只导入一次pip，通过管道接收命令并流式返回输出
+
+客户端(PipWorker)以 `python pip_worker.py` 启动工作进程，之后每条命令只需
+一次管道往返，省去每次启动解释器和导入pip的开销。本文件作为脚本运行时
+只依赖标准库，因此可以用任意目标解释器启动。
+
+协议(每行一个JSON)：
+    请求  {"id": 1, "args": ["install", "requests"]}
+    输出  {"id": 1, "line": "Collecting requests\\n"}
+    结束  {"id": 1, "exit": 0}
+    启动完成时工作进程先发送 {"ready": true, "version": "23.2.1"}
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+# pip自身被升级或卸载的输出
+_PIP_CHANGED_RE = re.compile(r"^\s*Successfully (?:installed .*\bpip-\d|uninstalled pip-)")
+
+
+class _LineWriter:
+    """替换工作进程的sys.stdout/sys.stderr，把写入内容按行转成协议消息"""
+
+    encoding = 'utf-8'
+    errors = 'replace'
+
+    def __init__(self, channel, request_id):
+        self.channel = channel
+        self.request_id = request_id
+        self._buffer = ''
+
+    def write(self, text):
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            self._send(line + '\n')
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._send(self._buffer)
+            self._buffer = ''
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        raise OSError("not a real file")
+
+    def _send(self, line):
+        self.channel.write(json.dumps({'id': self.request_id, 'line': line}) + '\n')
+        self.channel.flush()
+
+
+def serve():
+    """工作进程主循环"""
+    import importlib
+
+    # 协议使用原始的标准输出；fd 1 改指向stderr，防止子进程直接写fd破坏协议
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    from pip import __version__
+    from pip._internal.cli.main import main as pip_main
+
+    channel.write(json.dumps({'ready': True, 'version': __version__}) + '\n')
+    channel.flush()
+
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    for raw in sys.stdin:
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            continue
+        request_id = request.get('id')
+        writer = _LineWriter(channel, request_id)
+        sys.stdout = sys.stderr = writer
+        importlib.invalidate_caches()  # 上一条命令可能改变了site-packages
+        try:
+            code = pip_main(list(request.get('args', [])))
+        except SystemExit as e:
+            code = 0 if e.code is None else e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            writer.write(f"ERROR: {type(e).__name__}: {e}\n")
+            code = 1
+        finally:
+            writer.flush()
+            sys.stdout, sys.stderr = real_stdout, real_stderr
+        channel.write(json.dumps({'id': request_id, 'exit': code or 0}) + '\n')
+        channel.flush()
+
+
+class WorkerError(Exception):
+    """工作进程无法启动或意外退出"""
+
+
+class PipWorker:
+    """常驻pip工作进程的客户端，命令按顺序执行，进程崩溃后下次调用时自动重启"""
+
+    def __init__(self, python=None, creationflags=0):
+        self.python = python or sys.executable
+        self.creationflags = creationflags
+        self.version = None
+        self._process = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """启动工作进程并等待pip导入完成"""
+        if self.alive:
+            return
+        if getattr(sys, 'frozen', False) or not os.path.exists(WORKER_SCRIPT):
+            raise WorkerError("打包后的程序无法启动pip工作进程")
+        self._process = subprocess.Popen(
+            [self.python, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            encoding='utf-8',
+            bufsize=1,
+            creationflags=self.creationflags
+        )
+        message = self._read_message()
+        if not message.get('ready'):
+            self.stop()
+            raise WorkerError("pip工作进程启动失败")
+        self.version = message.get('version')
+
+    def run(self, args, on_line=None):
+        """执行一条pip命令(不含 `python -m pip`)，逐行回调输出，返回退出码"""
+        with self._lock:
+            self.start()
+            self._next_id += 1
+            request_id = self._next_id
+            pip_changed = False
+            try:
+                self._process.stdin.write(json.dumps({'id': request_id, 'args': list(args)}) + '\n')
+                self._process.stdin.flush()
+                while True:
+                    message = self._read_message()
+                    if message.get('id') != request_id:
+                        continue
+                    if 'line' in message:
+                        pip_changed = pip_changed or bool(_PIP_CHANGED_RE.match(message['line']))
+                        if on_line is not None:
+                            on_line(message['line'])
+                    elif 'exit' in message:
+                        code = message['exit']
+                        break
+            except (OSError, WorkerError):
+                self.stop()
+                raise WorkerError("pip工作进程意外退出")
+            if pip_changed:
+                # pip自身被升级或卸载后，已导入的模块不再可靠
+                self.stop()
+        return code
+
+    def stop(self):
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+
+    def terminate(self):
+        """强制终止正在执行的命令(工作进程会在下次使用时重启)"""
+        process = self._process
+        if process is not None:
+            process.kill()
+            process.wait()
+
+    def _read_message(self):
+        line = self._process.stdout.readline()
+        if not line:
+            raise WorkerError("pip工作进程意外退出")
+        try:
+            return json.loads(line)
+        except ValueError:
+            return {}
+
+
+def interpreter_key(python=None):
+    """解释器的标识；虚拟环境的python通常是基础解释器的符号链接，因此不能解析链接"""
+    return os.path.normcase(os.path.abspath(python or sys.executable))
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+_pip_available = {}  # 解释器 -> pip版本字符串(版本未知时为True)
+
+
+def get_worker(python=None, creationflags=0):
+    """返回该解释器的常驻工作进程(每个解释器一个)"""
+    key = interpreter_key(python)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = _workers[key] = PipWorker(python, creationflags)
+        return worker
+
+
+def stop_workers():
+    with _workers_lock:
+        for worker in _workers.values():
+            worker.stop()
+        _workers.clear()
+
+
+def pip_available(python=None, creationflags=0):
+    """检查解释器中pip是否可用，结果按解释器缓存"""
+    key = interpreter_key(python)
+    if _pip_available.get(key):
+        return True
+    worker = _workers.get(key)
+    if worker is not None and worker.alive:
+        available = worker.version or True
+    else:
+        try:
+            output = subprocess.check_output(
+                [python or sys.executable, "-m", "pip", "--version"],
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                creationflags=creationflags
+            )
+            available = output.split()[1] if output.startswith('pip ') else True
+        except Exception:
+            available = False
+    # 只缓存成功的结果，这样用户安装pip后无需重启程序
+    if available:
+        _pip_available[key] = available
+    return bool(available)
+
+
+def pip_version(python=None):
+    """已知的pip版本(来自工作进程或pip_available的检查)，未知时返回None"""
+    key = interpreter_key(python)
+    worker = _workers.get(key)
+    if worker is not None and worker.version:
+        return worker.version
+    version = _pip_available.get(key)
+    return version if isinstance(version, str) else None
+
+
+if __name__ == '__main__':
+    serve()